@@ -0,0 +1,114 @@
+"""
+结果写入基准测试：ORM逐行add vs 生产写入路径（字典表去重 + executemany批量insert）
+
+两种方式都写入规范化后的 suggestions / suggestion_results 表，
+bulk 直接调用 KeywordService._flush_results（内部经 _intern_texts 写字典表）
+
+用法（在backend目录下）: python benchmarks/bench_result_insert.py [变体数]
+"""
+import os
+import sys
+import time
+import asyncio
+import tempfile
+import tracemalloc
+from typing import Dict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from config import settings
+from database import Base, KeywordResult, SearchHistory, Suggestion, VARIANT_TYPE_CODES
+from services.keyword_service import KeywordService
+
+SESSION_ID = "bench"
+SUGGESTIONS_PER_VARIANT = 10
+
+def build_variants(variant_count: int):
+    # 相邻变体共享一半建议词，模拟真实下拉结果中的重复文本
+    return [
+        ("alpha", f"关键词{i}", [f"关键词{(i + rank) // 2} 建议{rank % 5}" for rank in range(SUGGESTIONS_PER_VARIANT)])
+        for i in range(variant_count)
+    ]
+
+async def orm_path(db: AsyncSession, variants):
+    """逐行实现：逐个查询/创建字典表文本，逐行add结果对象，每10个变体提交一次"""
+    text_ids: Dict[str, int] = {}
+
+    async def text_id(text: str) -> int:
+        if text not in text_ids:
+            existing = (await db.execute(select(Suggestion.id).where(Suggestion.text == text))).scalar()
+            if existing is None:
+                entry = Suggestion(text=text)
+                db.add(entry)
+                await db.flush()
+                existing = entry.id
+            text_ids[text] = existing
+        return text_ids[text]
+
+    for processed, (variant_type, variant_keyword, suggestions) in enumerate(variants, 1):
+        for rank, suggestion in enumerate(suggestions, 1):
+            db.add(KeywordResult(
+                session_id=SESSION_ID,
+                variant_type=VARIANT_TYPE_CODES.get(variant_type, 0),
+                variant_keyword_id=await text_id(variant_keyword),
+                suggestion_id=await text_id(suggestion),
+                suggestion_rank=rank
+            ))
+        if processed % 10 == 0:
+            await db.commit()
+    await db.commit()
+
+async def bulk_path(db: AsyncSession, variants, batch_size: int = settings.RESULT_INSERT_BATCH_SIZE):
+    """生产实现：按keyword_service收集字典行，达到批量大小时调用_flush_results"""
+    rows = []
+    for variant_type, variant_keyword, suggestions in variants:
+        rows.extend(
+            {
+                'session_id': SESSION_ID,
+                'variant_type': variant_type,
+                'variant_keyword': variant_keyword,
+                'suggestion': suggestion,
+                'suggestion_rank': rank
+            }
+            for rank, suggestion in enumerate(suggestions, 1)
+        )
+        if len(rows) >= batch_size:
+            await KeywordService._flush_results(db, rows)
+    await KeywordService._flush_results(db, rows)
+
+async def run(name: str, writer, variants):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp}/bench.db")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        session_factory = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+        async with session_factory() as db:
+            db.add(SearchHistory(session_id=SESSION_ID, original_keyword="关键词", status="running"))
+            await db.commit()
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        async with session_factory() as db:
+            await writer(db, variants)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        async with session_factory() as db:
+            rows = (await db.execute(select(func.count()).select_from(KeywordResult))).scalar()
+            texts = (await db.execute(select(func.count()).select_from(Suggestion))).scalar()
+        await engine.dispose()
+
+    print(f"{name:<6} {rows}行 {texts}条文本  耗时 {elapsed * 1000:8.1f} ms  峰值内存 {peak / 1024:8.1f} KiB")
+
+async def main():
+    variant_count = int(sys.argv[1]) if len(sys.argv) > 1 else 156
+    variants = build_variants(variant_count)
+    await run("orm", orm_path, variants)
+    await run("bulk", bulk_path, variants)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -11,6 +11,12 @@ class Settings:
     
     # 数据库配置
     DATABASE_URL = "sqlite+aiosqlite:///./keywords.db"
+    SQLITE_BUSY_TIMEOUT = int(os.getenv("SQLITE_BUSY_TIMEOUT", "5000"))  # 锁等待毫秒数
+    SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))  # 内存映射字节数
+    SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-65536"))  # 负数表示KiB
+    SQLITE_READ_POOL_SIZE = int(os.getenv("SQLITE_READ_POOL_SIZE", "5"))  # 只读连接数
+    SQLITE_WRITE_QUEUE_TIMEOUT = float(os.getenv("SQLITE_WRITE_QUEUE_TIMEOUT", "60"))  # 等待写连接的秒数
     
     # 百度API配置
     BAIDU_SUGGEST_URL = "https://www.baidu.com/sugrec"
@@ -21,6 +27,82 @@ class Settings:
     REQUEST_DELAY_MAX = 3  # 最大延迟秒数
     MAX_RETRIES = 3
     
+    # 百度请求自适应并发（AIMD）配置
+    BAIDU_CONCURRENCY_MIN = float(os.getenv("BAIDU_CONCURRENCY_MIN", "1"))  # 并发下限
+    BAIDU_CONCURRENCY_MAX = float(os.getenv("BAIDU_CONCURRENCY_MAX", "8"))  # 并发上限
+    BAIDU_CONCURRENCY_INITIAL = float(os.getenv("BAIDU_CONCURRENCY_INITIAL", "2"))
+    BAIDU_AIMD_INCREASE = float(os.getenv("BAIDU_AIMD_INCREASE", "1"))  # 每轮成功增加的并发数
+    BAIDU_AIMD_DECREASE = float(os.getenv("BAIDU_AIMD_DECREASE", "0.5"))  # 失败时的乘性退避系数
+    
+    # 5118调用速率配置（按套餐设置）
+    FIVE118_QPS = float(os.getenv("FIVE118_QPS", "1"))  # 每秒请求数
+    FIVE118_BURST = int(os.getenv("FIVE118_BURST", "1"))  # 允许的突发请求数
+    FIVE118_RATE_LIMIT_BACKOFF = float(os.getenv("FIVE118_RATE_LIMIT_BACKOFF", "2"))  # 被限流后的初始暂停秒数
+    FIVE118_RATE_LIMIT_BACKOFF_MAX = float(os.getenv("FIVE118_RATE_LIMIT_BACKOFF_MAX", "30"))
+    
+    # 5118熔断配置
+    FIVE118_REQUEST_TIMEOUT = float(os.getenv("FIVE118_REQUEST_TIMEOUT", "10"))  # 单次请求超时秒数
+    FIVE118_BREAKER_WINDOW = int(os.getenv("FIVE118_BREAKER_WINDOW", "20"))  # 统计最近调用数
+    FIVE118_BREAKER_MIN_CALLS = int(os.getenv("FIVE118_BREAKER_MIN_CALLS", "5"))  # 最少调用数才评估熔断
+    FIVE118_BREAKER_FAILURE_RATE = float(os.getenv("FIVE118_BREAKER_FAILURE_RATE", "0.5"))  # 失败率阈值
+    FIVE118_BREAKER_SLOW_CALL = float(os.getenv("FIVE118_BREAKER_SLOW_CALL", "5"))  # 慢调用耗时(秒)
+    FIVE118_BREAKER_SLOW_RATE = float(os.getenv("FIVE118_BREAKER_SLOW_RATE", "0.8"))  # 慢调用率阈值
+    FIVE118_BREAKER_OPEN_SECONDS = float(os.getenv("FIVE118_BREAKER_OPEN_SECONDS", "30"))  # 熔断持续秒数
+    FIVE118_BREAKER_HALF_OPEN_CALLS = int(os.getenv("FIVE118_BREAKER_HALF_OPEN_CALLS", "1"))  # 半开探测调用数
+    
+    # 商业分析配置
+    FEATURE_CACHE_SIZE = int(os.getenv("FEATURE_CACHE_SIZE", "100000"))  # 关键词特征缓存条数
+    BATCH_SCORE_MAX_KEYWORDS = int(os.getenv("BATCH_SCORE_MAX_KEYWORDS", "200000"))  # 批量评分单次上限
+    
+    # 递归扩展配置
+    EXPANSION_MAX_DEPTH = int(os.getenv("EXPANSION_MAX_DEPTH", "2"))  # 最大扩展层数（0表示只查询种子词变体）
+    EXPANSION_MAX_NODES = int(os.getenv("EXPANSION_MAX_NODES", "2000"))  # 默认请求次数预算
+    EXPANSION_NODE_LIMIT = int(os.getenv("EXPANSION_NODE_LIMIT", "20000"))  # 单次扩展允许的最大预算
+    EXPANSION_MIN_YIELD = float(os.getenv("EXPANSION_MIN_YIELD", "1.0"))  # 每次请求平均新词数低于该值时停止
+    EXPANSION_YIELD_WINDOW = int(os.getenv("EXPANSION_YIELD_WINDOW", "50"))  # 产出率统计的最近请求数
+    EXPANSION_TOP_OPPORTUNITIES = int(os.getenv("EXPANSION_TOP_OPPORTUNITIES", "100"))  # 返回的高机会词数量
+    
+    # 导出配置
+    EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "1000"))  # 每次读取/输出的行数
+    EXPORT_SPOOL_MAX_SIZE = int(os.getenv("EXPORT_SPOOL_MAX_SIZE", str(8 * 1024 * 1024)))  # Excel超过该大小落盘
+    
+    # 计算卸载配置
+    CPU_POOL_WORKERS = int(os.getenv("CPU_POOL_WORKERS", "2"))  # 分析进程数，0表示不使用进程池
+    IO_POOL_WORKERS = int(os.getenv("IO_POOL_WORKERS", "4"))  # 导出写文件线程数
+    OFFLOAD_MIN_ITEMS = int(os.getenv("OFFLOAD_MIN_ITEMS", "2000"))  # 低于该数据量直接在事件循环内执行
+    
+    # 异步任务配置
+    JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))  # 后台分析worker数量
+    JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "100"))  # 等待队列容量
+    JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "60"))  # 任务租约时长，持有进程每1/3时长续约
+    BATCH_MAX_SEEDS = int(os.getenv("BATCH_MAX_SEEDS", "1000"))  # 批量分析单批种子词上限
+    BATCH_MAX_RUNNING = int(os.getenv("BATCH_MAX_RUNNING", "2"))  # 同时运行的批量分析数
+    
+    # 进度推送配置
+    PROGRESS_MAX_SESSIONS = int(os.getenv("PROGRESS_MAX_SESSIONS", "1000"))  # 进度表最大会话数
+    PROGRESS_TTL = int(os.getenv("PROGRESS_TTL", "3600"))  # 已结束会话保留秒数
+    PROGRESS_HEARTBEAT = float(os.getenv("PROGRESS_HEARTBEAT", "15"))  # SSE心跳间隔
+    
+    # 连接池配置
+    HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+    HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "10"))
+    HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))  # 空闲连接保活秒数
+    BAIDU_HTTP2 = os.getenv("BAIDU_HTTP2", "false").lower() == "true"
+    FIVE118_MAX_CONNECTIONS = int(os.getenv("FIVE118_MAX_CONNECTIONS", "4"))
+    
+    # 结果批量写入配置
+    RESULT_INSERT_BATCH_SIZE = int(os.getenv("RESULT_INSERT_BATCH_SIZE", "1000"))  # 每批写入行数
+    
+    # 下拉词缓存配置
+    SUGGESTION_CACHE_ENABLED = os.getenv("SUGGESTION_CACHE_ENABLED", "true").lower() == "true"
+    SUGGESTION_CACHE_TTL = int(os.getenv("SUGGESTION_CACHE_TTL", "86400"))  # 缓存有效期(秒)
+    SUGGESTION_CACHE_MEMORY_SIZE = int(os.getenv("SUGGESTION_CACHE_MEMORY_SIZE", "5000"))  # 内存LRU容量
+    SUGGESTION_CACHE_MAX_ENTRIES = int(os.getenv("SUGGESTION_CACHE_MAX_ENTRIES", "200000"))  # SQLite最大条目数
+    
+    # 商业分析结果持久化配置
+    ANALYSIS_STORE_ENABLED = os.getenv("ANALYSIS_STORE_ENABLED", "true").lower() == "true"
+    ANALYSIS_STORE_TTL = int(os.getenv("ANALYSIS_STORE_TTL", "604800"))  # 结果有效期(秒)
+    
     # 跨域配置
     ALLOWED_ORIGINS = [
         "http://localhost:3000",
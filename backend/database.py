@@ -1,16 +1,64 @@
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Text, Float
+from sqlalchemy import create_engine, Column, Integer, String, DateTime, Text, Float, Boolean, ForeignKey, Index, SmallInteger, inspect, text, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from datetime import datetime
 from config import settings
+import logging
 
-# 异步数据库引擎
+logger = logging.getLogger(__name__)
+
+IS_SQLITE = settings.DATABASE_URL.startswith("sqlite")
+
+def _sqlite_connect_args():
+    return {"timeout": settings.SQLITE_BUSY_TIMEOUT / 1000} if IS_SQLITE else {}
+
+# 异步数据库引擎（写）：单连接，写操作在连接池上排队，避免写写竞争
 async_engine = create_async_engine(
     settings.DATABASE_URL,
-    echo=settings.DEBUG
+    echo=settings.DEBUG,
+    connect_args=_sqlite_connect_args(),
+    **({
+        "poolclass": AsyncAdaptedQueuePool,
+        "pool_size": 1,
+        "max_overflow": 0,
+        "pool_timeout": settings.SQLITE_WRITE_QUEUE_TIMEOUT
+    } if IS_SQLITE else {})
 )
 
+# 只读引擎：WAL模式下读连接不阻塞写连接
+read_engine = create_async_engine(
+    settings.DATABASE_URL,
+    echo=settings.DEBUG,
+    connect_args=_sqlite_connect_args(),
+    poolclass=AsyncAdaptedQueuePool,
+    pool_size=settings.SQLITE_READ_POOL_SIZE,
+    max_overflow=0
+) if IS_SQLITE else async_engine
+
+def _apply_sqlite_pragmas(dbapi_connection, read_only: bool):
+    """连接建立时设置SQLite并发相关参数"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT)}")
+    cursor.execute(f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE)}")
+    cursor.execute(f"PRAGMA cache_size={int(settings.SQLITE_CACHE_SIZE)}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    if read_only:
+        cursor.execute("PRAGMA query_only=ON")
+    cursor.close()
+
+if IS_SQLITE:
+    @event.listens_for(async_engine.sync_engine, "connect")
+    def _on_write_connect(dbapi_connection, connection_record):
+        _apply_sqlite_pragmas(dbapi_connection, read_only=False)
+
+    @event.listens_for(read_engine.sync_engine, "connect")
+    def _on_read_connect(dbapi_connection, connection_record):
+        _apply_sqlite_pragmas(dbapi_connection, read_only=True)
+
 # 异步会话
 AsyncSessionLocal = async_sessionmaker(
     bind=async_engine,
@@ -18,30 +66,91 @@ AsyncSessionLocal = async_sessionmaker(
     expire_on_commit=False
 )
 
+# 只读会话
+AsyncReadSessionLocal = async_sessionmaker(
+    bind=read_engine,
+    class_=AsyncSession,
+    expire_on_commit=False
+)
+
 Base = declarative_base()
 
+# 变体类型的整数编码（持久化后不可修改已有编码）
+VARIANT_TYPE_CODES = {
+    'alpha': 1,
+    'alpha_space': 2,
+    'question_how': 3,
+    'question_what': 4,
+    'question_can': 5,
+    'question_which': 6,
+    'expansion': 7  # 递归扩展产生的查询词
+}
+VARIANT_TYPE_NAMES = {code: name for name, code in VARIANT_TYPE_CODES.items()}
+
+class Suggestion(Base):
+    """关键词文本字典表：建议词与变体关键词只存一份，结果行引用其id"""
+    __tablename__ = "suggestions"
+    
+    id = Column(Integer, primary_key=True)
+    text = Column(String(500), unique=True, nullable=False)
+
 class KeywordResult(Base):
-    __tablename__ = "keyword_results"
+    __tablename__ = "suggestion_results"
+    __table_args__ = (
+        # 会话结果查询：按会话过滤并按类型/变体/排序输出
+        Index("ix_suggestion_results_session_lookup", "session_id", "variant_type", "variant_keyword_id", "suggestion_rank"),
+    )
     
-    id = Column(Integer, primary_key=True, index=True)
-    original_keyword = Column(String(255), index=True)  # 原始关键词
-    variant_keyword = Column(String(255), index=True)   # 变体关键词 
-    suggestion = Column(String(500))                     # 下拉建议词
-    suggestion_rank = Column(Integer)                    # 建议词排序
-    variant_type = Column(String(50))                    # 变体类型(alpha, question, etc)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    search_volume = Column(Float, nullable=True)         # 搜索量(预留)
+    id = Column(Integer, primary_key=True)
+    session_id = Column(String(100), ForeignKey("search_history.session_id"), nullable=False)  # 所属会话
+    variant_type = Column(SmallInteger, nullable=False)                                        # 变体类型编码(VARIANT_TYPE_CODES)
+    variant_keyword_id = Column(Integer, ForeignKey("suggestions.id"), nullable=False)         # 变体关键词
+    suggestion_id = Column(Integer, ForeignKey("suggestions.id"), nullable=False)              # 下拉建议词
+    suggestion_rank = Column(SmallInteger, nullable=False)                                     # 建议词排序
     
 class SearchHistory(Base):
     __tablename__ = "search_history"
     
     id = Column(Integer, primary_key=True, index=True)
-    session_id = Column(String(100), index=True)
+    session_id = Column(String(100), index=True, unique=True)
     original_keyword = Column(String(255))
     variant_types = Column(Text)  # JSON字符串存储选择的变体类型
     total_suggestions = Column(Integer)
     created_at = Column(DateTime, default=datetime.utcnow)
     status = Column(String(20), default="completed")  # pending, running, completed, failed
+    job_owner = Column(String(36), index=True)  # 后台任务队列提交的会话：当前持有任务的进程实例id
+    lease_until = Column(Float)  # 任务租约到期时间戳(秒)，持有进程定期续约
+
+class SuggestionCacheEntry(Base):
+    __tablename__ = "suggestion_cache"
+    
+    keyword = Column(String(255), primary_key=True)      # 变体关键词
+    suggestions = Column(Text)                           # JSON字符串存储建议词列表
+    fetched_at = Column(Float, index=True)               # 抓取时间戳(秒)
+
+class KeywordMetricsEntry(Base):
+    """关键词商业指标：基于5118真实数据的分析结果，跨会话按关键词复用"""
+    __tablename__ = "keyword_metrics"
+    
+    keyword = Column(String(500), primary_key=True)      # 建议词
+    commercial_score = Column(Float)
+    intent_type = Column(String(50))
+    competition_level = Column(String(50))
+    search_volume_estimate = Column(Integer)
+    difficulty_score = Column(Float)
+    opportunity_score = Column(Float)
+    is_blue_ocean = Column(Boolean)
+    real_data_available = Column(Boolean)
+    analyzed_at = Column(Float, index=True)              # 分析时间戳(秒)
+
+class SessionAnalysis(Base):
+    """会话级聚合分析结果（商业分析、商业洞察），重复查看时直接读取"""
+    __tablename__ = "session_analysis"
+    
+    session_id = Column(String(100), ForeignKey("search_history.session_id"), primary_key=True)
+    kind = Column(String(30), primary_key=True)          # 结果类型: business_analysis / insights
+    payload = Column(Text)                               # JSON字符串存储接口返回内容
+    computed_at = Column(Float)                          # 计算时间戳(秒)
 
 # 异步数据库依赖
 async def get_db():
@@ -51,7 +160,91 @@ async def get_db():
         finally:
             await session.close()
 
+def _migrate_legacy_results(conn) -> bool:
+    """
+    将旧版keyword_results表（逐行存储完整字符串）迁移到规范化结构
+    
+    未记录session_id的旧行按关键词归属到其之前最近的一次搜索会话；
+    仍无法归属或缺少关键词文本的行转存到keyword_results_unmigrated表，不直接丢弃。
+    返回是否执行了迁移。
+    """
+    inspector = inspect(conn)
+    if "keyword_results" not in inspector.get_table_names():
+        return False
+    
+    columns = {column['name'] for column in inspector.get_columns("keyword_results")}
+    session_expr = (
+        "COALESCE(kr.session_id, {legacy})" if 'session_id' in columns else "{legacy}"
+    ).format(legacy=(
+        "(SELECT sh.session_id FROM search_history sh "
+        "WHERE sh.original_keyword = kr.original_keyword AND sh.created_at <= kr.created_at "
+        "ORDER BY sh.created_at DESC LIMIT 1)"
+    ))
+    type_expr = "CASE kr.variant_type " + " ".join(
+        f"WHEN '{name}' THEN {code}" for name, code in VARIANT_TYPE_CODES.items()
+    ) + " ELSE 0 END"
+    
+    conn.execute(text(
+        "INSERT OR IGNORE INTO suggestions (text) "
+        "SELECT suggestion FROM keyword_results WHERE suggestion IS NOT NULL "
+        "UNION SELECT variant_keyword FROM keyword_results WHERE variant_keyword IS NOT NULL"
+    ))
+    migrated = conn.execute(text(
+        "INSERT INTO suggestion_results (session_id, variant_type, variant_keyword_id, suggestion_id, suggestion_rank) "
+        f"SELECT * FROM (SELECT {session_expr} AS sid, {type_expr}, vk.id, sg.id, COALESCE(kr.suggestion_rank, 0) "
+        "FROM keyword_results kr "
+        "JOIN suggestions vk ON vk.text = kr.variant_keyword "
+        "JOIN suggestions sg ON sg.text = kr.suggestion) "
+        "WHERE sid IS NOT NULL"
+    )).rowcount
+    
+    # 无法迁移的行转存隔离表，保留原始数据供人工核对
+    unmapped_filter = f"({session_expr}) IS NULL OR kr.variant_keyword IS NULL OR kr.suggestion IS NULL"
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS keyword_results_unmigrated AS SELECT * FROM keyword_results WHERE 0"
+    ))
+    quarantined = conn.execute(text(
+        f"INSERT INTO keyword_results_unmigrated SELECT kr.* FROM keyword_results kr WHERE {unmapped_filter}"
+    )).rowcount
+    
+    conn.execute(text("DROP TABLE keyword_results"))
+    logger.info(f"旧版结果表迁移完成: 迁移 {migrated} 行")
+    if quarantined:
+        logger.warning(f"{quarantined} 行旧版结果无法归属到会话，已转存到keyword_results_unmigrated表")
+    return True
+
+# 旧库缺少的search_history列: 列名 -> 列定义
+_SEARCH_HISTORY_COLUMNS = {
+    'job_owner': 'VARCHAR(36)',
+    'lease_until': 'FLOAT'
+}
+
+def _migrate_search_history_columns(conn):
+    """为已有的search_history表补充新增列"""
+    existing = {column['name'] for column in inspect(conn).get_columns("search_history")}
+    for name, ddl in _SEARCH_HISTORY_COLUMNS.items():
+        if name not in existing:
+            conn.execute(text(f"ALTER TABLE search_history ADD COLUMN {name} {ddl}"))
+            if name == 'job_owner':
+                conn.execute(text("CREATE INDEX IF NOT EXISTS ix_search_history_job_owner ON search_history (job_owner)"))
+
+# 只读数据库依赖（查询类接口使用）
+async def get_read_db():
+    async with AsyncReadSessionLocal() as session:
+        try:
+            yield session
+        finally:
+            await session.close()
+
 # 创建表
 async def create_tables():
     async with async_engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
\ No newline at end of file
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_migrate_search_history_columns)
+        migrated = await conn.run_sync(_migrate_legacy_results)
+    
+    if migrated and IS_SQLITE:
+        # 回收旧表释放的页面，VACUUM不能在事务内执行
+        async with async_engine.connect() as conn:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            await conn.exec_driver_sql("VACUUM")
\ No newline at end of file
@@ -1,24 +1,47 @@
-from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks
+from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks, UploadFile, File, Form
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from database import get_db, create_tables
+from database import get_db, get_read_db, create_tables, AsyncSessionLocal
 from models import (
     KeywordAnalysisRequest, 
     KeywordAnalysisResponse,
     SearchHistoryResponse,
     VariantTypesResponse,
     ProgressUpdate,
-    ExportRequest
+    ExportRequest,
+    JobSubmitResponse,
+    JobStatusResponse,
+    BatchScoreRequest,
+    BatchScoreResponse,
+    BatchAnalysisRequest,
+    BatchSubmitResponse,
+    BatchSeedStatus,
+    BatchStatusResponse,
+    ExpansionRequest,
+    ExpansionResponse
 )
 from services.keyword_service import KeywordService
 from services.business_analyzer import BusinessAnalyzer
+from services.suggestion_cache import suggestion_cache
+from services.analysis_store import analysis_store, BUSINESS_ANALYSIS, BUSINESS_INSIGHTS
+from services.http_pool import http_pool
+from services.rate_controller import baidu_rate_controller
+from services.single_flight import baidu_flight, five118_flight
+from services.circuit_breaker import five118_breaker
+from services.token_bucket import five118_scheduler
+from services.job_service import AnalysisJobManager, JobQueueFullError
+from services.batch_service import BatchAnalysisManager
+from services.expansion_service import SuggestionExpander
+from services.progress_registry import progress_registry
+from services.offload import offloader
+from services.export_service import ExportService
 from config import settings
 import asyncio
 import logging
 import json
-import pandas as pd
 import io
+import csv
 from typing import List
 
 # 配置日志
@@ -40,15 +63,59 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# 存储分析进度
-analysis_progress = {}
+def _track_progress(session_id: str):
+    """初始化进度跟踪并返回进度回调"""
+    progress_registry.start(session_id)
+    
+    async def progress_callback(processed: int, total: int):
+        progress_registry.update(
+            session_id,
+            processed=processed,
+            total=total,
+            percentage=round((processed / total) * 100, 2) if total > 0 else 0,
+            status='running'
+        )
+    
+    return progress_callback
+
+def _update_job_status(session_id: str, status: str, error: str = None):
+    """同步后台任务状态到进度注册表"""
+    fields = {'status': 'error' if status == 'failed' else status}
+    if status == 'completed':
+        fields['percentage'] = 100.0
+    if error:
+        fields['error'] = error
+    progress_registry.update(session_id, **fields)
+
+# 后台分析任务工作池
+job_manager = AnalysisJobManager(
+    progress_factory=_track_progress,
+    status_hook=_update_job_status
+)
+
+# 多种子词批量分析
+batch_manager = BatchAnalysisManager(
+    progress_factory=_track_progress,
+    status_hook=_update_job_status
+)
 
 @app.on_event("startup")
 async def startup_event():
     """应用启动时创建数据库表"""
     await create_tables()
+    await http_pool.start()
+    await job_manager.start()
+    offloader.start()
     logger.info("应用启动成功")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """应用关闭时停止任务工作池并释放连接池"""
+    await batch_manager.stop()
+    await job_manager.stop()
+    await http_pool.close()
+    offloader.close()
+
 @app.get("/")
 async def root():
     """健康检查接口"""
@@ -81,22 +148,7 @@ async def analyze_keyword(
         session_id = str(uuid.uuid4())
         
         # 初始化进度跟踪
-        analysis_progress[session_id] = {
-            'processed': 0,
-            'total': 0,
-            'percentage': 0.0,
-            'status': 'running',
-            'error': None
-        }
-        
-        # 进度回调函数
-        async def progress_callback(processed: int, total: int):
-            analysis_progress[session_id].update({
-                'processed': processed,
-                'total': total,
-                'percentage': round((processed / total) * 100, 2) if total > 0 else 0,
-                'status': 'running'
-            })
+        progress_callback = _track_progress(session_id)
         
         # 执行分析
         try:
@@ -111,19 +163,13 @@ async def analyze_keyword(
             # session_id已经在result中了
             
             # 标记完成
-            analysis_progress[session_id].update({
-                'status': 'completed',
-                'percentage': 100.0
-            })
+            progress_registry.update(session_id, status='completed', percentage=100.0)
             
             return KeywordAnalysisResponse(**result)
             
         except Exception as e:
             # 标记错误
-            analysis_progress[session_id].update({
-                'status': 'error',
-                'error': str(e)
-            })
+            progress_registry.update(session_id, status='error', error=str(e))
             logger.error(f"关键词分析失败: {str(e)}")
             raise HTTPException(status_code=500, detail=f"分析失败: {str(e)}")
         
@@ -131,33 +177,399 @@ async def analyze_keyword(
         logger.error(f"关键词分析失败: {str(e)}")
         raise HTTPException(status_code=500, detail=f"分析失败: {str(e)}")
 
+@app.post("/api/analyze/stream")
+async def analyze_keyword_stream(request: KeywordAnalysisRequest):
+    """分析关键词并以NDJSON逐条推送结果：每个变体词完成即输出，商业分析随后输出"""
+    invalid_types = [vt for vt in request.variant_types if vt not in KeywordService.VARIANT_TYPES]
+    if invalid_types:
+        raise HTTPException(status_code=400, detail=f"无效的变体类型: {invalid_types}")
+    
+    import uuid
+    session_id = str(uuid.uuid4())
+    progress_callback = _track_progress(session_id)
+    records: asyncio.Queue = asyncio.Queue()
+    
+    async def result_callback(variant_type: str, variant_keyword: str, suggestions: List[str]):
+        await records.put({
+            'type': 'variant',
+            'variant_type': variant_type,
+            'variant_keyword': variant_keyword,
+            'suggestions': suggestions
+        })
+    
+    async def run_analysis():
+        try:
+            async with AsyncSessionLocal() as db:
+                result = await KeywordService.analyze_keywords(
+                    request.keyword,
+                    request.variant_types,
+                    db,
+                    progress_callback,
+                    session_id,
+                    result_callback
+                )
+            progress_registry.update(session_id, status='completed', percentage=100.0)
+            
+            # 商业分析在抓取完成后按变体类型逐条输出
+            for variant_type, analysis in result.get('business_analysis', {}).items():
+                await records.put({
+                    'type': 'business',
+                    'variant_type': variant_type,
+                    'business_analysis': analysis
+                })
+            await records.put({'type': 'summary', 'summary': result['summary']})
+        except Exception as e:
+            logger.error(f"关键词分析失败: {str(e)}")
+            progress_registry.update(session_id, status='error', error=str(e))
+            await records.put({'type': 'error', 'error': f"分析失败: {str(e)}"})
+        finally:
+            await records.put(None)
+    
+    async def ndjson_stream():
+        task = asyncio.create_task(run_analysis())
+        try:
+            yield json.dumps({
+                'type': 'session',
+                'session_id': session_id,
+                'base_keyword': request.keyword,
+                'variant_types': request.variant_types
+            }, ensure_ascii=False) + '\n'
+            while True:
+                record = await records.get()
+                if record is None:
+                    break
+                yield json.dumps(record, ensure_ascii=False) + '\n'
+        finally:
+            # 客户端断开时停止分析
+            if not task.done():
+                task.cancel()
+    
+    return StreamingResponse(ndjson_stream(), media_type='application/x-ndjson')
+
+def _build_expander(request: ExpansionRequest) -> SuggestionExpander:
+    """校验扩展参数并创建扩展引擎"""
+    invalid_types = [
+        vt for vt in request.variant_types + request.child_variant_types
+        if vt not in KeywordService.VARIANT_TYPES
+    ]
+    if invalid_types:
+        raise HTTPException(status_code=400, detail=f"无效的变体类型: {invalid_types}")
+    if not request.keyword.strip():
+        raise HTTPException(status_code=400, detail="关键词不能为空")
+    
+    max_nodes = request.max_nodes if request.max_nodes is not None else settings.EXPANSION_MAX_NODES
+    if not 0 < max_nodes <= settings.EXPANSION_NODE_LIMIT:
+        raise HTTPException(status_code=400, detail=f"节点预算需在1到{settings.EXPANSION_NODE_LIMIT}之间")
+    max_depth = request.max_depth if request.max_depth is not None else settings.EXPANSION_MAX_DEPTH
+    if max_depth < 0:
+        raise HTTPException(status_code=400, detail="扩展层数不能为负数")
+    
+    return SuggestionExpander(
+        max_depth=max_depth,
+        max_nodes=max_nodes,
+        min_yield=request.min_yield if request.min_yield is not None else settings.EXPANSION_MIN_YIELD,
+        child_variant_types=request.child_variant_types
+    )
+
+@app.post("/api/expand", response_model=ExpansionResponse)
+async def expand_keyword(request: ExpansionRequest):
+    """递归扩展下拉词：返回的建议词作为新种子逐层查询，直到层数/节点预算用尽或新词产出过低"""
+    expander = _build_expander(request)
+    
+    import uuid
+    session_id = str(uuid.uuid4())
+    progress_callback = _track_progress(session_id)
+    try:
+        result = await expander.run(request.keyword.strip(), request.variant_types, session_id, progress_callback)
+        progress_registry.update(session_id, status='completed', percentage=100.0)
+        return ExpansionResponse(**result)
+    except Exception as e:
+        progress_registry.update(session_id, status='error', error=str(e))
+        logger.error(f"递归扩展失败: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"扩展失败: {str(e)}")
+
+@app.post("/api/expand/stream")
+async def expand_keyword_stream(request: ExpansionRequest):
+    """递归扩展下拉词，以NDJSON逐个推送已查询节点，最后输出汇总"""
+    expander = _build_expander(request)
+    
+    import uuid
+    session_id = str(uuid.uuid4())
+    progress_callback = _track_progress(session_id)
+    records: asyncio.Queue = asyncio.Queue()
+    
+    async def node_callback(query: str, depth: int, suggestions: List[str], new_count: int):
+        await records.put({
+            'type': 'node',
+            'query': query,
+            'depth': depth,
+            'suggestions': suggestions,
+            'new_suggestions': new_count
+        })
+    
+    async def run_expansion():
+        finished = False
+        try:
+            result = await expander.run(
+                request.keyword.strip(), request.variant_types, session_id, progress_callback, node_callback
+            )
+            progress_registry.update(session_id, status='completed', percentage=100.0)
+            finished = True
+            await records.put({'type': 'summary', 'summary': result})
+        except Exception as e:
+            logger.error(f"递归扩展失败: {str(e)}")
+            progress_registry.update(session_id, status='error', error=str(e))
+            finished = True
+            await records.put({'type': 'error', 'error': f"扩展失败: {str(e)}"})
+        finally:
+            if not finished:
+                # 客户端断开导致任务取消时，进度同样进入终态
+                progress_registry.update(session_id, status='error', error='扩展已取消')
+            await records.put(None)
+    
+    async def ndjson_stream():
+        task = asyncio.create_task(run_expansion())
+        try:
+            yield json.dumps({
+                'type': 'session',
+                'session_id': session_id,
+                'base_keyword': request.keyword.strip()
+            }, ensure_ascii=False) + '\n'
+            while True:
+                record = await records.get()
+                if record is None:
+                    break
+                yield json.dumps(record, ensure_ascii=False) + '\n'
+        finally:
+            # 客户端断开时停止扩展
+            if not task.done():
+                task.cancel()
+    
+    return StreamingResponse(ndjson_stream(), media_type='application/x-ndjson')
+
+@app.post("/api/jobs", response_model=JobSubmitResponse)
+async def submit_analysis_job(request: KeywordAnalysisRequest):
+    """提交异步分析任务，立即返回session_id"""
+    invalid_types = [vt for vt in request.variant_types if vt not in KeywordService.VARIANT_TYPES]
+    if invalid_types:
+        raise HTTPException(status_code=400, detail=f"无效的变体类型: {invalid_types}")
+    
+    try:
+        session_id = await job_manager.submit(request.keyword, request.variant_types)
+    except JobQueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        logger.error(f"提交分析任务失败: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"提交任务失败: {str(e)}")
+    
+    return JobSubmitResponse(
+        session_id=session_id,
+        status='pending',
+        queued_jobs=job_manager.get_stats()['queued_jobs']
+    )
+
+@app.get("/api/jobs/stats")
+async def get_job_stats():
+    """获取任务工作池状态"""
+    return job_manager.get_stats()
+
+@app.get("/api/jobs/{session_id}", response_model=JobStatusResponse)
+async def get_analysis_job(
+    session_id: str,
+    db: AsyncSession = Depends(get_read_db)
+):
+    """查询异步分析任务状态，完成后附带结果"""
+    status = await KeywordService.get_session_status(session_id, db)
+    if status is None:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    
+    progress = progress_registry.get(session_id) or {}
+    response = JobStatusResponse(
+        session_id=session_id,
+        status=status,
+        processed=progress.get('processed', 0),
+        total=progress.get('total', 0),
+        percentage=100.0 if status == 'completed' else progress.get('percentage', 0.0),
+        error=progress.get('error')
+    )
+    if status == 'completed':
+        response.results = (await KeywordService.get_session_results(session_id, db))['results']
+    return response
+
+async def _submit_batch(keywords: List[str], variant_types: List[str]) -> BatchSubmitResponse:
+    """校验变体类型并提交批量分析"""
+    invalid_types = [vt for vt in variant_types if vt not in KeywordService.VARIANT_TYPES]
+    if invalid_types or not variant_types:
+        raise HTTPException(status_code=400, detail=f"无效的变体类型: {invalid_types}")
+    
+    try:
+        batch = await batch_manager.submit(keywords, variant_types)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except JobQueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    
+    return BatchSubmitResponse(
+        batch_id=batch['batch_id'],
+        status=batch['status'],
+        sessions=batch['sessions'],
+        duplicate_seeds_removed=batch['duplicate_seeds_removed']
+    )
+
+@app.post("/api/batch/analyze", response_model=BatchSubmitResponse)
+async def submit_batch_analysis(request: BatchAnalysisRequest):
+    """
+    提交多种子词批量分析，立即返回batch_id
+    
+    各种子词的变体词跨种子去重后统一抓取，每个种子词生成独立会话
+    """
+    try:
+        return await _submit_batch(request.keywords, request.variant_types)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"提交批量分析失败: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"提交批量分析失败: {str(e)}")
+
+@app.post("/api/batch/analyze/upload", response_model=BatchSubmitResponse)
+async def submit_batch_analysis_upload(
+    file: UploadFile = File(...),
+    variant_types: str = Form(...)
+):
+    """
+    上传种子词文件提交批量分析
+    
+    支持每行一个关键词的文本文件，或CSV（含“关键词”列时取该列，否则取第一列）；
+    variant_types为逗号分隔的变体类型
+    """
+    try:
+        keywords = await _read_keyword_file(file, '关键词')
+        types = [vt.strip() for vt in variant_types.split(',') if vt.strip()]
+        return await _submit_batch(keywords, types)
+    except HTTPException:
+        raise
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="文件需为UTF-8编码")
+    except Exception as e:
+        logger.error(f"提交批量分析失败: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"提交批量分析失败: {str(e)}")
+
+@app.get("/api/batch/stats")
+async def get_batch_stats():
+    """获取批量分析状态统计"""
+    return batch_manager.get_stats()
+
+@app.get("/api/batch/{batch_id}", response_model=BatchStatusResponse)
+async def get_batch_analysis(batch_id: str):
+    """查询批量分析的整体进度及每个种子词的进度"""
+    batch = batch_manager.get(batch_id)
+    if batch is None:
+        raise HTTPException(status_code=404, detail="批量分析不存在")
+    
+    progress = progress_registry.get(batch_id) or {}
+    seeds = []
+    for keyword, session_id in batch['sessions'].items():
+        snapshot = progress_registry.snapshot(session_id)
+        seeds.append(BatchSeedStatus(
+            keyword=keyword,
+            session_id=session_id,
+            status=snapshot['status'],
+            processed=snapshot['processed'],
+            total=snapshot['total'],
+            percentage=snapshot['percentage'],
+            error=snapshot['error'] if snapshot['status'] != 'not_found' else None
+        ))
+    
+    return BatchStatusResponse(
+        batch_id=batch_id,
+        status=batch['status'],
+        processed=progress.get('processed', 0),
+        total=progress.get('total', 0),
+        percentage=100.0 if batch['status'] == 'completed' else progress.get('percentage', 0.0),
+        error=batch['error'],
+        seeds=seeds,
+        summary=batch['summary']
+    )
+
 @app.get("/api/progress/{session_id}")
 async def get_analysis_progress(session_id: str):
     """获取分析进度"""
-    if session_id in analysis_progress:
-        progress = analysis_progress[session_id]
-        return {
-            'session_id': session_id,
-            'processed': progress.get('processed', 0),
-            'total': progress.get('total', 0), 
-            'percentage': progress.get('percentage', 0.0),
-            'status': progress.get('status', 'unknown'),
-            'error': progress.get('error')
-        }
-    else:
-        return {
-            'session_id': session_id,
-            'processed': 0,
-            'total': 0,
-            'percentage': 0.0,
-            'status': 'not_found',
-            'error': '会话不存在'
-        }
+    return progress_registry.snapshot(session_id)
+
+@app.get("/api/progress/{session_id}/stream")
+async def stream_analysis_progress(session_id: str):
+    """以SSE推送分析进度，会话结束后关闭连接"""
+    async def event_stream():
+        async for snapshot in progress_registry.subscribe(session_id, settings.PROGRESS_HEARTBEAT):
+            if snapshot is None:
+                yield ": keep-alive\n\n"
+                continue
+            yield f"event: progress\ndata: {json.dumps(snapshot, ensure_ascii=False)}\n\n"
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.get("/api/cache/stats")
+async def get_cache_stats():
+    """获取下拉词缓存命中统计"""
+    return suggestion_cache.get_stats()
+
+@app.get("/api/analysis-store/stats")
+async def get_analysis_store_stats():
+    """获取商业分析结果存储命中统计"""
+    return analysis_store.get_stats()
+
+@app.delete("/api/cache")
+async def clear_cache():
+    """清空下拉词缓存"""
+    try:
+        await suggestion_cache.clear()
+        return {'status': 'cleared'}
+    except Exception as e:
+        logger.error(f"清空缓存失败: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"清空缓存失败: {str(e)}")
+
+@app.get("/api/pool/stats")
+async def get_pool_stats():
+    """获取HTTP连接池指标"""
+    return http_pool.get_stats()
+
+@app.get("/api/rate-controller")
+async def get_rate_controller_stats():
+    """获取百度请求自适应速率状态"""
+    return baidu_rate_controller.get_stats()
+
+@app.get("/api/circuit-breaker")
+async def get_circuit_breaker_state():
+    """获取5118熔断器状态"""
+    return five118_breaker.get_stats()
+
+@app.get("/api/five118/scheduler")
+async def get_five118_scheduler_stats():
+    """获取5118令牌桶调度状态"""
+    return five118_scheduler.get_stats()
+
+@app.post("/api/circuit-breaker/reset")
+async def reset_circuit_breaker():
+    """手动关闭5118熔断器"""
+    five118_breaker.reset()
+    return five118_breaker.get_stats()
+
+@app.get("/api/single-flight")
+async def get_single_flight_stats():
+    """获取上游请求合并统计"""
+    return {
+        'baidu': baidu_flight.get_stats(),
+        'five118': five118_flight.get_stats()
+    }
 
 @app.get("/api/history", response_model=List[SearchHistoryResponse])
 async def get_search_history(
     limit: int = 10,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """获取搜索历史"""
     try:
@@ -170,7 +582,7 @@ async def get_search_history(
 @app.get("/api/results/{session_id}")
 async def get_session_results(
     session_id: str,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """获取特定会话的分析结果"""
     try:
@@ -183,21 +595,29 @@ async def get_session_results(
 @app.get("/api/business-analysis/{session_id}")
 async def get_business_analysis(
     session_id: str,
-    db: AsyncSession = Depends(get_db)
+    refresh: bool = False,
+    db: AsyncSession = Depends(get_read_db)
 ):
-    """获取商业价值分析结果"""
+    """获取商业价值分析结果（优先读取分析时保存的结果，refresh=true时重新计算）"""
     try:
+        stored = None if refresh else await analysis_store.get_session(session_id, BUSINESS_ANALYSIS)
+        if stored is not None:
+            return {'session_id': session_id, **stored}
+        
         results = await KeywordService.get_session_results(session_id, db)
+        if not results['results']:
+            return {'session_id': session_id, 'business_analysis': {}, 'summary': {}}
         
-        # 如果结果中没有商业分析，则重新生成
-        if 'business_analysis' not in results:
-            # 重新分析并添加商业价值
-            results = KeywordService._add_business_analysis(results)
+        # 没有保存的结果（旧会话或已过期）时重新生成并保存
+        results['summary'] = {}
+        results = KeywordService._deduplicate_suggestions(results)
+        results = await KeywordService._add_business_analysis(results)
+        await KeywordService.save_business_analysis(results)
         
         return {
             'session_id': session_id,
-            'business_analysis': results.get('business_analysis', {}),
-            'summary': results.get('summary', {})
+            'business_analysis': results['business_analysis'],
+            'summary': results['summary']
         }
     except Exception as e:
         logger.error(f"获取商业分析失败: {str(e)}")
@@ -226,6 +646,64 @@ async def analyze_single_keyword(request: dict):
         logger.error(f"单关键词分析失败: {str(e)}")
         raise HTTPException(status_code=500, detail=f"分析失败: {str(e)}")
 
+async def _read_keyword_file(file: UploadFile, column_name: str) -> List[str]:
+    """读取上传的关键词文件：文本文件每行一个关键词；CSV含指定列时取该列，否则取第一列"""
+    content = (await file.read()).decode('utf-8-sig')
+    if not (file.filename or '').lower().endswith('.csv'):
+        return content.splitlines()
+    
+    rows = csv.reader(io.StringIO(content))
+    header = next(rows, [])
+    if column_name in header:
+        column = header.index(column_name)
+        return [row[column] for row in rows if len(row) > column]
+    return header[:1] + [row[0] for row in rows if row]
+
+async def _batch_score(keywords: List[str], suggestions_count: int) -> BatchScoreResponse:
+    """批量评分并校验数量上限"""
+    keywords = [kw.strip() for kw in keywords if kw and kw.strip()]
+    if not keywords:
+        raise HTTPException(status_code=400, detail="关键词不能为空")
+    if len(keywords) > settings.BATCH_SCORE_MAX_KEYWORDS:
+        raise HTTPException(status_code=400, detail=f"关键词数量超过上限 {settings.BATCH_SCORE_MAX_KEYWORDS}")
+    
+    columns = await offloader.run_cpu(
+        BusinessAnalyzer.score_keywords_batch, keywords, suggestions_count, size=len(keywords)
+    )
+    return BatchScoreResponse(count=len(keywords), columns=columns)
+
+@app.post("/api/batch-score", response_model=BatchScoreResponse)
+async def batch_score_keywords(request: BatchScoreRequest):
+    """批量估算关键词商业价值，按列返回"""
+    try:
+        return await _batch_score(request.keywords, request.suggestions_count)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"批量评分失败: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"批量评分失败: {str(e)}")
+
+@app.post("/api/batch-score/upload", response_model=BatchScoreResponse)
+async def batch_score_upload(
+    file: UploadFile = File(...),
+    suggestions_count: int = Form(0)
+):
+    """
+    上传关键词文件批量评分
+    
+    支持每行一个关键词的文本文件，或CSV（含“下拉建议词”列时取该列，否则取第一列）
+    """
+    try:
+        keywords = await _read_keyword_file(file, '下拉建议词')
+        return await _batch_score(keywords, suggestions_count)
+    except HTTPException:
+        raise
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="文件需为UTF-8编码")
+    except Exception as e:
+        logger.error(f"批量评分失败: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"批量评分失败: {str(e)}")
+
 @app.post("/api/blue-ocean-discovery")
 async def discover_blue_ocean_keywords(request: dict):
     """发现蓝海关键词"""
@@ -290,10 +768,15 @@ async def analyze_keyword_with_real_data(request: dict):
 @app.get("/api/business-insights/{session_id}")
 async def get_business_insights(
     session_id: str,
-    db: AsyncSession = Depends(get_db)
+    refresh: bool = False,
+    db: AsyncSession = Depends(get_read_db)
 ):
-    """获取智能商业洞察和分层机会"""
+    """获取智能商业洞察和分层机会（优先读取已保存的洞察，refresh=true时重新计算）"""
     try:
+        stored = None if refresh else await analysis_store.get_session(session_id, BUSINESS_INSIGHTS)
+        if stored is not None:
+            return stored
+        
         results = await KeywordService.get_session_results(session_id, db)
         
         # 获取所有建议词
@@ -330,17 +813,33 @@ async def get_business_insights(
                 'insights_messages': ['⚠️ 未找到有效的建议词数据，请重新进行关键词分析']
             }
         
-        # 分析建议词列表 - 强制使用5118真实数据
+        # 分析建议词列表 - 强制使用5118真实数据，已保存的关键词指标直接复用
+        metrics_memo = await analysis_store.load_metrics(BusinessAnalyzer.limit_analysis_keywords(all_suggestions))
+        known_keywords = set(metrics_memo)
         try:
-            analysis = await BusinessAnalyzer.analyze_suggestion_list_with_real_data(all_suggestions, enable_5118=True)
+            analysis = await BusinessAnalyzer.analyze_suggestion_list_with_real_data(
+                all_suggestions, 
+                enable_5118=True,
+                seed_keywords=[results['base_keyword']] if results.get('base_keyword') else None,
+                metrics_memo=metrics_memo
+            )
+            await analysis_store.save_metrics({
+                keyword: result for keyword, result in metrics_memo.items() if keyword not in known_keywords
+            })
         except Exception as e:
             logger.error(f"5118数据分析失败: {str(e)}")
             # 优雅降级，但明确标明是估算数据
-            analysis = BusinessAnalyzer.analyze_suggestion_list(all_suggestions)
+            analysis = await offloader.run_cpu(
+                BusinessAnalyzer.analyze_suggestion_list, all_suggestions, size=len(all_suggestions)
+            )
             analysis['data_source_warning'] = '⚠️ 5118真实数据获取失败，已降级为估算模式'
         
         # 生成商业洞察
-        insights = BusinessAnalyzer.generate_business_insights(analysis['top_opportunities'])
+        insights = await offloader.run_cpu(
+            BusinessAnalyzer.generate_business_insights,
+            analysis['top_opportunities'],
+            size=len(analysis['top_opportunities'])
+        )
         
         # 添加去重洞察信息
         duplicate_removed = analysis.get('duplicate_removed', 0)
@@ -351,7 +850,7 @@ async def get_business_insights(
         if 'data_source_warning' in analysis:
             insights['insights'].insert(0, analysis['data_source_warning'])
         
-        return {
+        response = {
             'session_id': session_id,
             'business_insights': insights,
             'opportunities_by_tier': insights['categories'],
@@ -368,6 +867,10 @@ async def get_business_insights(
             },
             'insights_messages': insights['insights']
         }
+        # 降级或分析失败的结果不保存，下次查看时重新尝试获取真实数据
+        if 'data_source_warning' not in analysis and 'error' not in analysis:
+            await analysis_store.save_session(session_id, BUSINESS_INSIGHTS, response)
+        return response
     except Exception as e:
         logger.error(f"商业洞察分析失败: {str(e)}")
         error_message = f"商业洞察分析失败: {str(e)}"
@@ -404,70 +907,42 @@ async def get_business_insights(
             ]
         }
 
+# 导出格式 -> (生成器工厂, 媒体类型, 扩展名)
+EXPORT_FORMATS = {
+    'excel': (lambda r: ExportService.stream_excel(r.session_id), 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx'),
+    'csv': (lambda r: ExportService.stream_csv(r.session_id), 'text/csv', 'csv'),
+    'json': (lambda r: ExportService.stream_json(r.session_id), 'application/json', 'json'),
+    'ndjson': (lambda r: ExportService.stream_ndjson(r.session_id), 'application/x-ndjson', 'ndjson'),
+    'parquet': (lambda r: ExportService.stream_parquet(r.session_id, r.include_metrics), 'application/vnd.apache.parquet', 'parquet'),
+    'arrow': (lambda r: ExportService.stream_arrow(r.session_id, r.include_metrics), 'application/vnd.apache.arrow.stream', 'arrows')
+}
+COLUMNAR_FORMATS = {'parquet', 'arrow'}
+
 @app.post("/api/export")
 async def export_results(
     request: ExportRequest,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
-    """导出分析结果"""
+    """导出分析结果（流式输出，内存占用与会话大小无关）"""
     try:
-        results = await KeywordService.get_session_results(request.session_id, db)
+        if request.format not in EXPORT_FORMATS:
+            raise HTTPException(status_code=400, detail="不支持的导出格式")
         
-        # 准备导出数据
-        export_data = []
-        for variant_type, variants in results['results'].items():
-            for variant_keyword, suggestions in variants.items():
-                for rank, suggestion in enumerate(suggestions, 1):
-                    export_data.append({
-                        '变体类型': KeywordService.VARIANT_TYPES.get(variant_type, variant_type),
-                        '变体关键词': variant_keyword,
-                        '下拉建议词': suggestion,
-                        '排序': rank
-                    })
+        if request.format in COLUMNAR_FORMATS and not ExportService.columnar_available():
+            raise HTTPException(status_code=501, detail="服务器未安装pyarrow，无法导出列式格式")
         
-        if not export_data:
+        if not await KeywordService.session_has_results(request.session_id, db):
             raise HTTPException(status_code=404, detail="没有找到数据")
         
-        if request.format == 'excel':
-            # 导出Excel
-            df = pd.DataFrame(export_data)
-            output = io.BytesIO()
-            with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                df.to_excel(writer, index=False, sheet_name='关键词分析结果')
-            output.seek(0)
-            
-            return StreamingResponse(
-                io.BytesIO(output.read()),
-                media_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-                headers={"Content-Disposition": f"attachment; filename=keywords_{request.session_id}.xlsx"}
-            )
-            
-        elif request.format == 'csv':
-            # 导出CSV
-            df = pd.DataFrame(export_data)
-            output = io.StringIO()
-            df.to_csv(output, index=False, encoding='utf-8-sig')
-            output.seek(0)
-            
-            return StreamingResponse(
-                io.BytesIO(output.getvalue().encode('utf-8-sig')),
-                media_type='text/csv',
-                headers={"Content-Disposition": f"attachment; filename=keywords_{request.session_id}.csv"}
-            )
-            
-        elif request.format == 'json':
-            # 导出JSON
-            json_data = json.dumps(export_data, ensure_ascii=False, indent=2)
-            
-            return StreamingResponse(
-                io.BytesIO(json_data.encode('utf-8')),
-                media_type='application/json',
-                headers={"Content-Disposition": f"attachment; filename=keywords_{request.session_id}.json"}
-            )
-        
-        else:
-            raise HTTPException(status_code=400, detail="不支持的导出格式")
+        generator_factory, media_type, extension = EXPORT_FORMATS[request.format]
+        return StreamingResponse(
+            generator_factory(request),
+            media_type=media_type,
+            headers={"Content-Disposition": f"attachment; filename=keywords_{request.session_id}.{extension}"}
+        )
             
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"导出失败: {str(e)}")
         raise HTTPException(status_code=500, detail=f"导出失败: {str(e)}")
@@ -34,4 +34,76 @@ class ProgressUpdate(BaseModel):
     
 class ExportRequest(BaseModel):
     session_id: str
-    format: str  # 'excel', 'csv', 'json'
\ No newline at end of file
+    format: str  # 'excel', 'csv', 'json', 'ndjson', 'parquet', 'arrow'
+    include_metrics: bool = False  # 列式导出时附带商业价值指标列
+
+class JobSubmitResponse(BaseModel):
+    session_id: str
+    status: str
+    queued_jobs: int
+
+class JobStatusResponse(BaseModel):
+    session_id: str
+    status: str  # pending, running, completed, failed
+    processed: int = 0
+    total: int = 0
+    percentage: float = 0.0
+    error: Optional[str] = None
+    results: Optional[Dict[str, Dict[str, List[str]]]] = None
+
+class BatchScoreRequest(BaseModel):
+    keywords: List[str]
+    suggestions_count: int = 0
+
+class BatchScoreResponse(BaseModel):
+    count: int
+    columns: Dict[str, List[Any]]  # 列名 -> 逐行取值
+
+class BatchAnalysisRequest(BaseModel):
+    keywords: List[str]  # 种子词列表
+    variant_types: List[str]
+
+class BatchSubmitResponse(BaseModel):
+    batch_id: str
+    status: str
+    sessions: Dict[str, str]  # 种子词 -> session_id
+    duplicate_seeds_removed: int = 0
+
+class BatchSeedStatus(BaseModel):
+    keyword: str
+    session_id: str
+    status: str
+    processed: int = 0
+    total: int = 0
+    percentage: float = 0.0
+    error: Optional[str] = None
+
+class BatchStatusResponse(BaseModel):
+    batch_id: str
+    status: str  # running, completed, failed
+    processed: int = 0  # 去重后已抓取的变体词数
+    total: int = 0
+    percentage: float = 0.0
+    error: Optional[str] = None
+    seeds: List[BatchSeedStatus]
+    summary: Optional[Dict[str, Any]] = None
+
+class ExpansionRequest(BaseModel):
+    keyword: str
+    variant_types: List[str] = ['alpha']  # 第0层使用的变体类型
+    max_depth: Optional[int] = None  # 为空时使用服务端默认配置
+    max_nodes: Optional[int] = None
+    min_yield: Optional[float] = None
+    child_variant_types: List[str] = []  # 新种子除自身外追加查询的变体类型
+
+class ExpansionResponse(BaseModel):
+    session_id: str
+    base_keyword: str
+    nodes_fetched: int
+    frontier_remaining: int
+    max_depth_reached: int
+    total_suggestions: int
+    total_discovered: int
+    depth_distribution: Dict[int, int]
+    stop_reason: str  # node_budget, low_yield, exhausted
+    top_opportunities: List[Dict[str, Any]]
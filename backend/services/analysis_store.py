@@ -0,0 +1,182 @@
+"""
+商业分析结果持久化
+按关键词保存5118真实数据分析指标，按会话保存聚合后的商业分析与商业洞察，
+重复查看会话时直接读取，不再请求上游
+"""
+import json
+import time
+import logging
+from typing import Dict, List, Optional
+from sqlalchemy import select, delete
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from database import AsyncSessionLocal, AsyncReadSessionLocal, KeywordMetricsEntry, SessionAnalysis
+from services.business_analyzer import BusinessMetrics
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+BUSINESS_ANALYSIS = 'business_analysis'
+BUSINESS_INSIGHTS = 'insights'
+
+_METRIC_FIELDS = (
+    'commercial_score', 'intent_type', 'competition_level', 'search_volume_estimate',
+    'difficulty_score', 'opportunity_score', 'is_blue_ocean', 'real_data_available'
+)
+
+class AnalysisStore:
+    """商业分析结果存储"""
+
+    def __init__(
+        self,
+        ttl: int = settings.ANALYSIS_STORE_TTL,
+        enabled: bool = settings.ANALYSIS_STORE_ENABLED
+    ):
+        self.ttl = ttl
+        self.enabled = enabled
+        self._writes_since_evict = 0
+        self.stats = {
+            'session_hits': 0,
+            'session_misses': 0,
+            'metrics_hits': 0,
+            'metrics_misses': 0,
+            'metrics_writes': 0
+        }
+
+    def _is_fresh(self, timestamp: Optional[float]) -> bool:
+        return timestamp is not None and time.time() - timestamp < self.ttl
+
+    async def get_session(self, session_id: str, kind: str) -> Optional[Dict]:
+        """读取会话聚合结果，不存在或已过期返回None"""
+        if not self.enabled:
+            return None
+        try:
+            async with AsyncReadSessionLocal() as db:
+                row = (await db.execute(
+                    select(SessionAnalysis.payload, SessionAnalysis.computed_at).where(
+                        SessionAnalysis.session_id == session_id,
+                        SessionAnalysis.kind == kind
+                    )
+                )).first()
+        except Exception as e:
+            logger.warning(f"读取会话分析结果失败: {session_id}, 错误: {e}")
+            row = None
+
+        if row is not None and self._is_fresh(row.computed_at):
+            self.stats['session_hits'] += 1
+            return json.loads(row.payload)
+        self.stats['session_misses'] += 1
+        return None
+
+    async def save_session(self, session_id: str, kind: str, payload: Dict):
+        """保存会话聚合结果（覆盖旧结果）"""
+        if not self.enabled:
+            return
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.merge(SessionAnalysis(
+                    session_id=session_id,
+                    kind=kind,
+                    payload=json.dumps(payload, ensure_ascii=False),
+                    computed_at=time.time()
+                ))
+                await db.commit()
+        except Exception as e:
+            logger.warning(f"保存会话分析结果失败: {session_id}, 错误: {e}")
+
+    async def load_metrics(self, keywords: List[str]) -> Dict[str, Dict]:
+        """
+        读取关键词指标，返回可直接作为metrics_memo使用的 关键词 -> 分析结果
+
+        只返回未过期的条目
+        """
+        if not self.enabled or not keywords:
+            return {}
+
+        unique = list(dict.fromkeys(keywords))
+        memo: Dict[str, Dict] = {}
+        try:
+            async with AsyncReadSessionLocal() as db:
+                # 分批查询，避免超过SQLite参数上限
+                for start in range(0, len(unique), 500):
+                    rows = await db.execute(
+                        select(KeywordMetricsEntry).where(
+                            KeywordMetricsEntry.keyword.in_(unique[start:start + 500])
+                        )
+                    )
+                    for entry in rows.scalars():
+                        if not self._is_fresh(entry.analyzed_at):
+                            continue
+                        memo[entry.keyword] = {
+                            'keyword': entry.keyword,
+                            'metrics': BusinessMetrics(**{field: getattr(entry, field) for field in _METRIC_FIELDS}),
+                            'success': True
+                        }
+        except Exception as e:
+            logger.warning(f"读取关键词指标失败: {e}")
+
+        self.stats['metrics_hits'] += len(memo)
+        self.stats['metrics_misses'] += len(unique) - len(memo)
+        return memo
+
+    async def save_metrics(self, memo: Dict[str, Dict]):
+        """
+        保存新产生的分析结果中基于真实数据的部分
+
+        估算结果不保存，5118恢复后仍会重新请求真实数据
+        """
+        if not self.enabled:
+            return
+        analyzed_at = time.time()
+        rows = [
+            {
+                'keyword': keyword,
+                **{field: getattr(result['metrics'], field) for field in _METRIC_FIELDS},
+                'analyzed_at': analyzed_at
+            }
+            for keyword, result in memo.items()
+            if result['success'] and result['metrics'].real_data_available
+        ]
+        if not rows:
+            return
+
+        try:
+            async with AsyncSessionLocal() as db:
+                for start in range(0, len(rows), 500):
+                    stmt = sqlite_insert(KeywordMetricsEntry).values(rows[start:start + 500])
+                    await db.execute(stmt.on_conflict_do_update(
+                        index_elements=[KeywordMetricsEntry.keyword],
+                        set_={column: stmt.excluded[column] for column in (*_METRIC_FIELDS, 'analyzed_at')}
+                    ))
+                await db.commit()
+        except Exception as e:
+            logger.warning(f"保存关键词指标失败: {e}")
+            return
+
+        self.stats['metrics_writes'] += len(rows)
+        self._writes_since_evict += len(rows)
+        if self._writes_since_evict >= 500:
+            self._writes_since_evict = 0
+            await self.evict()
+
+    async def evict(self) -> int:
+        """清理过期的关键词指标"""
+        try:
+            async with AsyncSessionLocal() as db:
+                expired = await db.execute(
+                    delete(KeywordMetricsEntry).where(KeywordMetricsEntry.analyzed_at < time.time() - self.ttl)
+                )
+                await db.commit()
+            return expired.rowcount or 0
+        except Exception as e:
+            logger.warning(f"清理关键词指标失败: {e}")
+            return 0
+
+    def get_stats(self) -> Dict:
+        return {
+            **self.stats,
+            'ttl': self.ttl,
+            'enabled': self.enabled
+        }
+
+# 进程级共享实例
+analysis_store = AnalysisStore()
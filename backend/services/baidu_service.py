@@ -3,29 +3,37 @@ import asyncio
 import json
 import re
 from urllib.parse import quote
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple, AsyncIterator
 from fake_useragent import UserAgent
 from config import settings
+from services.suggestion_cache import suggestion_cache
+from services.single_flight import baidu_flight
+from services.http_pool import http_pool
+from services.rate_controller import baidu_rate_controller
 import random
 import logging
 
 logger = logging.getLogger(__name__)
 
 class BaiduSuggestService:
-    def __init__(self):
+    def __init__(self, client: Optional[httpx.AsyncClient] = None):
         self.ua = UserAgent()
-        self.session = None
+        self.session = client
+        self._client = client  # 调用方传入的客户端，由调用方负责关闭
+        self._lease = None
         
     async def __aenter__(self):
-        self.session = httpx.AsyncClient(
-            timeout=httpx.Timeout(settings.REQUEST_TIMEOUT),
-            follow_redirects=True
-        )
+        # 优先复用应用级连接池，未启动时（如脚本调用）共享临时客户端
+        if self._client is None:
+            self._lease = http_pool.baidu()
+            self.session = await self._lease.__aenter__()
         return self
         
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        if self.session:
-            await self.session.aclose()
+        if self._lease is not None:
+            lease, self._lease = self._lease, None
+            self.session = None
+            await lease.__aexit__(exc_type, exc_val, exc_tb)
     
     def _get_headers(self) -> Dict[str, str]:
         """生成随机请求头"""
@@ -75,7 +83,31 @@ class BaiduSuggestService:
         """获取关键词建议"""
         if max_retries is None:
             max_retries = settings.MAX_RETRIES
-            
+        
+        # 优先读取缓存
+        cached = await suggestion_cache.get(keyword)
+        if cached is not None:
+            return cached
+        
+        # 同一关键词的并发请求合并为一次上游调用（含重试）
+        suggestions = await baidu_flight.do(
+            suggestion_cache.cache_key(keyword),
+            lambda: self._fetch_shared(keyword, max_retries)
+        )
+        return list(suggestions)
+    
+    async def _fetch_shared(self, keyword: str, max_retries: int) -> List[str]:
+        """合并请求的共享任务自行取得客户端，发起方退出上下文后其他等待者仍可完成"""
+        if self._client is not None:
+            return await self._fetch_suggestions(keyword, max_retries, self._client)
+        async with http_pool.baidu() as client:
+            return await self._fetch_suggestions(keyword, max_retries, client)
+    
+    async def _fetch_suggestions(
+        self, keyword: str, max_retries: int, client: Optional[httpx.AsyncClient] = None
+    ) -> List[str]:
+        """请求百度接口（带重试），成功后写入缓存"""
+        client = client or self.session
         for attempt in range(max_retries):
             try:
                 # 随机延迟
@@ -86,29 +118,38 @@ class BaiduSuggestService:
                 params = self._build_params(keyword)
                 headers = self._get_headers()
                 
-                response = await self.session.get(
-                    settings.BAIDU_SUGGEST_URL,
-                    params=params,
-                    headers=headers
-                )
+                # 由自适应控制器决定当前允许的并发
+                async with baidu_rate_controller.slot():
+                    response = await client.get(
+                        settings.BAIDU_SUGGEST_URL,
+                        params=params,
+                        headers=headers
+                    )
                 
                 if response.status_code == 200:
                     data = self._parse_jsonp_response(response.text)
                     if data and 'g' in data:
+                        baidu_rate_controller.record_success()
                         suggestions = []
                         for item in data['g']:
                             if 'q' in item:
                                 suggestions.append(item['q'])
+                        await suggestion_cache.set(keyword, suggestions)
                         return suggestions
                     else:
+                        baidu_rate_controller.record_failure("响应数据格式异常")
                         logger.warning(f"响应数据格式异常: {keyword}")
                         
                 else:
+                    baidu_rate_controller.record_failure(f"HTTP {response.status_code}")
                     logger.warning(f"请求失败 {response.status_code}: {keyword}")
                     
             except httpx.TimeoutException:
+                baidu_rate_controller.record_failure("超时")
                 logger.warning(f"请求超时 (尝试 {attempt + 1}/{max_retries}): {keyword}")
             except Exception as e:
+                # 连接重置、DNS失败等同样说明上游异常，需要退避
+                baidu_rate_controller.record_failure(type(e).__name__)
                 logger.error(f"请求异常 (尝试 {attempt + 1}/{max_retries}): {keyword}, 错误: {e}")
         
         logger.error(f"获取建议词失败，已重试 {max_retries} 次: {keyword}")
@@ -116,23 +157,40 @@ class BaiduSuggestService:
     
     async def batch_get_suggestions(self, keywords: List[str], concurrency: int = 3) -> Dict[str, List[str]]:
         """批量获取关键词建议"""
-        semaphore = asyncio.Semaphore(concurrency)
+        suggestions_dict = {}
+        async for keyword, suggestions in self.iter_suggestions(keywords, concurrency):
+            suggestions_dict[keyword] = suggestions
+                
+        return suggestions_dict
+    
+    async def iter_suggestions(self, keywords: List[str], concurrency: int = 3) -> AsyncIterator[Tuple[str, List[str]]]:
+        """全局工作队列抓取建议词，按完成顺序逐个产出 (关键词, 建议词)"""
+        if not keywords:
+            return
         
-        async def get_with_semaphore(keyword: str):
-            async with semaphore:
-                suggestions = await self.get_suggestions(keyword)
-                return keyword, suggestions
+        work_queue: asyncio.Queue = asyncio.Queue()
+        for keyword in keywords:
+            work_queue.put_nowait(keyword)
+        done_queue: asyncio.Queue = asyncio.Queue()
         
-        tasks = [get_with_semaphore(keyword) for keyword in keywords]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        async def worker():
+            while True:
+                try:
+                    keyword = work_queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                try:
+                    suggestions = await self.get_suggestions(keyword)
+                except Exception as e:
+                    logger.error(f"批量获取异常: {keyword}, 错误: {e}")
+                    suggestions = []
+                await done_queue.put((keyword, suggestions))
         
-        # 处理结果
-        suggestions_dict = {}
-        for result in results:
-            if isinstance(result, tuple):
-                keyword, suggestions = result
-                suggestions_dict[keyword] = suggestions
-            else:
-                logger.error(f"批量获取异常: {result}")
-                
-        return suggestions_dict
\ No newline at end of file
+        workers = [asyncio.create_task(worker()) for _ in range(max(1, min(concurrency, len(keywords))))]
+        try:
+            for _ in range(len(keywords)):
+                yield await done_queue.get()
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
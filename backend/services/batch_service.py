@@ -0,0 +1,158 @@
+"""
+多种子词批量分析服务
+一批种子词共享一次去重后的抓取与5118富化，每个种子词仍对应独立的会话和历史记录
+"""
+import json
+import uuid
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set
+from sqlalchemy import update
+from database import AsyncSessionLocal, SearchHistory
+from services.keyword_service import KeywordService
+from services.job_service import JobQueueFullError, ProgressFactory, StatusHook
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+class BatchAnalysisManager:
+    """批量分析任务管理"""
+
+    def __init__(
+        self,
+        max_running: int = settings.BATCH_MAX_RUNNING,
+        max_seeds: int = settings.BATCH_MAX_SEEDS,
+        max_batches: int = 100,
+        progress_factory: Optional[ProgressFactory] = None,
+        status_hook: Optional[StatusHook] = None
+    ):
+        self.max_running = max_running
+        self.max_seeds = max_seeds
+        self.max_batches = max_batches  # 保留的批次记录数
+        self.progress_factory = progress_factory
+        self.status_hook = status_hook
+        self._batches: "OrderedDict[str, Dict]" = OrderedDict()
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def submit(self, keywords: List[str], variant_types: List[str]) -> Dict:
+        """
+        提交批量分析，立即返回batch_id与 种子词 -> session_id
+
+        Raises:
+            ValueError: 种子词为空或超过上限
+            JobQueueFullError: 运行中的批次已达上限
+        """
+        seeds = KeywordService.normalize_seeds(keywords)
+        if not seeds:
+            raise ValueError("种子词不能为空")
+        if len(seeds) > self.max_seeds:
+            raise ValueError(f"种子词数量超过上限 {self.max_seeds}")
+        if len(self._tasks) >= self.max_running:
+            raise JobQueueFullError(f"运行中的批量分析已达上限 ({self.max_running})")
+
+        batch_id = str(uuid.uuid4())
+        seed_sessions = {seed: str(uuid.uuid4()) for seed in seeds}
+        async with AsyncSessionLocal() as db:
+            db.add_all([
+                SearchHistory(
+                    session_id=session_id,
+                    original_keyword=seed,
+                    variant_types=json.dumps(variant_types),
+                    total_suggestions=0,
+                    status="pending"
+                )
+                for seed, session_id in seed_sessions.items()
+            ])
+            await db.commit()
+
+        for session_id in seed_sessions.values():
+            self._notify(session_id, "pending")
+
+        batch = {
+            'batch_id': batch_id,
+            'status': 'running',
+            'variant_types': variant_types,
+            'sessions': seed_sessions,
+            'duplicate_seeds_removed': len([kw for kw in keywords if kw and kw.strip()]) - len(seeds),
+            'summary': None,
+            'error': None
+        }
+        self._remember(batch_id, batch)
+
+        task = asyncio.create_task(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return batch
+
+    def get(self, batch_id: str) -> Optional[Dict]:
+        return self._batches.get(batch_id)
+
+    async def stop(self):
+        """取消运行中的批次（对应会话标记为失败）"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def _run(self, batch: Dict):
+        batch_id = batch['batch_id']
+        self._notify(batch_id, "running")
+        progress_callback = self.progress_factory(batch_id) if self.progress_factory else None
+        try:
+            async with AsyncSessionLocal() as db:
+                batch['summary'] = await KeywordService.analyze_keywords_batch(
+                    batch['sessions'],
+                    batch['variant_types'],
+                    db,
+                    progress_factory=self.progress_factory,
+                    batch_progress_callback=progress_callback,
+                    status_hook=self.status_hook
+                )
+            batch['status'] = 'completed'
+            self._notify(batch_id, "completed")
+        except asyncio.CancelledError:
+            batch['status'] = 'failed'
+            batch['error'] = '服务关闭，批量分析已中断'
+            await asyncio.shield(self._fail_unfinished(list(batch['sessions'].values())))
+            raise
+        except Exception as e:
+            logger.error(f"批量分析失败 {batch_id}: {str(e)}")
+            batch['status'] = 'failed'
+            batch['error'] = str(e)
+            self._notify(batch_id, "failed", str(e))
+
+    async def _fail_unfinished(self, session_ids: List[str]):
+        """批次被中断时，将未完成的种子词会话标记为失败（任务队列的启动恢复不处理批量会话）"""
+        try:
+            async with AsyncSessionLocal() as db:
+                for start in range(0, len(session_ids), 500):
+                    await db.execute(
+                        update(SearchHistory)
+                        .where(
+                            SearchHistory.session_id.in_(session_ids[start:start + 500]),
+                            SearchHistory.status.in_(["pending", "running"])
+                        )
+                        .values(status="failed")
+                    )
+                await db.commit()
+        except Exception as e:
+            logger.error(f"标记中断批次的会话失败: {e}")
+
+    def _notify(self, session_id: str, status: str, error: Optional[str] = None):
+        if self.status_hook:
+            self.status_hook(session_id, status, error)
+
+    def _remember(self, batch_id: str, batch: Dict):
+        """保存批次记录，超出容量时淘汰最早结束的批次"""
+        self._batches[batch_id] = batch
+        overflow = len(self._batches) - self.max_batches
+        for finished_id in [bid for bid, b in self._batches.items() if b['status'] != 'running'][:max(overflow, 0)]:
+            del self._batches[finished_id]
+
+    def get_stats(self):
+        return {
+            'running_batches': len(self._tasks),
+            'max_running': self.max_running,
+            'max_seeds': self.max_seeds,
+            'tracked_batches': len(self._batches)
+        }
@@ -5,13 +5,19 @@
 """
 import re
 import math
+import numpy as np
 import logging
 from typing import Dict, List, Tuple, Optional
 from dataclasses import dataclass
-from services.five118_service import FiveOneOneEightService, KeywordData5118
+from functools import lru_cache
+from config import settings
+from services.five118_service import FiveOneOneEightService, KeywordData5118, normalize_keyword
+from services.keyword_matcher import KeywordMatcher
 
 logger = logging.getLogger(__name__)
 
+MAX_ANALYZE_COUNT = 20  # 单个建议词列表最多使用真实数据分析的关键词数
+
 @dataclass
 class BusinessMetrics:
     """商业指标数据类"""
@@ -24,6 +30,21 @@ class BusinessMetrics:
     is_blue_ocean: bool = False  # 是否为蓝海词
     real_data_available: bool = False  # 是否有真实数据
     
+@dataclass(frozen=True)
+class KeywordFeatures:
+    """关键词词法特征（估算模式各指标共用）"""
+    length: int
+    commercial_high: int     # 命中高商业意图词数
+    commercial_medium: int   # 命中中商业意图词数
+    commercial_low: int      # 命中低商业意图词数
+    has_navigation: bool
+    has_location: bool
+    has_industry: bool
+    has_digit: bool
+    has_unit: bool
+    commercial_score: float  # 未取整的商业价值评分
+    intent_type: str
+
 @dataclass 
 class BlueOceanKeyword:
     """蓝海关键词数据"""
@@ -66,6 +87,44 @@ class BusinessAnalyzer:
         'technology': ['软件', '系统', '技术', '开发', '程序', 'AI', '数据', '云计算'],
         'real_estate': ['房产', '楼盘', '租房', '买房', '装修', '家具', '建材', '物业']
     }
+    
+    # 地域词库
+    LOCATION_KEYWORDS = ['北京', '上海', '广州', '深圳', '杭州', '成都', '武汉', '西安', 
+                         '附近', '本地', '当地', '周边', '市', '区', '县', '镇']
+    
+    # 导航意图词库
+    NAVIGATION_KEYWORDS = ['官网', '网站', '登录', '首页', '主页', '入口']
+    
+    # 时间/金额单位字符
+    UNIT_CHARS = frozenset(['年', '月', '日', '元', '万', '千', '百'])
+    
+    # SEM流量特点意图信号
+    SEM_INTENT_SIGNALS = {
+        'transaction': ['购买', '买', '价格', '优惠', '促销', '团购'],
+        'commercial': ['品牌', '推荐', '评测', '对比', '排行', '哪家好'],
+        'info': ['什么', '怎么', '如何', '教程', '方法']
+    }
+    
+    # 所有词典编译后的多模式匹配器（见模块末尾）
+    MATCHER: KeywordMatcher = None
+    
+    @staticmethod
+    def _build_matcher() -> KeywordMatcher:
+        """将各词典编译为一个Aho-Corasick自动机，类别名带词典前缀"""
+        dictionaries = {}
+        for level, words in BusinessAnalyzer.COMMERCIAL_KEYWORDS.items():
+            dictionaries[f'commercial:{level}'] = words
+        for industry, words in BusinessAnalyzer.INDUSTRY_KEYWORDS.items():
+            dictionaries[f'industry:{industry}'] = words
+        dictionaries['location'] = BusinessAnalyzer.LOCATION_KEYWORDS
+        dictionaries['navigation'] = BusinessAnalyzer.NAVIGATION_KEYWORDS
+        for intent, words in BusinessAnalyzer.SEM_INTENT_SIGNALS.items():
+            dictionaries[f'sem:{intent}'] = words
+        return KeywordMatcher(dictionaries)
+    
+    @staticmethod
+    def _has_industry(matches: Dict) -> bool:
+        return any(category.startswith('industry:') for category in matches)
 
     @staticmethod
     async def analyze_with_real_data(keyword: str, enable_5118: bool = True) -> BusinessMetrics:
@@ -91,6 +150,42 @@ class BusinessAnalyzer:
         # 回退到估算模式
         return BusinessAnalyzer.analyze_keyword(keyword)
     
+    @staticmethod
+    def _derive_stems(suggestions: List[str], max_stems: int = 3) -> List[str]:
+        """从建议词中提取少量词干作为5118批量查询的种子"""
+        normalized = [normalize_keyword(s) for s in suggestions if normalize_keyword(s)]
+        if not normalized:
+            return []
+        
+        # 优先使用公共前缀（通常就是原始关键词）
+        prefix = normalized[0]
+        for text in normalized[1:]:
+            while not text.startswith(prefix):
+                prefix = prefix[:-1]
+            if not prefix:
+                break
+        if len(prefix) >= 2:
+            return [prefix]
+        
+        # 否则取出现最多的双字前缀
+        prefix_counts: Dict[str, int] = {}
+        for text in normalized:
+            if len(text) >= 2:
+                prefix_counts[text[:2]] = prefix_counts.get(text[:2], 0) + 1
+        return sorted(prefix_counts, key=prefix_counts.get, reverse=True)[:max_stems]
+    
+    @staticmethod
+    async def build_enrichment_index(seed_keywords: List[str]) -> Dict[str, KeywordData5118]:
+        """按种子词批量获取5118相关词数据，构建内存索引"""
+        if not seed_keywords:
+            return {}
+        try:
+            async with FiveOneOneEightService() as service:
+                return await service.build_keyword_index(seed_keywords, page_size=100)
+        except Exception as e:
+            logger.error(f"5118索引构建失败: {e}")
+            return {}
+    
     @staticmethod
     def _analyze_with_5118_data(kw_data: KeywordData5118) -> BusinessMetrics:
         """基于5118真实数据进行分析"""
@@ -172,17 +267,15 @@ class BusinessAnalyzer:
     @staticmethod
     def _analyze_intent_from_sem_data(kw_data: KeywordData5118) -> str:
         """基于SEM数据分析用户意图"""
-        sem_reason = kw_data.sem_reason.lower()
-        keyword = kw_data.keyword.lower()
+        sem_matches = BusinessAnalyzer.MATCHER.match(kw_data.sem_reason.lower())
+        keyword_matches = BusinessAnalyzer.MATCHER.match(kw_data.keyword.lower())
         
         # 交易型意图判断
-        transaction_signals = ['购买', '买', '价格', '优惠', '促销', '团购']
-        if any(signal in sem_reason or signal in keyword for signal in transaction_signals):
+        if 'sem:transaction' in sem_matches or 'sem:transaction' in keyword_matches:
             return "交易型"
         
         # 商业型意图判断  
-        commercial_signals = ['品牌', '推荐', '评测', '对比', '排行', '哪家好']
-        if any(signal in sem_reason or signal in keyword for signal in commercial_signals):
+        if 'sem:commercial' in sem_matches or 'sem:commercial' in keyword_matches:
             return "商业型"
         
         # 基于竞价活跃度判断
@@ -192,8 +285,7 @@ class BusinessAnalyzer:
             return "交易型"
         
         # 信息型意图
-        info_signals = ['什么', '怎么', '如何', '教程', '方法']
-        if any(signal in keyword for signal in info_signals):
+        if 'sem:info' in keyword_matches:
             return "信息型"
         
         return "混合型"
@@ -331,24 +423,26 @@ class BusinessAnalyzer:
 
     # 保留原有的估算方法作为后备
     @staticmethod
-    def calculate_commercial_score(keyword: str) -> float:
-        """计算商业价值评分（估算模式）"""
+    @lru_cache(maxsize=settings.FEATURE_CACHE_SIZE)
+    def extract_features(keyword: str) -> KeywordFeatures:
+        """一次扫描提取关键词的全部词法特征（按关键词缓存）"""
+        matches = BusinessAnalyzer.MATCHER.match(keyword)
+        high = len(matches.get('commercial:high', ()))
+        medium = len(matches.get('commercial:medium', ()))
+        low = len(matches.get('commercial:low', ()))
+        has_navigation = 'navigation' in matches
+        has_location = 'location' in matches
+        has_industry = BusinessAnalyzer._has_industry(matches)
+        has_digit = re.search(r'\d+', keyword) is not None
+        has_unit = not BusinessAnalyzer.UNIT_CHARS.isdisjoint(keyword)
+        length = len(keyword)
+        
         score = 0.0
-        keyword_lower = keyword.lower()
         
         # 1. 商业意图词权重 (40分)
-        for intent_level, words in BusinessAnalyzer.COMMERCIAL_KEYWORDS.items():
-            for word in words:
-                if word in keyword:
-                    if intent_level == 'high':
-                        score += 15
-                    elif intent_level == 'medium':
-                        score += 8
-                    elif intent_level == 'low':
-                        score += 3
+        score += 15 * high + 8 * medium + 3 * low
         
         # 2. 关键词长度评分 (20分)
-        length = len(keyword)
         if length >= 8:
             score += 20
         elif length >= 5:
@@ -359,56 +453,58 @@ class BusinessAnalyzer:
             score += 5
             
         # 3. 数字和特殊符号评分 (15分)
-        if re.search(r'\d+', keyword):
+        if has_digit:
             score += 10
-        if any(char in keyword for char in ['年', '月', '日', '元', '万', '千', '百']):
+        if has_unit:
             score += 5
             
         # 4. 地域性评分 (15分)
-        location_words = ['北京', '上海', '广州', '深圳', '杭州', '成都', '武汉', '西安', 
-                         '附近', '本地', '当地', '周边', '市', '区', '县', '镇']
-        if any(loc in keyword for loc in location_words):
+        if has_location:
             score += 15
             
         # 5. 行业热度评分 (10分)
-        for industry, words in BusinessAnalyzer.INDUSTRY_KEYWORDS.items():
-            if any(word in keyword for word in words):
-                score += 10
-                break
+        if has_industry:
+            score += 10
         
-        return min(score, 100.0)
+        # 意图优先级：交易型 > 商业型 > 信息型 > 导航型
+        if high:
+            intent_type = "交易型"
+        elif medium:
+            intent_type = "商业型"
+        elif low:
+            intent_type = "信息型"
+        elif has_navigation:
+            intent_type = "导航型"
+        else:
+            intent_type = "混合型"
+        
+        return KeywordFeatures(
+            length=length,
+            commercial_high=high,
+            commercial_medium=medium,
+            commercial_low=low,
+            has_navigation=has_navigation,
+            has_location=has_location,
+            has_industry=has_industry,
+            has_digit=has_digit,
+            has_unit=has_unit,
+            commercial_score=min(score, 100.0),
+            intent_type=intent_type
+        )
+    
+    @staticmethod
+    def calculate_commercial_score(keyword: str) -> float:
+        """计算商业价值评分（估算模式）"""
+        return BusinessAnalyzer.extract_features(keyword).commercial_score
     
     @staticmethod
     def analyze_user_intent(keyword: str) -> str:
         """分析用户意图类型（估算模式）"""
-        keyword_lower = keyword.lower()
-        
-        # 交易型意图
-        transaction_words = BusinessAnalyzer.COMMERCIAL_KEYWORDS['high']
-        if any(word in keyword for word in transaction_words):
-            return "交易型"
-        
-        # 商业型意图  
-        commercial_words = BusinessAnalyzer.COMMERCIAL_KEYWORDS['medium']
-        if any(word in keyword for word in commercial_words):
-            return "商业型"
-        
-        # 信息型意图
-        info_words = BusinessAnalyzer.COMMERCIAL_KEYWORDS['low']
-        if any(word in keyword for word in info_words):
-            return "信息型"
-        
-        # 导航型意图
-        navigation_words = ['官网', '网站', '登录', '首页', '主页', '入口']
-        if any(word in keyword for word in navigation_words):
-            return "导航型"
-        
-        return "混合型"
+        return BusinessAnalyzer.extract_features(keyword).intent_type
     
     @staticmethod
-    def estimate_competition_level(keyword: str, suggestions_count: int) -> str:
-        """估算竞争激烈度（估算模式）"""
-        commercial_score = BusinessAnalyzer.calculate_commercial_score(keyword)
+    def _competition_from_features(features: KeywordFeatures, suggestions_count: int) -> str:
+        commercial_score = features.commercial_score
         
         if commercial_score >= 70 and suggestions_count >= 8:
             return "激烈"
@@ -420,13 +516,11 @@ class BusinessAnalyzer:
             return "很低"
     
     @staticmethod
-    def estimate_search_volume(keyword: str, suggestions_count: int) -> int:
-        """估算搜索量（估算模式）"""
+    def _search_volume_from_features(features: KeywordFeatures, suggestions_count: int) -> int:
         base_volume = 1000
         
-        length_factor = max(0.5, 2.0 - len(keyword) * 0.1)
-        commercial_score = BusinessAnalyzer.calculate_commercial_score(keyword)
-        commercial_factor = 1.0 + (commercial_score / 100.0)
+        length_factor = max(0.5, 2.0 - features.length * 0.1)
+        commercial_factor = 1.0 + (features.commercial_score / 100.0)
         suggestions_factor = 1.0 + (suggestions_count * 0.1)
         
         estimated_volume = int(base_volume * length_factor * commercial_factor * suggestions_factor)
@@ -434,20 +528,36 @@ class BusinessAnalyzer:
         return min(estimated_volume, 50000)
     
     @staticmethod
-    def calculate_difficulty_score(keyword: str, suggestions_count: int) -> float:
-        """计算SEO难度评分（估算模式）"""
-        commercial_score = BusinessAnalyzer.calculate_commercial_score(keyword)
-        
-        difficulty = commercial_score * 0.6
+    def _difficulty_from_features(features: KeywordFeatures, suggestions_count: int) -> float:
+        difficulty = features.commercial_score * 0.6
         difficulty += min(suggestions_count * 2, 30)
         
-        for industry, words in BusinessAnalyzer.INDUSTRY_KEYWORDS.items():
-            if any(word in keyword for word in words):
-                difficulty += 10
-                break
+        if features.has_industry:
+            difficulty += 10
         
         return min(difficulty, 100.0)
     
+    @staticmethod
+    def estimate_competition_level(keyword: str, suggestions_count: int) -> str:
+        """估算竞争激烈度（估算模式）"""
+        return BusinessAnalyzer._competition_from_features(
+            BusinessAnalyzer.extract_features(keyword), suggestions_count
+        )
+    
+    @staticmethod
+    def estimate_search_volume(keyword: str, suggestions_count: int) -> int:
+        """估算搜索量（估算模式）"""
+        return BusinessAnalyzer._search_volume_from_features(
+            BusinessAnalyzer.extract_features(keyword), suggestions_count
+        )
+    
+    @staticmethod
+    def calculate_difficulty_score(keyword: str, suggestions_count: int) -> float:
+        """计算SEO难度评分（估算模式）"""
+        return BusinessAnalyzer._difficulty_from_features(
+            BusinessAnalyzer.extract_features(keyword), suggestions_count
+        )
+    
     @staticmethod
     def calculate_opportunity_score(commercial_score: float, difficulty_score: float, 
                                    competition_level: str) -> float:
@@ -468,18 +578,18 @@ class BusinessAnalyzer:
     @staticmethod
     def analyze_keyword(keyword: str, suggestions_count: int = 0) -> BusinessMetrics:
         """综合分析关键词的商业价值（估算模式）"""
-        commercial_score = BusinessAnalyzer.calculate_commercial_score(keyword)
-        intent_type = BusinessAnalyzer.analyze_user_intent(keyword)
-        competition_level = BusinessAnalyzer.estimate_competition_level(keyword, suggestions_count)
-        search_volume_estimate = BusinessAnalyzer.estimate_search_volume(keyword, suggestions_count)
-        difficulty_score = BusinessAnalyzer.calculate_difficulty_score(keyword, suggestions_count)
+        features = BusinessAnalyzer.extract_features(keyword)
+        commercial_score = features.commercial_score
+        competition_level = BusinessAnalyzer._competition_from_features(features, suggestions_count)
+        search_volume_estimate = BusinessAnalyzer._search_volume_from_features(features, suggestions_count)
+        difficulty_score = BusinessAnalyzer._difficulty_from_features(features, suggestions_count)
         opportunity_score = BusinessAnalyzer.calculate_opportunity_score(
             commercial_score, difficulty_score, competition_level
         )
         
         return BusinessMetrics(
             commercial_score=round(commercial_score, 1),
-            intent_type=intent_type,
+            intent_type=features.intent_type,
             competition_level=competition_level,
             search_volume_estimate=search_volume_estimate,
             difficulty_score=round(difficulty_score, 1),
@@ -488,8 +598,172 @@ class BusinessAnalyzer:
         )
     
     @staticmethod
-    async def analyze_suggestion_list_with_real_data(suggestions: List[str], enable_5118: bool = True) -> Dict:
-        """使用5118真实数据分析建议词列表的整体商业价值（优化版）"""
+    def score_keywords_batch(keywords: List[str], suggestions_count=0) -> Dict[str, List]:
+        """
+        批量估算关键词商业指标，按列返回结果
+        
+        词法特征逐词提取（带缓存），其余评分以NumPy列运算完成，逐行结果与analyze_keyword一致
+        
+        Args:
+            keywords: 关键词列表
+            suggestions_count: 建议词数量，可为标量或与keywords等长的列表
+        """
+        features = [BusinessAnalyzer.extract_features(keyword) for keyword in keywords]
+        count = len(features)
+        
+        commercial = np.fromiter((f.commercial_score for f in features), dtype=np.float64, count=count)
+        length = np.fromiter((f.length for f in features), dtype=np.int64, count=count)
+        industry = np.fromiter((f.has_industry for f in features), dtype=bool, count=count)
+        suggestions = np.broadcast_to(np.asarray(suggestions_count, dtype=np.int64), (count,))
+        
+        # 竞争激烈度
+        competition = np.select(
+            [
+                (commercial >= 70) & (suggestions >= 8),
+                (commercial >= 50) & (suggestions >= 5),
+                (commercial >= 30) | (suggestions >= 3)
+            ],
+            ["激烈", "中等", "较低"],
+            default="很低"
+        )
+        
+        # 搜索量估算（运算顺序与逐词计算保持一致）
+        length_factor = np.maximum(0.5, 2.0 - length * 0.1)
+        commercial_factor = 1.0 + (commercial / 100.0)
+        suggestions_factor = 1.0 + (suggestions * 0.1)
+        volume = np.minimum((1000 * length_factor * commercial_factor * suggestions_factor).astype(np.int64), 50000)
+        
+        # SEO难度
+        difficulty = commercial * 0.6
+        difficulty = difficulty + np.minimum(suggestions * 2, 30)
+        difficulty = np.minimum(difficulty + np.where(industry, 10, 0), 100.0)
+        
+        # 机会评分
+        penalty = np.select(
+            [competition == "很低", competition == "较低", competition == "中等", competition == "激烈"],
+            [0, 5, 15, 25],
+            default=10
+        )
+        opportunity = commercial - difficulty * 0.3
+        opportunity = np.maximum(0, np.minimum(opportunity - penalty, 100.0))
+        
+        def round1(column: np.ndarray) -> List[float]:
+            # 使用Python round保证与逐词结果完全一致
+            return [round(value, 1) for value in column.tolist()]
+        
+        return {
+            'keyword': list(keywords),
+            'commercial_score': round1(commercial),
+            'intent_type': [f.intent_type for f in features],
+            'competition_level': competition.tolist(),
+            'search_volume_estimate': volume.tolist(),
+            'difficulty_score': round1(difficulty),
+            'opportunity_score': round1(opportunity)
+        }
+    
+    @staticmethod
+    async def enrich_keywords(
+        keywords: List[str],
+        enable_5118: bool = True,
+        seed_keywords: Optional[List[str]] = None,
+        enrichment_index: Optional[Dict[str, KeywordData5118]] = None,
+        metrics_memo: Optional[Dict[str, Dict]] = None,
+        suggestions_counts: Optional[Dict[str, int]] = None
+    ) -> Dict[str, Dict]:
+        """
+        为关键词补全分析结果，每个词最多分析一次
+        
+        先按种子词批量构建5118索引匹配关键词，仅对未命中的词逐个调用API；
+        结果写入并返回metrics_memo（关键词 -> {'keyword', 'metrics', 'success'}）
+        
+        Args:
+            keywords: 待分析关键词
+            enable_5118: 是否启用5118真实数据
+            seed_keywords: 批量查询种子词，为空时从关键词中提取词干
+            enrichment_index: 已构建的5118索引，传入时不再按种子词查询
+            metrics_memo: 跨调用共享的分析结果，已分析过的词不再请求
+            suggestions_counts: 关键词 -> 所属建议词列表的词数，分析失败回退估算时使用，
+                未提供时按本次去重后的关键词数估算
+        """
+        if metrics_memo is None:
+            metrics_memo = {}
+        unique_keywords = list(dict.fromkeys(keywords))
+        pending = [keyword for keyword in unique_keywords if keyword not in metrics_memo]
+        if not pending:
+            return metrics_memo
+        
+        # 批量构建5118索引
+        if enrichment_index is None:
+            enrichment_index = {}
+            if enable_5118:
+                seeds = seed_keywords or BusinessAnalyzer._derive_stems(pending)
+                enrichment_index = await BusinessAnalyzer.build_enrichment_index(seeds)
+        
+        import asyncio
+        api_calls = 0
+        
+        async def analyze_single(suggestion: str, index: int):
+            nonlocal api_calls
+            try:
+                # 索引命中直接使用真实数据，无需额外请求
+                kw_data = enrichment_index.get(normalize_keyword(suggestion))
+                if kw_data is not None:
+                    return {
+                        'keyword': suggestion,
+                        'metrics': BusinessAnalyzer._analyze_with_5118_data(kw_data),
+                        'success': True
+                    }
+                
+                # 未命中时回退到逐词查询，请求节奏由5118共享令牌桶控制
+                api_calls += 1
+                
+                logger.info(f"正在分析关键词 {index + 1}/{len(pending)}: {suggestion}")
+                metrics = await BusinessAnalyzer.analyze_with_real_data(suggestion, enable_5118)
+                
+                return {
+                    'keyword': suggestion,
+                    'metrics': metrics,
+                    'success': True
+                }
+            except Exception as e:
+                logger.error(f"分析关键词 '{suggestion}' 失败: {e}")
+                # 遇到错误时使用估算模式，但标记为非真实数据
+                suggestions_count = (suggestions_counts or {}).get(suggestion, len(unique_keywords))
+                fallback_metrics = BusinessAnalyzer.analyze_keyword(suggestion, suggestions_count)
+                fallback_metrics.real_data_available = False
+                return {
+                    'keyword': suggestion,
+                    'metrics': fallback_metrics,
+                    'success': False
+                }
+        
+        # 并发分析未缓存的关键词
+        pending_results = await asyncio.gather(*(analyze_single(suggestion, index) for index, suggestion in enumerate(pending)))
+        for suggestion, result in zip(pending, pending_results):
+            metrics_memo[suggestion] = result
+        
+        logger.info(f"5118索引命中 {len(pending) - api_calls}/{len(pending)}，逐词查询 {api_calls} 次")
+        return metrics_memo
+    
+    @staticmethod
+    def limit_analysis_keywords(suggestions: List[str]) -> List[str]:
+        """去重并截取参与真实数据分析的关键词，避免5118 API超限"""
+        unique_suggestions = list(dict.fromkeys(suggestions))  # 保持顺序的去重
+        if len(unique_suggestions) > MAX_ANALYZE_COUNT:
+            logger.warning(f"关键词数量({len(unique_suggestions)})超过限制，只分析前{MAX_ANALYZE_COUNT}个")
+        return unique_suggestions[:MAX_ANALYZE_COUNT]
+    
+    @staticmethod
+    def summarize_suggestion_list(
+        suggestions: List[str],
+        metrics_memo: Dict[str, Dict],
+        enable_5118: bool = True
+    ) -> Dict:
+        """
+        汇总建议词列表的整体商业价值，不发起请求
+        
+        参与分析的关键词须已由enrich_keywords写入metrics_memo
+        """
         if not suggestions:
             return {
                 'total_count': 0,
@@ -502,53 +776,14 @@ class BusinessAnalyzer:
         
         # 智能去重：保留原始数量用于统计，去重后进行分析
         original_count = len(suggestions)
-        unique_suggestions = list(dict.fromkeys(suggestions))  # 保持顺序的去重
-        duplicate_removed = original_count - len(unique_suggestions)
-        
-        # 限制分析数量，避免5118 API超限
-        max_analyze_count = 20  # 最多分析20个关键词
-        if len(unique_suggestions) > max_analyze_count:
-            logger.warning(f"关键词数量({len(unique_suggestions)})超过限制，只分析前{max_analyze_count}个")
-            unique_suggestions = unique_suggestions[:max_analyze_count]
+        duplicate_removed = original_count - len(set(suggestions))
+        unique_suggestions = list(dict.fromkeys(suggestions))[:MAX_ANALYZE_COUNT]
         
         total_commercial_score = 0
         intent_counts = {}
         analyzed_suggestions = []
-        
-        # 使用信号量控制并发
-        import asyncio
-        semaphore = asyncio.Semaphore(1)  # 严格串行处理
-        
-        async def analyze_single_with_delay(suggestion: str, index: int):
-            async with semaphore:
-                try:
-                    # 添加延迟避免API限制
-                    if index > 0:
-                        await asyncio.sleep(2.0)  # 每个请求间隔2秒
-                    
-                    logger.info(f"正在分析关键词 {index + 1}/{len(unique_suggestions)}: {suggestion}")
-                    metrics = await BusinessAnalyzer.analyze_with_real_data(suggestion, enable_5118)
-                    
-                    return {
-                        'keyword': suggestion,
-                        'metrics': metrics,
-                        'success': True
-                    }
-                except Exception as e:
-                    logger.error(f"分析关键词 '{suggestion}' 失败: {e}")
-                    # 遇到错误时使用估算模式，但标记为非真实数据
-                    fallback_metrics = BusinessAnalyzer.analyze_keyword(suggestion, len(unique_suggestions))
-                    fallback_metrics.real_data_available = False
-                    return {
-                        'keyword': suggestion,
-                        'metrics': fallback_metrics,
-                        'success': False
-                    }
-        
-        # 串行执行所有分析任务
-        for index, suggestion in enumerate(unique_suggestions):
-            result = await analyze_single_with_delay(suggestion, index)
-            
+        for suggestion in unique_suggestions:
+            result = metrics_memo[suggestion]
             if result['success'] or not enable_5118:  # 如果成功或不要求真实数据
                 total_commercial_score += result['metrics'].commercial_score
                 intent_counts[result['metrics'].intent_type] = intent_counts.get(result['metrics'].intent_type, 0) + 1
@@ -581,20 +816,54 @@ class BusinessAnalyzer:
             'intent_distribution': intent_counts,
             'successful_analysis_count': successful_count,
             'top_opportunities': [
-                {
-                    'keyword': item['keyword'],
-                    'commercial_score': item['metrics'].commercial_score,
-                    'opportunity_score': item['metrics'].opportunity_score,
-                    'intent_type': item['metrics'].intent_type,
-                    'search_volume_estimate': item['metrics'].search_volume_estimate,
-                    'is_blue_ocean': item['metrics'].is_blue_ocean,
-                    'business_tier': BusinessAnalyzer.get_business_tier(item['metrics']),
-                    'real_data_available': item['metrics'].real_data_available
-                }
+                BusinessAnalyzer.opportunity_entry(item['keyword'], item['metrics'])
                 for item in sorted_opportunities
             ]
         }
     
+    @staticmethod
+    def opportunity_entry(keyword: str, metrics: BusinessMetrics) -> Dict:
+        """机会列表中的单个关键词条目"""
+        return {
+            'keyword': keyword,
+            'commercial_score': metrics.commercial_score,
+            'opportunity_score': metrics.opportunity_score,
+            'intent_type': metrics.intent_type,
+            'search_volume_estimate': metrics.search_volume_estimate,
+            'is_blue_ocean': metrics.is_blue_ocean,
+            'business_tier': BusinessAnalyzer.get_business_tier(metrics),
+            'real_data_available': metrics.real_data_available
+        }
+    
+    @staticmethod
+    async def analyze_suggestion_list_with_real_data(
+        suggestions: List[str], 
+        enable_5118: bool = True,
+        seed_keywords: Optional[List[str]] = None,
+        enrichment_index: Optional[Dict[str, KeywordData5118]] = None,
+        metrics_memo: Optional[Dict[str, Dict]] = None
+    ) -> Dict:
+        """
+        使用5118真实数据分析建议词列表的整体商业价值（优化版）
+        
+        Args:
+            suggestions: 建议词列表
+            enable_5118: 是否启用5118真实数据
+            seed_keywords: 批量查询种子词，为空时从建议词中提取词干
+            enrichment_index: 已构建的5118索引，传入时不再按种子词查询
+            metrics_memo: 跨调用共享的 关键词 -> 分析结果，已分析过的词不再请求
+        """
+        if metrics_memo is None:
+            metrics_memo = {}
+        await BusinessAnalyzer.enrich_keywords(
+            BusinessAnalyzer.limit_analysis_keywords(suggestions),
+            enable_5118=enable_5118,
+            seed_keywords=seed_keywords,
+            enrichment_index=enrichment_index,
+            metrics_memo=metrics_memo
+        )
+        return BusinessAnalyzer.summarize_suggestion_list(suggestions, metrics_memo, enable_5118)
+    
     @staticmethod
     def analyze_suggestion_list(suggestions: List[str]) -> Dict:
         """分析建议词列表的商业价值（估算模式 - 已弃用）"""
@@ -774,4 +1043,7 @@ class BusinessAnalyzer:
         else:
             insights.append("📈 建议重点关注前5个推荐词进行测试")
             
-        return insights
\ No newline at end of file
+        return insights
+
+# 词典在导入时编译一次
+BusinessAnalyzer.MATCHER = BusinessAnalyzer._build_matcher()
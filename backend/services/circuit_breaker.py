@@ -0,0 +1,179 @@
+"""
+熔断器
+按最近调用的失败率和慢调用率在 closed/open/half_open 间切换，上游故障时快速失败
+"""
+import time
+import asyncio
+import logging
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Optional
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+class CircuitOpenError(Exception):
+    """熔断器打开，调用被拒绝"""
+
+class _CallRecord:
+    """单次调用结果，调用方发现业务层失败时调用fail()"""
+
+    def __init__(self):
+        self.started_at = time.monotonic()
+        self.failed = False
+
+    def fail(self):
+        self.failed = True
+
+class CircuitBreaker:
+    """基于滑动窗口的熔断器"""
+
+    def __init__(
+        self,
+        name: str,
+        window_size: int = settings.FIVE118_BREAKER_WINDOW,
+        min_calls: int = settings.FIVE118_BREAKER_MIN_CALLS,
+        failure_rate_threshold: float = settings.FIVE118_BREAKER_FAILURE_RATE,
+        slow_call_seconds: float = settings.FIVE118_BREAKER_SLOW_CALL,
+        slow_rate_threshold: float = settings.FIVE118_BREAKER_SLOW_RATE,
+        open_seconds: float = settings.FIVE118_BREAKER_OPEN_SECONDS,
+        half_open_calls: int = settings.FIVE118_BREAKER_HALF_OPEN_CALLS
+    ):
+        self.name = name
+        self.min_calls = min_calls  # 窗口内调用数达到该值才评估
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_seconds = slow_call_seconds  # 超过该耗时视为慢调用
+        self.slow_rate_threshold = slow_rate_threshold
+        self.open_seconds = open_seconds  # 打开后多久进入半开探测
+        self.half_open_calls = half_open_calls  # 半开状态允许的探测调用数
+        self.state = CLOSED
+        self._window: deque = deque(maxlen=window_size)  # (是否失败, 是否慢调用)
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        self.stats = {'calls': 0, 'failures': 0, 'slow_calls': 0, 'rejected': 0, 'opened': 0}
+
+    @property
+    def is_open(self) -> bool:
+        """是否处于打开状态（调用会被直接拒绝）"""
+        return self.state == OPEN and time.monotonic() - self._opened_at < self.open_seconds
+
+    def allow(self) -> bool:
+        """判断当前是否允许发起调用"""
+        if self.state == OPEN:
+            if time.monotonic() - self._opened_at < self.open_seconds:
+                return False
+            self._transition(HALF_OPEN)
+        if self.state == HALF_OPEN:
+            if self._probes_in_flight >= self.half_open_calls:
+                return False
+            self._probes_in_flight += 1
+        return True
+
+    def admit(self):
+        """占用一次调用名额，熔断时计入拒绝并抛出CircuitOpenError"""
+        if not self.allow():
+            self.stats['rejected'] += 1
+            raise CircuitOpenError(f"{self.name}熔断中，暂停调用")
+
+    def release(self):
+        """归还admit()占用但未实际发起调用的名额（如等待令牌时被取消）"""
+        if self.state == HALF_OPEN:
+            self._probes_in_flight = max(0, self._probes_in_flight - 1)
+
+    @contextmanager
+    def track(self, admitted: bool = False):
+        """
+        包裹一次上游调用并记录结果
+
+        熔断时抛出CircuitOpenError；块内抛出异常或调用record.fail()均记为失败。
+        调用前需等待其他资源（如令牌）时，先调用admit()再以admitted=True进入
+        """
+        if not admitted:
+            self.admit()
+        record = _CallRecord()
+        try:
+            yield record
+        except asyncio.CancelledError:
+            # 调用方取消不代表上游故障，只释放探测名额
+            self.release()
+            raise
+        except Exception:
+            self._record(True, time.monotonic() - record.started_at)
+            raise
+        self._record(record.failed, time.monotonic() - record.started_at)
+
+    def _record(self, failed: bool, elapsed: float):
+        slow = elapsed >= self.slow_call_seconds
+        self.stats['calls'] += 1
+        self.stats['failures'] += failed
+        self.stats['slow_calls'] += slow
+
+        if self.state == HALF_OPEN:
+            self._probes_in_flight = max(0, self._probes_in_flight - 1)
+            if failed or slow:
+                self._transition(OPEN)
+                return
+            self._probe_successes += 1
+            if self._probe_successes >= self.half_open_calls:
+                self._transition(CLOSED)
+            return
+
+        if self.state != CLOSED:
+            return
+        self._window.append((failed, slow))
+        if len(self._window) < self.min_calls:
+            return
+        failure_rate, slow_rate = self._rates()
+        if failure_rate >= self.failure_rate_threshold or slow_rate >= self.slow_rate_threshold:
+            logger.warning(f"{self.name}熔断打开: 失败率 {failure_rate:.0%}, 慢调用率 {slow_rate:.0%}")
+            self._transition(OPEN)
+
+    def _rates(self):
+        if not self._window:
+            return 0.0, 0.0
+        total = len(self._window)
+        return (
+            sum(1 for failed, _ in self._window if failed) / total,
+            sum(1 for _, slow in self._window if slow) / total
+        )
+
+    def _transition(self, state: str):
+        if state == self.state:
+            return
+        logger.info(f"{self.name}熔断器状态: {self.state} -> {state}")
+        self.state = state
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+            self.stats['opened'] += 1
+        elif state == CLOSED:
+            self._window.clear()
+
+    def reset(self):
+        """手动恢复为关闭状态"""
+        self._transition(CLOSED)
+        self._window.clear()
+
+    def get_stats(self) -> Dict:
+        failure_rate, slow_rate = self._rates()
+        retry_after: Optional[float] = None
+        if self.state == OPEN:
+            retry_after = round(max(0.0, self.open_seconds - (time.monotonic() - self._opened_at)), 1)
+        return {
+            'name': self.name,
+            'state': self.state,
+            'failure_rate': round(failure_rate, 4),
+            'slow_rate': round(slow_rate, 4),
+            'window_calls': len(self._window),
+            'retry_after': retry_after,
+            **self.stats
+        }
+
+# 5118接口熔断器
+five118_breaker = CircuitBreaker('5118')
@@ -0,0 +1,275 @@
+"""
+递归下拉词扩展服务
+以种子词变体为第一层，将返回的建议词作为新种子逐层扩展，发现长尾关键词
+"""
+import json
+import heapq
+import asyncio
+import logging
+from collections import deque
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import AsyncSessionLocal, SearchHistory
+from services.baidu_service import BaiduSuggestService
+from services.business_analyzer import BusinessAnalyzer
+from services.keyword_service import KeywordService
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+EXPANSION_VARIANT_TYPE = 'expansion'  # 第二层及以后的查询词写入结果时使用的变体类型
+
+# 节点回调: (查询词, 深度, 建议词, 新发现的建议词数)
+NodeCallback = Callable[[str, int, List[str], int], Awaitable[None]]
+
+def _normalize(keyword: str) -> str:
+    return keyword.strip().lower()
+
+class SuggestionExpander:
+    """
+    多层下拉词扩展引擎
+
+    - 已访问集合保证每个查询词只请求一次
+    - 待扩展队列按 (深度, -机会评分) 排序：逐层推进，同层优先扩展机会评分高的词
+    - 节点数/深度达到上限，或最近一批请求的新词产出率低于阈值时提前停止
+    """
+
+    def __init__(
+        self,
+        max_depth: int = settings.EXPANSION_MAX_DEPTH,
+        max_nodes: int = settings.EXPANSION_MAX_NODES,
+        min_yield: float = settings.EXPANSION_MIN_YIELD,
+        yield_window: int = settings.EXPANSION_YIELD_WINDOW,
+        child_variant_types: Optional[List[str]] = None
+    ):
+        self.max_depth = max_depth
+        self.max_nodes = max_nodes
+        self.min_yield = min_yield  # 每次请求平均新发现的建议词数下限
+        self.yield_window = yield_window  # 计算产出率的最近请求数
+        self.child_variant_types = child_variant_types or []  # 新种子除自身外追加的变体
+
+    def _child_queries(self, suggestion: str) -> List[str]:
+        """建议词作为新种子时产生的查询词"""
+        queries = [suggestion]
+        for variant_list in KeywordService.generate_variants(suggestion, self.child_variant_types).values():
+            queries.extend(variant_list)
+        return queries
+
+    async def expand(
+        self,
+        seed: str,
+        variant_types: List[str],
+        db: AsyncSession,
+        session_id: str,
+        progress_callback: Optional[Callable[[int, int], Awaitable[None]]] = None,
+        node_callback: Optional[NodeCallback] = None
+    ) -> Dict:
+        """
+        从种子词开始扩展，结果按会话写入数据库
+
+        种子词变体为第0层查询，第n层查询返回的新建议词作为第n+1层查询，
+        max_depth为0时等同于单层分析。调用方需已创建session_id对应的SearchHistory记录
+        """
+        # 待扩展队列元素: (深度, -机会评分, 序号, 查询词, 变体类型)
+        frontier: List[Tuple[int, float, int, str, str]] = []
+        visited = {_normalize(seed)}
+        sequence = 0
+        for variant_type, variant_list in KeywordService.generate_variants(seed, variant_types).items():
+            for query in variant_list:
+                key = _normalize(query)
+                if key not in visited:
+                    visited.add(key)
+                    frontier.append((0, 0.0, sequence, query, variant_type))
+                    sequence += 1
+        heapq.heapify(frontier)
+
+        # 已发现建议词: 规范化文本 -> 发现信息
+        discovered: Dict[str, Dict] = {}
+        depth_distribution: Dict[int, int] = {}
+        recent_yields: deque = deque(maxlen=self.yield_window)
+        pending_rows: List[Dict] = []
+        results: asyncio.Queue = asyncio.Queue()
+        frontier_changed = asyncio.Event()
+        state = {'dispatched': 0, 'in_flight': 0, 'stop_reason': None}
+
+        def can_dispatch() -> bool:
+            return state['stop_reason'] is None and state['dispatched'] < self.max_nodes
+
+        async def worker(baidu_service: BaiduSuggestService):
+            while True:
+                # 队列为空但仍有请求未返回时，等待其产生新种子
+                while not frontier and state['in_flight'] and can_dispatch():
+                    frontier_changed.clear()
+                    await frontier_changed.wait()
+                if not frontier or not can_dispatch():
+                    return
+                depth, _, _, query, variant_type = heapq.heappop(frontier)
+                state['dispatched'] += 1
+                state['in_flight'] += 1
+                try:
+                    suggestions = await baidu_service.get_suggestions(query)
+                except Exception as e:
+                    logger.error(f"扩展抓取异常: {query}, 错误: {e}")
+                    suggestions = []
+                await results.put((query, depth, variant_type, suggestions))
+
+        fetched = 0
+        total_suggestions = 0
+        max_depth_reached = 0
+        try:
+            async with BaiduSuggestService() as baidu_service:
+                workers = [
+                    asyncio.create_task(worker(baidu_service))
+                    for _ in range(max(1, int(settings.BAIDU_CONCURRENCY_MAX)))  # 实际并发由自适应控制器调节
+                ]
+                try:
+                    while state['in_flight'] or (frontier and can_dispatch()):
+                        query, depth, variant_type, suggestions = await results.get()
+                        fetched += 1
+                        total_suggestions += len(suggestions)
+                        max_depth_reached = max(max_depth_reached, depth)
+
+                        fresh: Dict[str, str] = {}
+                        for suggestion in suggestions:
+                            key = _normalize(suggestion)
+                            if key and key not in discovered and key not in fresh:
+                                fresh[key] = suggestion
+                        new_suggestions = list(fresh.values())
+
+                        if new_suggestions:
+                            # 按估算机会评分决定新种子的扩展优先级
+                            scores = BusinessAnalyzer.score_keywords_batch(new_suggestions, len(suggestions))['opportunity_score']
+                            for (key, suggestion), score in zip(fresh.items(), scores):
+                                discovered[key] = {
+                                    'keyword': suggestion,
+                                    'depth': depth + 1,
+                                    'parent': query,
+                                    'opportunity_score': score
+                                }
+                                if depth + 1 > self.max_depth:
+                                    continue
+                                for child in self._child_queries(suggestion):
+                                    child_key = _normalize(child)
+                                    if child_key not in visited:
+                                        visited.add(child_key)
+                                        heapq.heappush(frontier, (depth + 1, -score, sequence, child, EXPANSION_VARIANT_TYPE))
+                                        sequence += 1
+                            depth_distribution[depth + 1] = depth_distribution.get(depth + 1, 0) + len(new_suggestions)
+
+                        pending_rows.extend(
+                            {
+                                'session_id': session_id,
+                                'variant_type': variant_type,
+                                'variant_keyword': query,
+                                'suggestion': suggestion,
+                                'suggestion_rank': rank
+                            }
+                            for rank, suggestion in enumerate(suggestions, 1)
+                        )
+                        if len(pending_rows) >= settings.RESULT_INSERT_BATCH_SIZE:
+                            await KeywordService._flush_results(db, pending_rows)
+
+                        # 新词产出率过低说明该方向已接近饱和
+                        recent_yields.append(len(new_suggestions))
+                        if (
+                            state['stop_reason'] is None
+                            and len(recent_yields) == self.yield_window
+                            and sum(recent_yields) / self.yield_window < self.min_yield
+                        ):
+                            state['stop_reason'] = 'low_yield'
+
+                        state['in_flight'] -= 1
+                        frontier_changed.set()
+
+                        if progress_callback:
+                            await progress_callback(fetched, self.max_nodes)
+                        if node_callback:
+                            await node_callback(query, depth, suggestions, len(new_suggestions))
+                finally:
+                    for task in workers:
+                        task.cancel()
+                    await asyncio.gather(*workers, return_exceptions=True)
+
+            await KeywordService._flush_results(db, pending_rows)
+        except asyncio.CancelledError:
+            # 被取消时（如流式请求的客户端断开）放弃当前事务，已抓取但未写入的结果在独立写会话中保存
+            await db.rollback()
+            await asyncio.shield(self._flush_detached(pending_rows))
+            raise
+
+        if state['stop_reason'] is None:
+            state['stop_reason'] = 'node_budget' if frontier else 'exhausted'
+
+        opportunities = sorted(
+            discovered.values(),
+            key=lambda item: item['opportunity_score'],
+            reverse=True
+        )
+        logger.info(
+            f"递归扩展完成: {seed}, 请求 {fetched} 次, 发现 {len(discovered)} 个建议词, "
+            f"停止原因 {state['stop_reason']}"
+        )
+        return {
+            'session_id': session_id,
+            'base_keyword': seed,
+            'nodes_fetched': fetched,
+            'frontier_remaining': len(frontier),
+            'max_depth_reached': max_depth_reached,
+            'total_suggestions': total_suggestions,
+            'total_discovered': len(discovered),
+            'depth_distribution': depth_distribution,
+            'stop_reason': state['stop_reason'],
+            'top_opportunities': opportunities[:settings.EXPANSION_TOP_OPPORTUNITIES]
+        }
+
+    @staticmethod
+    async def _flush_detached(rows: List[Dict]):
+        """使用新的写会话写入剩余结果行，不依赖调用方可能已中断的会话"""
+        if not rows:
+            return
+        try:
+            async with AsyncSessionLocal() as db:
+                await KeywordService._flush_results(db, rows)
+        except Exception as e:
+            logger.error(f"写入扩展剩余结果失败: {e}")
+
+    async def run(
+        self,
+        seed: str,
+        variant_types: List[str],
+        session_id: str,
+        progress_callback: Optional[Callable[[int, int], Awaitable[None]]] = None,
+        node_callback: Optional[NodeCallback] = None
+    ) -> Dict:
+        """创建搜索历史并执行扩展，结束后更新会话状态"""
+        async with AsyncSessionLocal() as db:
+            search_history = SearchHistory(
+                session_id=session_id,
+                original_keyword=seed,
+                variant_types=json.dumps(variant_types + [EXPANSION_VARIANT_TYPE]),
+                total_suggestions=0,
+                status="running"
+            )
+            db.add(search_history)
+            await db.commit()
+
+            try:
+                result = await self.expand(seed, variant_types, db, session_id, progress_callback, node_callback)
+            except asyncio.CancelledError:
+                await db.rollback()
+                await asyncio.shield(KeywordService._mark_session_failed(session_id))
+                raise
+            except Exception:
+                await db.rollback()
+                search_history = (await db.execute(
+                    select(SearchHistory).where(SearchHistory.session_id == session_id)
+                )).scalars().first()
+                search_history.status = "failed"
+                await db.commit()
+                raise
+
+            search_history.total_suggestions = result['total_suggestions']
+            search_history.status = "completed"
+            await db.commit()
+            return result
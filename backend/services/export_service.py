@@ -0,0 +1,252 @@
+"""
+流式导出服务
+直接从数据库游标逐行生成导出内容，内存占用与会话大小无关
+"""
+import io
+import csv
+import json
+import tempfile
+import logging
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional
+from openpyxl import Workbook
+from sqlalchemy import select
+from database import AsyncReadSessionLocal, SearchHistory
+from services.keyword_service import KeywordService
+from services.business_analyzer import BusinessAnalyzer
+from services.offload import offloader
+from config import settings
+
+# 列式导出依赖pyarrow，未安装时仅禁用parquet/arrow格式
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+logger = logging.getLogger(__name__)
+
+EXPORT_COLUMNS = ['变体类型', '变体关键词', '下拉建议词', '排序']
+
+class ExportService:
+    """会话结果流式导出"""
+
+    @staticmethod
+    async def _iter_rows(session_id: str) -> AsyncIterator[List]:
+        """逐行产出导出列（变体类型使用中文名称）"""
+        async for variant_type, variant_keyword, suggestion, rank in KeywordService.iter_session_rows(
+            session_id, batch_size=settings.EXPORT_CHUNK_ROWS
+        ):
+            yield [
+                KeywordService.RESULT_TYPE_LABELS.get(variant_type, variant_type),
+                variant_keyword,
+                suggestion,
+                rank
+            ]
+
+    @staticmethod
+    async def stream_csv(session_id: str) -> AsyncIterator[bytes]:
+        """按块生成CSV（UTF-8 BOM，兼容Excel打开）"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        writer.writerow(EXPORT_COLUMNS)
+        yield buffer.getvalue().encode('utf-8-sig')
+
+        pending = 0
+        buffer.seek(0)
+        buffer.truncate()
+        async for row in ExportService._iter_rows(session_id):
+            writer.writerow(row)
+            pending += 1
+            if pending >= settings.EXPORT_CHUNK_ROWS:
+                yield buffer.getvalue().encode('utf-8')
+                buffer.seek(0)
+                buffer.truncate()
+                pending = 0
+        if pending:
+            yield buffer.getvalue().encode('utf-8')
+
+    @staticmethod
+    async def stream_ndjson(session_id: str) -> AsyncIterator[bytes]:
+        """按块生成NDJSON，每行一条记录"""
+        chunk: List[str] = []
+        async for row in ExportService._iter_rows(session_id):
+            chunk.append(json.dumps(dict(zip(EXPORT_COLUMNS, row)), ensure_ascii=False))
+            if len(chunk) >= settings.EXPORT_CHUNK_ROWS:
+                yield ('\n'.join(chunk) + '\n').encode('utf-8')
+                chunk = []
+        if chunk:
+            yield ('\n'.join(chunk) + '\n').encode('utf-8')
+
+    @staticmethod
+    async def stream_json(session_id: str) -> AsyncIterator[bytes]:
+        """按块生成JSON数组"""
+        yield b'['
+        first = True
+        chunk: List[str] = []
+        async for row in ExportService._iter_rows(session_id):
+            item = json.dumps(dict(zip(EXPORT_COLUMNS, row)), ensure_ascii=False)
+            chunk.append(('\n  ' if first else ',\n  ') + item)
+            first = False
+            if len(chunk) >= settings.EXPORT_CHUNK_ROWS:
+                yield ''.join(chunk).encode('utf-8')
+                chunk = []
+        chunk.append('\n]' if not first else ']')
+        yield ''.join(chunk).encode('utf-8')
+
+    @staticmethod
+    async def stream_excel(session_id: str) -> AsyncIterator[bytes]:
+        """openpyxl只写模式生成Excel到临时文件，再分块输出"""
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet('关键词分析结果')
+        sheet.append(EXPORT_COLUMNS)
+        rows = 0
+        async for row in ExportService._iter_rows(session_id):
+            sheet.append(row)
+            rows += 1
+
+        with tempfile.SpooledTemporaryFile(max_size=settings.EXPORT_SPOOL_MAX_SIZE) as output:
+            # 压缩打包在线程池中执行
+            await offloader.run_io(workbook.save, output, size=rows)
+            async for data in ExportService._stream_spooled(output):
+                yield data
+
+    @staticmethod
+    def columnar_available() -> bool:
+        """是否支持Parquet/Arrow导出"""
+        return pa is not None
+
+    @staticmethod
+    def _arrow_schema(include_metrics: bool) -> "pa.Schema":
+        """列式导出schema：高重复度的字符串列使用字典编码"""
+        fields = [
+            pa.field('session_id', pa.dictionary(pa.int8(), pa.string())),
+            pa.field('session_created_at', pa.timestamp('us')),
+            pa.field('variant_type', pa.dictionary(pa.int8(), pa.string())),
+            pa.field('variant_keyword', pa.dictionary(pa.int32(), pa.string())),
+            pa.field('suggestion', pa.string()),
+            pa.field('suggestion_rank', pa.int16())
+        ]
+        if include_metrics:
+            fields += [
+                pa.field('commercial_score', pa.float64()),
+                pa.field('intent_type', pa.dictionary(pa.int8(), pa.string())),
+                pa.field('competition_level', pa.dictionary(pa.int8(), pa.string())),
+                pa.field('search_volume_estimate', pa.int64()),
+                pa.field('difficulty_score', pa.float64()),
+                pa.field('opportunity_score', pa.float64())
+            ]
+        return pa.schema(fields)
+
+    @staticmethod
+    async def _build_record_batch(
+        schema: "pa.Schema",
+        session_id: str,
+        created_at: Optional[datetime],
+        columns: Dict[str, List],
+        total_rows: int = 0
+    ) -> "pa.RecordBatch":
+        count = len(columns['suggestion'])
+        arrays = {
+            'session_id': [session_id] * count,
+            'session_created_at': [created_at] * count,
+            **columns
+        }
+        if 'commercial_score' in schema.names:
+            # 建议词数量取其所在变体关键词的建议词数，与分析阶段保持一致；
+            # 按整个导出的行数判断是否放入进程池，大会话的每个批次都不占用事件循环
+            metrics = await offloader.run_cpu(
+                BusinessAnalyzer.score_keywords_batch, columns['suggestion'], columns['_group_size'],
+                size=max(count, total_rows)
+            )
+            del metrics['keyword']
+            arrays.update(metrics)
+        return pa.RecordBatch.from_arrays(
+            [pa.array(arrays[field.name], type=field.type) for field in schema],
+            schema=schema
+        )
+
+    @staticmethod
+    async def _iter_record_batches(session_id: str, include_metrics: bool) -> AsyncIterator["pa.RecordBatch"]:
+        """按变体关键词边界切分记录批次，每批约EXPORT_CHUNK_ROWS行"""
+        schema = ExportService._arrow_schema(include_metrics)
+        async with AsyncReadSessionLocal() as db:
+            history = (await db.execute(
+                select(SearchHistory.created_at, SearchHistory.total_suggestions).where(SearchHistory.session_id == session_id)
+            )).first()
+        created_at, total_rows = history if history is not None else (None, 0)
+
+        columns = {name: [] for name in ('variant_type', 'variant_keyword', 'suggestion', 'suggestion_rank', '_group_size')}
+        group_key = None
+        group_start = 0
+
+        def close_group():
+            size = len(columns['suggestion']) - group_start
+            columns['_group_size'].extend([size] * size)
+
+        async for variant_type, variant_keyword, suggestion, rank in KeywordService.iter_session_rows(
+            session_id, batch_size=settings.EXPORT_CHUNK_ROWS
+        ):
+            if (variant_type, variant_keyword) != group_key:
+                if group_key is not None:
+                    close_group()
+                    if len(columns['suggestion']) >= settings.EXPORT_CHUNK_ROWS:
+                        yield await ExportService._build_record_batch(schema, session_id, created_at, columns, total_rows or 0)
+                        columns = {name: [] for name in columns}
+                group_key = (variant_type, variant_keyword)
+                group_start = len(columns['suggestion'])
+            columns['variant_type'].append(variant_type)
+            columns['variant_keyword'].append(variant_keyword)
+            columns['suggestion'].append(suggestion)
+            columns['suggestion_rank'].append(rank)
+
+        if group_key is not None:
+            close_group()
+            yield await ExportService._build_record_batch(schema, session_id, created_at, columns, total_rows or 0)
+
+    @staticmethod
+    async def _stream_spooled(output) -> AsyncIterator[bytes]:
+        """从临时文件开头按64KB分块输出"""
+        output.seek(0)
+        while True:
+            data = output.read(64 * 1024)
+            if not data:
+                break
+            yield data
+
+    @staticmethod
+    async def stream_parquet(session_id: str, include_metrics: bool = False) -> AsyncIterator[bytes]:
+        """按记录批次写入Parquet（字典编码列保持字典编码）"""
+        schema = ExportService._arrow_schema(include_metrics)
+        with tempfile.SpooledTemporaryFile(max_size=settings.EXPORT_SPOOL_MAX_SIZE) as output:
+            writer = pq.ParquetWriter(output, schema, compression='zstd')
+            try:
+                async for batch in ExportService._iter_record_batches(session_id, include_metrics):
+                    await offloader.run_io(writer.write_batch, batch, size=batch.num_rows)
+            finally:
+                writer.close()
+            async for data in ExportService._stream_spooled(output):
+                yield data
+
+    @staticmethod
+    async def stream_arrow(session_id: str, include_metrics: bool = False) -> AsyncIterator[bytes]:
+        """Arrow IPC流格式，每个记录批次写出后立即输出"""
+        schema = ExportService._arrow_schema(include_metrics)
+        sink = io.BytesIO()
+
+        def drain() -> bytes:
+            data = sink.getvalue()
+            sink.seek(0)
+            sink.truncate()
+            return data
+
+        # 各批次字典不同，IPC流格式支持字典替换（文件格式不支持）
+        writer = pa.ipc.new_stream(sink, schema)
+        try:
+            async for batch in ExportService._iter_record_batches(session_id, include_metrics):
+                await offloader.run_io(writer.write_batch, batch, size=batch.num_rows)
+                yield drain()
+        finally:
+            writer.close()
+        yield drain()
@@ -8,6 +8,10 @@ from typing import Dict, List, Optional
 import logging
 from dataclasses import dataclass
 from config import settings
+from services.http_pool import http_pool
+from services.single_flight import five118_flight
+from services.circuit_breaker import five118_breaker, CircuitOpenError
+from services.token_bucket import five118_scheduler
 
 logger = logging.getLogger(__name__)
 
@@ -28,6 +32,10 @@ class KeywordData5118:
     sem_price: str  # SEM点击价格
     page_url: str  # 推荐网站
 
+def normalize_keyword(keyword: str) -> str:
+    """关键词规范化：去除空白并转小写，用于索引匹配"""
+    return "".join(keyword.split()).lower()
+
 class FiveOneOneEightService:
     """5118 API服务类"""
     
@@ -35,25 +43,31 @@ class FiveOneOneEightService:
         self.api_key = api_key
         self.base_url = "http://apis.5118.com"
         self.session: Optional[aiohttp.ClientSession] = None
+        self._lease = None
         self.rate_limit_delay = 1.0  # 基础延迟1秒
         self.max_retries = 3  # 最大重试次数
         self.backoff_factor = 2.0  # 退避因子
         
     async def __aenter__(self):
         """异步上下文管理器入口"""
-        self.session = aiohttp.ClientSession(
-            timeout=aiohttp.ClientTimeout(total=30),
-            headers={
-                "Authorization": self.api_key,
-                "Content-Type": "application/json"
-            }
-        )
+        # 优先复用应用级连接池，未启动时共享临时会话
+        self._lease = http_pool.five118()
+        self.session = await self._lease.__aenter__()
         return self
         
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         """异步上下文管理器出口"""
-        if self.session:
-            await self.session.close()
+        lease, self._lease = self._lease, None
+        self.session = None
+        if lease is not None:
+            await lease.__aexit__(exc_type, exc_val, exc_tb)
+    
+    def _get_headers(self) -> Dict[str, str]:
+        """请求头（共享会话不携带鉴权信息，按请求附加）"""
+        return {
+            "Authorization": self.api_key,
+            "Content-Type": "application/json"
+        }
     
     async def get_keyword_data(
         self, 
@@ -73,85 +87,145 @@ class FiveOneOneEightService:
         """
         if not self.session:
             raise RuntimeError("请在async with语句中使用此服务")
-            
+        
+        # 熔断期间直接返回空结果，调用方回退到估算模式
+        if five118_breaker.is_open:
+            return []
+        
+        # 相同查询的并发请求合并为一次计费调用（含重试）
+        page_size = min(page_size, 100)
+        key = (normalize_keyword(keyword), page_size, sort_by_mobile, filter_type)
+        result = await five118_flight.do(
+            key,
+            lambda: self._fetch_shared(keyword, page_size, sort_by_mobile, filter_type)
+        )
+        return list(result)
+    
+    async def _fetch_shared(
+        self,
+        keyword: str,
+        page_size: int,
+        sort_by_mobile: bool,
+        filter_type: int
+    ) -> List[KeywordData5118]:
+        """合并请求的共享任务自行取得会话，发起方退出上下文后其他等待者仍可完成"""
+        async with http_pool.five118() as session:
+            return await self._fetch_keyword_data(keyword, page_size, sort_by_mobile, filter_type, session)
+    
+    async def _fetch_keyword_data(
+        self,
+        keyword: str,
+        page_size: int,
+        sort_by_mobile: bool,
+        filter_type: int,
+        session: Optional[aiohttp.ClientSession] = None
+    ) -> List[KeywordData5118]:
+        """请求5118接口（带重试和速率限制）"""
+        session = session or self.session
         # 构建请求参数
         params = {
             "keyword": keyword,
             "page_index": 1,
-            "page_size": min(page_size, 100),
+            "page_size": page_size,
             "sort_fields": 8 if sort_by_mobile else 7,  # 8:移动检索量 7:PC检索量
             "sort_type": "desc",
             "filter": filter_type
         }
         
         # 带重试的请求
+        rate_limited = False
         for attempt in range(self.max_retries):
             try:
-                # 应用速率限制延迟
-                if attempt > 0:
+                # 网络/服务错误重试前退避；限流由令牌桶统一暂停
+                if attempt > 0 and not rate_limited:
                     delay = self.rate_limit_delay * (self.backoff_factor ** (attempt - 1))
                     logger.info(f"5118 API重试第{attempt}次，延迟{delay:.1f}秒")
                     await asyncio.sleep(delay)
+                rate_limited = False
                 
-                async with self.session.post(
-                    f"{self.base_url}/keyword/word/v2",
-                    json=params,
-                    timeout=aiohttp.ClientTimeout(total=30)
-                ) as response:
-                    
-                    if response.status != 200:
-                        logger.error(f"5118 API请求失败: HTTP {response.status}")
-                        if attempt == self.max_retries - 1:
-                            return []
-                        continue
-                    
-                    data = await response.json()
-                    
-                    # 检查返回错误码
-                    errcode = data.get("errcode", "")
-                    errmsg = data.get("errmsg", "")
-                    
-                    if errcode != "0":
-                        # 检查是否是速率限制错误
-                        if "超限" in errmsg or "限制" in errmsg or errcode in ["10002", "10003"]:
-                            logger.warning(f"5118 API速率限制: {errcode} - {errmsg}")
-                            if attempt < self.max_retries - 1:
-                                continue  # 重试
+                # 先经熔断器放行再等待令牌，熔断期间被拒绝的调用不消耗令牌
+                five118_breaker.admit()
+                try:
+                    # 所有5118请求共享令牌桶，按套餐QPS发出
+                    await five118_scheduler.acquire()
+                except BaseException:
+                    five118_breaker.release()
+                    raise
+                
+                # 熔断器记录每次请求的结果与耗时
+                with five118_breaker.track(admitted=True) as call:
+                    async with session.post(
+                        f"{self.base_url}/keyword/word/v2",
+                        json=params,
+                        headers=self._get_headers(),
+                        timeout=aiohttp.ClientTimeout(total=settings.FIVE118_REQUEST_TIMEOUT)
+                    ) as response:
                         
-                        logger.error(f"5118 API返回错误: {errcode} - {errmsg}")
-                        if attempt == self.max_retries - 1:
-                            return []
-                        continue
-                    
-                    # 解析返回的关键词数据
-                    word_list = data.get("data", {}).get("word", [])
-                    
-                    result = []
-                    for word_data in word_list:
-                        try:
-                            keyword_obj = KeywordData5118(
-                                keyword=word_data.get("keyword", ""),
-                                index=word_data.get("index", 0),
-                                mobile_index=word_data.get("mobile_index", 0),
-                                haosou_index=word_data.get("haosou_index", 0),
-                                douyin_index=word_data.get("douyin_index", 0),
-                                long_keyword_count=word_data.get("long_keyword_count", 0),
-                                bidword_company_count=word_data.get("bidword_company_count", 0),
-                                bidword_kwc=word_data.get("bidword_kwc", 3),
-                                bidword_pcpv=word_data.get("bidword_pcpv", 0),
-                                bidword_wisepv=word_data.get("bidword_wisepv", 0),
-                                sem_reason=word_data.get("sem_reason", ""),
-                                sem_price=word_data.get("sem_price", ""),
-                                page_url=word_data.get("page_url", "")
-                            )
-                            result.append(keyword_obj)
-                        except Exception as e:
-                            logger.warning(f"解析关键词数据失败: {e}")
+                        if response.status != 200:
+                            call.fail()
+                            logger.error(f"5118 API请求失败: HTTP {response.status}")
+                            if attempt == self.max_retries - 1:
+                                return []
                             continue
+                        
+                        data = await response.json()
+                        
+                        # 检查返回错误码，速率限制同样计入熔断失败
+                        errcode = data.get("errcode", "")
+                        errmsg = data.get("errmsg", "")
+                        rate_limited = errcode != "0" and (
+                            "超限" in errmsg or "限制" in errmsg or errcode in ["10002", "10003"]
+                        )
+                        if rate_limited:
+                            call.fail()
+                            five118_scheduler.record_rate_limited()
+                        else:
+                            five118_scheduler.record_success()
+                
+                if errcode != "0":
+                    # 检查是否是速率限制错误
+                    if rate_limited:
+                        logger.warning(f"5118 API速率限制: {errcode} - {errmsg}")
+                        if attempt < self.max_retries - 1:
+                            continue  # 重试
                     
-                    logger.info(f"5118获取关键词数据成功: {keyword} -> {len(result)}条")
-                    return result
+                    logger.error(f"5118 API返回错误: {errcode} - {errmsg}")
+                    if attempt == self.max_retries - 1:
+                        return []
+                    continue
+                
+                # 解析返回的关键词数据
+                word_list = data.get("data", {}).get("word", [])
+                
+                result = []
+                for word_data in word_list:
+                    try:
+                        keyword_obj = KeywordData5118(
+                            keyword=word_data.get("keyword", ""),
+                            index=word_data.get("index", 0),
+                            mobile_index=word_data.get("mobile_index", 0),
+                            haosou_index=word_data.get("haosou_index", 0),
+                            douyin_index=word_data.get("douyin_index", 0),
+                            long_keyword_count=word_data.get("long_keyword_count", 0),
+                            bidword_company_count=word_data.get("bidword_company_count", 0),
+                            bidword_kwc=word_data.get("bidword_kwc", 3),
+                            bidword_pcpv=word_data.get("bidword_pcpv", 0),
+                            bidword_wisepv=word_data.get("bidword_wisepv", 0),
+                            sem_reason=word_data.get("sem_reason", ""),
+                            sem_price=word_data.get("sem_price", ""),
+                            page_url=word_data.get("page_url", "")
+                        )
+                        result.append(keyword_obj)
+                    except Exception as e:
+                        logger.warning(f"解析关键词数据失败: {e}")
+                        continue
+                
+                logger.info(f"5118获取关键词数据成功: {keyword} -> {len(result)}条")
+                return result
                     
+            except CircuitOpenError:
+                logger.warning(f"5118熔断中，跳过请求: {keyword}")
+                return []
             except asyncio.TimeoutError:
                 logger.warning(f"5118 API请求超时，第{attempt + 1}次尝试")
                 if attempt == self.max_retries - 1:
@@ -164,6 +238,25 @@ class FiveOneOneEightService:
         
         return []
     
+    async def build_keyword_index(
+        self,
+        seeds: List[str],
+        page_size: int = 100
+    ) -> Dict[str, KeywordData5118]:
+        """
+        按种子词批量拉取相关词，构建 规范化关键词 -> 5118数据 的索引
+        
+        一次请求最多返回100个相关词，远少于逐词查询的调用次数
+        """
+        index: Dict[str, KeywordData5118] = {}
+        for seed in dict.fromkeys(seeds):
+            for kw_data in await self.get_keyword_data(seed, page_size=page_size):
+                key = normalize_keyword(kw_data.keyword)
+                if key and key not in index:
+                    index[key] = kw_data
+        logger.info(f"5118关键词索引构建完成: {len(seeds)}个种子 -> {len(index)}条")
+        return index
+    
     async def get_blue_ocean_keywords(
         self, 
         keyword: str, 
@@ -250,25 +343,13 @@ class FiveOneOneEightService:
         return min(total_score, 100.0)
     
     async def batch_analyze_keywords(self, keywords: List[str]) -> Dict[str, List[KeywordData5118]]:
-        """批量分析多个关键词（优化并发控制）"""
-        results = {}
-        
-        # 严格控制并发数量，避免5118 API限制
-        semaphore = asyncio.Semaphore(1)  # 只允许1个并发请求
-        
-        async def analyze_single(keyword: str):
-            async with semaphore:
-                try:
-                    data = await self.get_keyword_data(keyword, page_size=10)  # 减少每次请求的数据量
-                    results[keyword] = data
-                    # 增加请求间隔，避免速率限制
-                    await asyncio.sleep(2.0)  # 每个请求间隔2秒
-                except Exception as e:
-                    logger.error(f"分析关键词 {keyword} 失败: {e}")
-                    results[keyword] = []
-        
-        # 串行执行而不是并发，确保不超过速率限制
-        for keyword in keywords:
-            await analyze_single(keyword)
+        """批量分析多个关键词（请求节奏由共享令牌桶控制）"""
+        async def analyze_single(keyword: str) -> List[KeywordData5118]:
+            try:
+                return await self.get_keyword_data(keyword, page_size=10)  # 减少每次请求的数据量
+            except Exception as e:
+                logger.error(f"分析关键词 {keyword} 失败: {e}")
+                return []
         
-        return results
\ No newline at end of file
+        data = await asyncio.gather(*(analyze_single(keyword) for keyword in keywords))
+        return dict(zip(keywords, data))
\ No newline at end of file
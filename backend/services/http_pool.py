@@ -0,0 +1,153 @@
+"""
+共享HTTP连接池
+在应用生命周期内复用百度(httpx)与5118(aiohttp)的连接，避免每次请求重新握手
+"""
+import time
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional
+import httpx
+import aiohttp
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+class HttpClientPool:
+    """应用级HTTP客户端池"""
+
+    def __init__(self):
+        self.baidu_client: Optional[httpx.AsyncClient] = None
+        self.five118_session: Optional[aiohttp.ClientSession] = None
+        self.started_at: Optional[float] = None
+        # 连接池未启动（如脚本调用）时共享的临时客户端及其使用者数
+        self._fallback_clients: Dict[str, object] = {}
+        self._fallback_users = {'baidu': 0, 'five118': 0}
+        self.metrics = {
+            'baidu': {'requests': 0, 'responses': 0},
+            'five118': {'requests': 0, 'connections_created': 0, 'connections_reused': 0}
+        }
+
+    @property
+    def started(self) -> bool:
+        return self.started_at is not None
+
+    async def _on_baidu_request(self, request: httpx.Request):
+        self.metrics['baidu']['requests'] += 1
+
+    async def _on_baidu_response(self, response: httpx.Response):
+        self.metrics['baidu']['responses'] += 1
+
+    def _build_five118_trace(self) -> aiohttp.TraceConfig:
+        """统计5118连接的新建与复用次数"""
+        trace = aiohttp.TraceConfig()
+        stats = self.metrics['five118']
+
+        async def on_request_start(session, ctx, params):
+            stats['requests'] += 1
+
+        async def on_connection_create_end(session, ctx, params):
+            stats['connections_created'] += 1
+
+        async def on_connection_reuseconn(session, ctx, params):
+            stats['connections_reused'] += 1
+
+        trace.on_request_start.append(on_request_start)
+        trace.on_connection_create_end.append(on_connection_create_end)
+        trace.on_connection_reuseconn.append(on_connection_reuseconn)
+        return trace
+
+    async def start(self):
+        """创建连接池（应用启动时调用）"""
+        if self.started:
+            return
+
+        self.baidu_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(settings.REQUEST_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=settings.HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY
+            ),
+            http2=settings.BAIDU_HTTP2,
+            follow_redirects=True,
+            event_hooks={
+                'request': [self._on_baidu_request],
+                'response': [self._on_baidu_response]
+            }
+        )
+
+        self.five118_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=settings.FIVE118_MAX_CONNECTIONS,
+                keepalive_timeout=settings.HTTP_KEEPALIVE_EXPIRY
+            ),
+            timeout=aiohttp.ClientTimeout(total=30),
+            trace_configs=[self._build_five118_trace()]
+        )
+
+        self.started_at = time.time()
+        logger.info(f"HTTP连接池已创建 (HTTP/2: {settings.BAIDU_HTTP2})")
+
+    @asynccontextmanager
+    async def _lease(self, name: str, shared, factory, close) -> AsyncIterator:
+        """
+        取得客户端：连接池已启动时直接复用；未启动时共享一个临时客户端，
+        服务上下文与进行中的合并请求各自计为使用者，最后一个使用者退出时关闭
+        """
+        if shared is not None:
+            yield shared
+            return
+        client = self._fallback_clients.get(name)
+        if client is None:
+            client = self._fallback_clients[name] = factory()
+        self._fallback_users[name] += 1
+        try:
+            yield client
+        finally:
+            self._fallback_users[name] -= 1
+            if self._fallback_users[name] == 0 and self._fallback_clients.get(name) is client:
+                del self._fallback_clients[name]
+                await close(client)
+
+    def baidu(self):
+        """百度客户端（async with使用）"""
+        return self._lease('baidu', self.baidu_client, lambda: httpx.AsyncClient(
+            timeout=httpx.Timeout(settings.REQUEST_TIMEOUT),
+            follow_redirects=True
+        ), lambda client: client.aclose())
+
+    def five118(self):
+        """5118会话（async with使用）"""
+        return self._lease('five118', self.five118_session, lambda: aiohttp.ClientSession(
+            timeout=aiohttp.ClientTimeout(total=30)
+        ), lambda session: session.close())
+
+    async def close(self):
+        """关闭连接池（应用关闭时调用）"""
+        if self.baidu_client:
+            await self.baidu_client.aclose()
+            self.baidu_client = None
+        if self.five118_session:
+            await self.five118_session.close()
+            self.five118_session = None
+        self.started_at = None
+        logger.info("HTTP连接池已关闭")
+
+    def get_stats(self) -> Dict:
+        """获取连接池指标"""
+        return {
+            'started': self.started,
+            'uptime': round(time.time() - self.started_at, 1) if self.started else 0,
+            'http2': settings.BAIDU_HTTP2,
+            'limits': {
+                'max_connections': settings.HTTP_MAX_CONNECTIONS,
+                'max_keepalive_connections': settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                'keepalive_expiry': settings.HTTP_KEEPALIVE_EXPIRY,
+                'five118_max_connections': settings.FIVE118_MAX_CONNECTIONS
+            },
+            'baidu': dict(self.metrics['baidu']),
+            'five118': dict(self.metrics['five118'])
+        }
+
+# 进程级共享连接池
+http_pool = HttpClientPool()
@@ -0,0 +1,239 @@
+"""
+异步分析任务服务
+提交即返回session_id，由有界后台工作池执行分析，任务状态持久化在SearchHistory.status
+
+任务会话通过SearchHistory.job_owner标记，执行前以 pending -> running 的条件更新认领，
+运行中由持有进程定期续约（lease_until），多进程部署时不会重复执行或误判其他进程的任务
+"""
+import json
+import time
+import uuid
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Awaitable, Callable, List, Optional, Set
+from sqlalchemy import select, update, or_
+from database import AsyncSessionLocal, SearchHistory
+from services.keyword_service import KeywordService
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+class JobQueueFullError(Exception):
+    """任务队列已满"""
+
+@dataclass
+class AnalysisJob:
+    """分析任务"""
+    session_id: str
+    keyword: str
+    variant_types: List[str]
+
+# 进度回调工厂: session_id -> progress_callback(processed, total)
+ProgressFactory = Callable[[str], Callable[[int, int], Awaitable[None]]]
+# 状态回调: (session_id, status, error)
+StatusHook = Callable[[str, str, Optional[str]], None]
+
+class AnalysisJobManager:
+    """有界分析任务工作池"""
+
+    def __init__(
+        self,
+        workers: int = settings.JOB_WORKERS,
+        queue_size: int = settings.JOB_QUEUE_SIZE,
+        progress_factory: Optional[ProgressFactory] = None,
+        status_hook: Optional[StatusHook] = None,
+        lease_seconds: float = settings.JOB_LEASE_SECONDS
+    ):
+        self.worker_count = workers
+        self.queue_size = queue_size
+        self.progress_factory = progress_factory
+        self.status_hook = status_hook
+        self.lease_seconds = lease_seconds
+        self.instance_id = str(uuid.uuid4())  # 本进程任务队列标识
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._lease_task: Optional[asyncio.Task] = None
+        self._running: Set[str] = set()  # 本进程正在执行的会话
+        self._reserved = 0  # 已通过容量检查、尚未入队的提交数
+        self.active_jobs = 0
+
+    async def start(self):
+        """启动工作池，并恢复上次进程遗留的任务"""
+        if self._workers:
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._workers = [
+            asyncio.create_task(self._worker(index)) for index in range(self.worker_count)
+        ]
+        self._lease_task = asyncio.create_task(self._renew_leases())
+        await self._recover_jobs()
+        logger.info(f"分析任务工作池已启动: {self.worker_count} 个worker, 队列容量 {self.queue_size}")
+
+    async def stop(self):
+        """停止工作池（未执行的任务保持pending状态，下次启动时恢复）"""
+        tasks = self._workers + ([self._lease_task] if self._lease_task else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._workers = []
+        self._lease_task = None
+
+    async def _recover_jobs(self):
+        """
+        恢复任务队列自身的会话
+
+        租约已过期的running任务所在进程已退出，标记为失败；pending任务重新入队，
+        执行前的认领保证多个进程同时恢复时只执行一次。批量分析等其他来源的会话不处理
+        """
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(SearchHistory)
+                .where(
+                    SearchHistory.job_owner.is_not(None),
+                    SearchHistory.status == "running",
+                    or_(SearchHistory.lease_until.is_(None), SearchHistory.lease_until < time.time())
+                )
+                .values(status="failed")
+            )
+            result = await db.execute(
+                select(SearchHistory)
+                .where(SearchHistory.job_owner.is_not(None), SearchHistory.status == "pending")
+                .order_by(SearchHistory.created_at)
+            )
+            pending = result.scalars().all()
+            await db.commit()
+
+        for history in pending:
+            job = AnalysisJob(
+                session_id=history.session_id,
+                keyword=history.original_keyword,
+                variant_types=json.loads(history.variant_types) if history.variant_types else []
+            )
+            try:
+                self._queue.put_nowait(job)
+                self._notify(job.session_id, "pending")
+            except asyncio.QueueFull:
+                logger.warning(f"任务队列已满，剩余pending任务待下次启动恢复: {job.session_id}")
+                break
+        if pending:
+            logger.info(f"已恢复 {len(pending)} 个pending任务")
+
+    async def submit(self, keyword: str, variant_types: List[str]) -> str:
+        """提交分析任务，立即返回session_id"""
+        if self._queue is None:
+            raise RuntimeError("任务工作池未启动")
+        if self.queue_size > 0 and self._queue.qsize() + self._reserved >= self.queue_size:
+            raise JobQueueFullError(f"任务队列已满 ({self.queue_size})")
+
+        # 写入数据库前先占用队列位置，并发提交不会在记录提交后才发现队列已满
+        self._reserved += 1
+        try:
+            session_id = str(uuid.uuid4())
+            async with AsyncSessionLocal() as db:
+                db.add(SearchHistory(
+                    session_id=session_id,
+                    original_keyword=keyword,
+                    variant_types=json.dumps(variant_types),
+                    total_suggestions=0,
+                    status="pending",
+                    job_owner=self.instance_id
+                ))
+                await db.commit()
+
+            self._queue.put_nowait(AnalysisJob(session_id, keyword, variant_types))
+        finally:
+            self._reserved -= 1
+        self._notify(session_id, "pending")
+        return session_id
+
+    def _notify(self, session_id: str, status: str, error: Optional[str] = None):
+        if self.status_hook:
+            self.status_hook(session_id, status, error)
+
+    async def _claim(self, session_id: str) -> bool:
+        """认领pending任务并写入租约，已被其他进程认领或已结束时返回False"""
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                update(SearchHistory)
+                .where(
+                    SearchHistory.session_id == session_id,
+                    SearchHistory.job_owner.is_not(None),
+                    SearchHistory.status == "pending"
+                )
+                .values(
+                    status="running",
+                    job_owner=self.instance_id,
+                    lease_until=time.time() + self.lease_seconds
+                )
+            )
+            await db.commit()
+        return result.rowcount == 1
+
+    async def _renew_leases(self):
+        """定期为本进程执行中的任务续约"""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            if not self._running:
+                continue
+            try:
+                async with AsyncSessionLocal() as db:
+                    await db.execute(
+                        update(SearchHistory)
+                        .where(
+                            SearchHistory.session_id.in_(list(self._running)),
+                            SearchHistory.job_owner == self.instance_id
+                        )
+                        .values(lease_until=time.time() + self.lease_seconds)
+                    )
+                    await db.commit()
+            except Exception as e:
+                logger.warning(f"任务续约失败: {e}")
+
+    async def _worker(self, index: int):
+        while True:
+            job = await self._queue.get()
+            try:
+                claimed = await self._claim(job.session_id)
+            except asyncio.CancelledError:
+                self._queue.task_done()
+                raise
+            except Exception as e:
+                logger.error(f"认领任务失败 {job.session_id}: {e}")
+                claimed = False
+            if not claimed:
+                logger.info(f"任务已被其他进程认领或已结束，跳过: {job.session_id}")
+                self._queue.task_done()
+                continue
+            self.active_jobs += 1
+            self._running.add(job.session_id)
+            try:
+                self._notify(job.session_id, "running")
+                progress_callback = self.progress_factory(job.session_id) if self.progress_factory else None
+                async with AsyncSessionLocal() as db:
+                    await KeywordService.analyze_keywords(
+                        job.keyword,
+                        job.variant_types,
+                        db,
+                        progress_callback,
+                        job.session_id
+                    )
+                self._notify(job.session_id, "completed")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # analyze_keywords已将SearchHistory标记为failed
+                logger.error(f"分析任务失败 {job.session_id}: {str(e)}")
+                self._notify(job.session_id, "failed", str(e))
+            finally:
+                self.active_jobs -= 1
+                self._running.discard(job.session_id)
+                self._queue.task_done()
+
+    def get_stats(self):
+        return {
+            'workers': self.worker_count,
+            'active_jobs': self.active_jobs,
+            'queued_jobs': self._queue.qsize() if self._queue else 0,
+            'queue_size': self.queue_size
+        }
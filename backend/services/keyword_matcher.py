@@ -0,0 +1,67 @@
+"""
+多模式关键词匹配
+基于Aho-Corasick自动机，一次扫描找出文本命中的所有词典词及其类别
+"""
+from collections import deque
+from typing import Dict, Iterable, List, Set, Tuple
+
+class KeywordMatcher:
+    """Aho-Corasick多模式匹配器"""
+
+    def __init__(self, dictionaries: Dict[str, Iterable[str]]):
+        """
+        Args:
+            dictionaries: 类别 -> 词列表，同一个词可以属于多个类别
+        """
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[Tuple[str, str]]] = [[]]
+        self.categories = list(dictionaries.keys())
+
+        for category, words in dictionaries.items():
+            for word in words:
+                self._add(word, category)
+        self._build_failure_links()
+
+    def _add(self, word: str, category: str):
+        if not word:
+            return
+        state = 0
+        for char in word:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        if (category, word) not in self._output[state]:
+            self._output[state].append((category, word))
+
+    def _build_failure_links(self):
+        """广度优先构建失败指针，并沿失败链合并输出"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def match(self, text: str) -> Dict[str, Set[str]]:
+        """扫描文本，返回 类别 -> 命中词集合（每个词只计一次）"""
+        matches: Dict[str, Set[str]] = {}
+        state = 0
+        goto, fail, output = self._goto, self._fail, self._output
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for category, word in output[state]:
+                matches.setdefault(category, set()).add(word)
+        return matches
@@ -1,15 +1,23 @@
-from typing import List, Dict, Set
+from typing import List, Dict, Set, Optional, Tuple
 import string
 import asyncio
 from services.baidu_service import BaiduSuggestService
-from services.business_analyzer import BusinessAnalyzer
-from database import KeywordResult, SearchHistory, get_db
+from services.business_analyzer import BusinessAnalyzer, MAX_ANALYZE_COUNT
+from services.analysis_store import analysis_store, BUSINESS_ANALYSIS
+from services.offload import offloader
+from database import AsyncSessionLocal, AsyncReadSessionLocal, KeywordResult, SearchHistory, Suggestion, VARIANT_TYPE_CODES, VARIANT_TYPE_NAMES, get_db
+from config import settings
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, insert, update, tuple_
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import aliased
 import json
 import uuid
+import logging
 from datetime import datetime
 
+logger = logging.getLogger(__name__)
+
 class KeywordService:
     
     VARIANT_TYPES = {
@@ -21,6 +29,12 @@ class KeywordService:
         'question_which': '疑问词-哪 (哪-z)'
     }
     
+    # 结果行类型名称（含非用户可选的类型）
+    RESULT_TYPE_LABELS = {
+        **VARIANT_TYPES,
+        'expansion': '递归扩展'
+    }
+    
     @staticmethod
     def generate_variants(base_keyword: str, variant_types: List[str]) -> Dict[str, List[str]]:
         """生成关键词变体"""
@@ -86,15 +100,94 @@ class KeywordService:
         return results
     
     @staticmethod
-    async def _add_business_analysis(results: Dict) -> Dict:
-        """添加商业价值分析 - 智能使用5118真实数据"""
+    async def _add_business_analysis(
+        results: Dict,
+        enrichment_index: Optional[Dict] = None,
+        metrics_memo: Optional[Dict[str, Dict]] = None
+    ) -> Dict:
+        """
+        添加商业价值分析 - 智能使用5118真实数据
+        
+        先汇总所有变体类型待分析的建议词并全局去重，每个词最多富化一次，
+        再按变体类型从 关键词 -> 分析结果 中汇总，耗时只与去重后的词数相关。
+        批量分析时传入共享的5118索引和分析结果，多个种子词之间不重复请求；
+        已持久化的关键词指标直接复用，新得到的真实数据指标写回存储
+        """
+        if metrics_memo is None:
+            metrics_memo = {}
+        
+        # 富化计划：每个变体类型取前N个建议词，跨变体类型去重
+        variant_candidates = {
+            variant_type: [
+                suggestion for suggestions in variant_data.values() for suggestion in suggestions
+            ][:MAX_ANALYZE_COUNT]
+            for variant_type, variant_data in results['results'].items()
+        }
+        planned_keywords = list(dict.fromkeys(
+            suggestion for candidates in variant_candidates.values() for suggestion in candidates
+        ))
+        # 分析失败回退估算时按关键词首次出现的变体类型的列表词数估算（与逐类型分析一致）
+        suggestions_counts: Dict[str, int] = {}
+        for candidates in variant_candidates.values():
+            unique_count = len(set(candidates))
+            for suggestion in candidates:
+                suggestions_counts.setdefault(suggestion, unique_count)
+        
+        metrics_memo.update(await analysis_store.load_metrics(
+            [keyword for keyword in planned_keywords if keyword not in metrics_memo]
+        ))
+        known_keywords = set(metrics_memo)
+        await BusinessAnalyzer.enrich_keywords(
+            planned_keywords,
+            enable_5118=True,
+            seed_keywords=[results['base_keyword']] if results.get('base_keyword') else None,
+            enrichment_index=enrichment_index,
+            metrics_memo=metrics_memo,
+            suggestions_counts=suggestions_counts
+        )
+        
+        # 汇总与估算为纯计算，数据量较大时放入进程池执行
+        summary = await offloader.run_cpu(
+            KeywordService._build_business_analysis,
+            results['results'],
+            variant_candidates,
+            {keyword: metrics_memo[keyword] for keyword in planned_keywords},
+            size=sum(len(suggestions) for variant_data in results['results'].values() for suggestions in variant_data.values())
+        )
+        results['business_analysis'] = summary.pop('business_analysis')
+        results['summary'].update(summary)
+        
+        await analysis_store.save_metrics({
+            keyword: result for keyword, result in metrics_memo.items() if keyword not in known_keywords
+        })
+        return results
+    
+    @staticmethod
+    def _build_business_analysis(
+        variant_results: Dict[str, Dict[str, List[str]]],
+        variant_candidates: Dict[str, List[str]],
+        metrics_memo: Dict[str, Dict]
+    ) -> Dict:
+        """
+        按变体类型汇总商业分析（纯计算，可在进程池中执行）
+        
+        metrics_memo须已包含富化计划中所有关键词的分析结果；
+        返回business_analysis及summary中的商业价值字段
+        """
+        # 关键词 -> 机会条目，供各变体关键词直接查找
+        opportunity_lookup = {
+            keyword: BusinessAnalyzer.opportunity_entry(keyword, metrics_memo[keyword]['metrics'])
+            for keyword in metrics_memo
+            if metrics_memo[keyword]['success']
+        }
+        
         # 分析每个变体类型的商业价值
         business_analysis = {}
         total_commercial_score = 0
         total_suggestions_analyzed = 0
         intent_distribution = {}
         
-        for variant_type, variant_data in results['results'].items():
+        for variant_type, variant_data in variant_results.items():
             variant_analysis = {
                 'average_commercial_score': 0,
                 'top_opportunities': [],
@@ -102,47 +195,25 @@ class KeywordService:
                 'suggestions_analysis': {}
             }
             
-            all_suggestions = []
-            for variant_keyword, suggestions in variant_data.items():
-                all_suggestions.extend(suggestions)
-            
-            # 分析该变体类型的整体情况 - 使用真实数据但限制数量
-            if all_suggestions:
-                # 限制分析数量，避免5118 API超限
-                limited_suggestions = all_suggestions[:20]  # 只分析前20个
-                list_analysis = await BusinessAnalyzer.analyze_suggestion_list_with_real_data(limited_suggestions, enable_5118=True)
+            limited_suggestions = variant_candidates[variant_type]
+            if limited_suggestions:
+                list_analysis = BusinessAnalyzer.summarize_suggestion_list(limited_suggestions, metrics_memo)
                 variant_analysis['average_commercial_score'] = list_analysis['average_commercial_score']
                 variant_analysis['top_opportunities'] = list_analysis['top_opportunities']
                 variant_analysis['intent_distribution'] = list_analysis['intent_distribution']
                 
-                # 为每个变体关键词生成基本分析
+                # 为每个变体关键词生成基本分析，只使用本变体类型参与分析的关键词结果
+                analyzed_in_variant = set(limited_suggestions)
                 for variant_keyword, suggestions in variant_data.items():
                     suggestions_analysis = []
                     for suggestion in suggestions[:5]:  # 每个变体只分析前5个
-                        if suggestion in limited_suggestions:
-                            # 从list_analysis中找到对应的分析结果
-                            found_analysis = next(
-                                (opp for opp in list_analysis['top_opportunities'] if opp['keyword'] == suggestion),
-                                None
-                            )
-                            if found_analysis:
-                                suggestions_analysis.append(found_analysis)
-                            else:
-                                # 回退到估算分析
-                                metrics = BusinessAnalyzer.analyze_keyword(suggestion, len(suggestions))
-                                suggestions_analysis.append({
-                                    'keyword': suggestion,
-                                    'commercial_score': metrics.commercial_score,
-                                    'intent_type': metrics.intent_type,
-                                    'competition_level': metrics.competition_level,
-                                    'search_volume_estimate': metrics.search_volume_estimate,
-                                    'difficulty_score': metrics.difficulty_score,
-                                    'opportunity_score': metrics.opportunity_score,
-                                    'is_blue_ocean': metrics.is_blue_ocean,
-                                    'real_data_available': False
-                                })
+                        found_analysis = (
+                            opportunity_lookup.get(suggestion) if suggestion in analyzed_in_variant else None
+                        )
+                        if found_analysis:
+                            suggestions_analysis.append(found_analysis)
                         else:
-                            # 对于未包含在限制列表中的，使用估算模式
+                            # 未参与真实数据分析或分析失败的，使用估算模式
                             metrics = BusinessAnalyzer.analyze_keyword(suggestion, len(suggestions))
                             suggestions_analysis.append({
                                 'keyword': suggestion,
@@ -168,30 +239,126 @@ class KeywordService:
             
             business_analysis[variant_type] = variant_analysis
         
-        # 添加到结果中
-        results['business_analysis'] = business_analysis
-        
-        # 更新summary中的商业价值信息
-        if total_suggestions_analyzed > 0:
-            results['summary']['average_commercial_score'] = round(total_commercial_score / total_suggestions_analyzed, 1)
-        else:
-            results['summary']['average_commercial_score'] = 0
-            
-        results['summary']['intent_distribution'] = intent_distribution
-        
         # 计算整体最佳机会
         all_opportunities = []
         for variant_analysis in business_analysis.values():
             all_opportunities.extend(variant_analysis['top_opportunities'])
         
-        # 按机会评分排序，取前10个
-        results['summary']['top_opportunities'] = sorted(
-            all_opportunities, 
-            key=lambda x: x['opportunity_score'], 
-            reverse=True
-        )[:10]
+        return {
+            'business_analysis': business_analysis,
+            'average_commercial_score': (
+                round(total_commercial_score / total_suggestions_analyzed, 1) if total_suggestions_analyzed > 0 else 0
+            ),
+            'intent_distribution': intent_distribution,
+            # 按机会评分排序，取前10个
+            'top_opportunities': sorted(
+                all_opportunities, 
+                key=lambda x: x['opportunity_score'], 
+                reverse=True
+            )[:10]
+        }
+    
+    @staticmethod
+    async def save_business_analysis(results: Dict):
+        """保存会话的商业分析结果，供之后查看时直接读取"""
+        await analysis_store.save_session(results['session_id'], BUSINESS_ANALYSIS, {
+            'business_analysis': results['business_analysis'],
+            'summary': results['summary']
+        })
+    
+    @staticmethod
+    async def _intern_texts(db: AsyncSession, texts: Set[str]) -> Dict[str, int]:
+        """将文本写入字典表（已存在则跳过），返回 文本 -> id 映射"""
+        if not texts:
+            return {}
+        await db.execute(
+            sqlite_insert(Suggestion).on_conflict_do_nothing(index_elements=['text']),
+            [{'text': t} for t in texts]
+        )
+        
+        ids: Dict[str, int] = {}
+        text_list = list(texts)
+        for start in range(0, len(text_list), 500):  # 控制IN参数数量
+            chunk = text_list[start:start + 500]
+            result = await db.execute(select(Suggestion.text, Suggestion.id).where(Suggestion.text.in_(chunk)))
+            ids.update(result.tuples().all())
+        return ids
+    
+    @staticmethod
+    async def _flush_results(db: AsyncSession, rows: List[Dict]):
+        """以单条executemany插入批量写入结果行，一次flush一个事务"""
+        if not rows:
+            return
+        text_ids = await KeywordService._intern_texts(
+            db,
+            {row['suggestion'] for row in rows} | {row['variant_keyword'] for row in rows}
+        )
+        await db.execute(insert(KeywordResult), [
+            {
+                'session_id': row['session_id'],
+                'variant_type': VARIANT_TYPE_CODES.get(row['variant_type'], 0),
+                'variant_keyword_id': text_ids[row['variant_keyword']],
+                'suggestion_id': text_ids[row['suggestion']],
+                'suggestion_rank': row['suggestion_rank']
+            }
+            for row in rows
+        ])
+        await db.commit()
+        rows.clear()
+    
+    @staticmethod
+    def session_rows_query(session_id: str):
+        """
+        会话结果行查询：(变体类型编码, 变体关键词, 建议词, 排序)
         
-        return results
+        过滤与排序都按 (session_id, variant_type, variant_keyword_id, suggestion_rank) 索引的列顺序，
+        直接沿索引输出而不需要额外排序（索引条目末尾即为行id，可作分页键）；
+        同一变体关键词的行连续，变体关键词之间按字典表id排列
+        """
+        variant_text = aliased(Suggestion)
+        suggestion_text = aliased(Suggestion)
+        return (
+            select(
+                KeywordResult.variant_type,
+                variant_text.text,
+                suggestion_text.text,
+                KeywordResult.suggestion_rank
+            )
+            .join(variant_text, variant_text.id == KeywordResult.variant_keyword_id)
+            .join(suggestion_text, suggestion_text.id == KeywordResult.suggestion_id)
+            .where(KeywordResult.session_id == session_id)
+            .order_by(
+                KeywordResult.variant_type, KeywordResult.variant_keyword_id,
+                KeywordResult.suggestion_rank, KeywordResult.id
+            )
+        )
+    
+    @staticmethod
+    async def iter_session_rows(session_id: str, batch_size: int = 1000):
+        """
+        按索引键分页读取会话结果行：(变体类型, 变体关键词, 建议词, 排序)，不在内存中汇总
+        
+        每页使用独立的只读会话，页与页之间归还连接，慢速下载的导出不会长期占用只读连接池
+        """
+        page_key = tuple_(
+            KeywordResult.variant_type, KeywordResult.variant_keyword_id,
+            KeywordResult.suggestion_rank, KeywordResult.id
+        )
+        last_key = None
+        while True:
+            query = KeywordService.session_rows_query(session_id).add_columns(
+                KeywordResult.variant_keyword_id, KeywordResult.id
+            ).limit(batch_size)
+            if last_key is not None:
+                query = query.where(page_key > tuple_(*last_key))
+            async with AsyncReadSessionLocal() as db:
+                rows = (await db.execute(query)).all()
+            for type_code, variant_keyword, suggestion, rank, _, _ in rows:
+                yield VARIANT_TYPE_NAMES.get(type_code, 'unknown'), variant_keyword, suggestion, rank
+            if len(rows) < batch_size:
+                return
+            type_code, _, _, rank, variant_keyword_id, row_id = rows[-1]
+            last_key = (type_code, variant_keyword_id, rank, row_id)
     
     @staticmethod
     async def analyze_keywords(
@@ -199,9 +366,15 @@ class KeywordService:
         variant_types: List[str],
         db: AsyncSession,
         progress_callback=None,
-        session_id: str = None
+        session_id: str = None,
+        result_callback=None
     ) -> Dict:
-        """分析关键词并获取下拉词"""
+        """
+        分析关键词并获取下拉词
+        
+        result_callback(variant_type, variant_keyword, suggestions) 在每个变体词抓取完成时调用，
+        用于增量推送结果
+        """
         
         # 使用传入的session_id或生成新的
         if session_id is None:
@@ -213,15 +386,22 @@ class KeywordService:
         # 统计总数
         total_variants = sum(len(variant_list) for variant_list in variants.values())
         
-        # 创建搜索历史记录
-        search_history = SearchHistory(
-            session_id=session_id,
-            original_keyword=base_keyword,
-            variant_types=json.dumps(variant_types),
-            total_suggestions=0,
-            status="running"
+        # 创建搜索历史记录（异步任务模式下提交时已创建pending记录）
+        existing = await db.execute(
+            select(SearchHistory).where(SearchHistory.session_id == session_id)
         )
-        db.add(search_history)
+        search_history = existing.scalars().first()
+        if search_history is None:
+            search_history = SearchHistory(
+                session_id=session_id,
+                original_keyword=base_keyword,
+                variant_types=json.dumps(variant_types),
+                total_suggestions=0,
+                status="running"
+            )
+            db.add(search_history)
+        else:
+            search_history.status = "running"
         await db.commit()
         
         results = {
@@ -238,61 +418,81 @@ class KeywordService:
         }
         
         processed = 0
+        pending_rows: List[Dict] = []
         
         try:
+            # 所有变体类型的变体词进入同一工作队列
+            variant_owners: Dict[str, List[str]] = {}
+            for variant_type, variant_list in variants.items():
+                results['results'][variant_type] = {}
+                for variant_keyword in variant_list:
+                    variant_owners.setdefault(variant_keyword, []).append(variant_type)
+            
             async with BaiduSuggestService() as baidu_service:
-                for variant_type, variant_list in variants.items():
-                    results['results'][variant_type] = {}
-                    
-                    # 批量获取建议词
-                    suggestions_dict = await baidu_service.batch_get_suggestions(
-                        variant_list, 
-                        concurrency=2  # 降低并发数避免被限制
-                    )
-                    
-                    for variant_keyword, suggestions in suggestions_dict.items():
+                async for variant_keyword, suggestions in baidu_service.iter_suggestions(
+                    list(variant_owners.keys()),
+                    concurrency=int(settings.BAIDU_CONCURRENCY_MAX)  # 实际并发由自适应控制器调节
+                ):
+                    for variant_type in variant_owners[variant_keyword]:
                         processed += 1
                         
                         # 更新进度
                         if progress_callback:
                             await progress_callback(processed, total_variants)
                         
+                        # 增量推送结果
+                        if result_callback:
+                            await result_callback(variant_type, variant_keyword, suggestions)
+                        
                         if suggestions:
                             results['results'][variant_type][variant_keyword] = suggestions
                             results['summary']['successful_variants'] += 1
                             results['summary']['total_suggestions'] += len(suggestions)
                             
-                            # 保存到数据库
-                            for rank, suggestion in enumerate(suggestions, 1):
-                                keyword_result = KeywordResult(
-                                    original_keyword=base_keyword,
-                                    variant_keyword=variant_keyword,
-                                    suggestion=suggestion,
-                                    suggestion_rank=rank,
-                                    variant_type=variant_type
-                                )
-                                db.add(keyword_result)
+                            # 收集待写入行，批量写入数据库
+                            pending_rows.extend(
+                                {
+                                    'session_id': session_id,
+                                    'variant_type': variant_type,
+                                    'variant_keyword': variant_keyword,
+                                    'suggestion': suggestion,
+                                    'suggestion_rank': rank
+                                }
+                                for rank, suggestion in enumerate(suggestions, 1)
+                            )
                         else:
                             results['summary']['failed_variants'] += 1
                         
-                        # 每10个变体提交一次
-                        if processed % 10 == 0:
-                            await db.commit()
+                        if len(pending_rows) >= settings.RESULT_INSERT_BATCH_SIZE:
+                            await KeywordService._flush_results(db, pending_rows)
                 
-                # 最终提交
-                await db.commit()
+                # 按变体生成顺序整理结果（抓取按完成顺序到达）
+                for variant_type, variant_list in variants.items():
+                    fetched = results['results'][variant_type]
+                    results['results'][variant_type] = {
+                        vk: fetched[vk] for vk in variant_list if vk in fetched
+                    }
+                
+                # 写入剩余结果
+                await KeywordService._flush_results(db, pending_rows)
                 
                 # 应用去重逻辑
                 results = KeywordService._deduplicate_suggestions(results)
                 
                 # 添加商业价值分析 - 使用真实5118数据
                 results = await KeywordService._add_business_analysis(results)
+                await KeywordService.save_business_analysis(results)
                 
                 # 更新搜索历史
                 search_history.total_suggestions = results['summary']['total_suggestions']
                 search_history.status = "completed"
                 await db.commit()
                 
+        except asyncio.CancelledError:
+            # 任务被取消（如流式请求的客户端断开）：放弃当前事务，在独立写会话中标记失败
+            await db.rollback()
+            await asyncio.shield(KeywordService._mark_session_failed(session_id))
+            raise
         except Exception as e:
             # 更新搜索历史为失败状态
             search_history.status = "failed"
@@ -301,6 +501,197 @@ class KeywordService:
         
         return results
     
+    @staticmethod
+    async def _mark_session_failed(session_id: str):
+        """使用新的写会话将会话标记为失败，不依赖调用方可能已中断的会话"""
+        try:
+            async with AsyncSessionLocal() as db:
+                await KeywordService._set_sessions_status(db, [session_id], "failed")
+        except Exception as e:
+            logger.error(f"标记会话失败状态出错 {session_id}: {e}")
+    
+    @staticmethod
+    def normalize_seeds(keywords: List[str]) -> List[str]:
+        """种子词去除首尾空白，保持顺序去重"""
+        return list(dict.fromkeys(kw.strip() for kw in keywords if kw and kw.strip()))
+    
+    @staticmethod
+    async def _set_sessions_status(db: AsyncSession, session_ids: List[str], status: str):
+        """批量更新会话状态"""
+        for start in range(0, len(session_ids), 500):  # 控制IN参数数量
+            await db.execute(
+                update(SearchHistory)
+                .where(SearchHistory.session_id.in_(session_ids[start:start + 500]))
+                .values(status=status)
+            )
+        await db.commit()
+    
+    @staticmethod
+    async def analyze_keywords_batch(
+        seed_sessions: Dict[str, str],
+        variant_types: List[str],
+        db: AsyncSession,
+        progress_factory=None,
+        batch_progress_callback=None,
+        status_hook=None
+    ) -> Dict:
+        """
+        多种子词批量分析
+        
+        所有种子词的变体词合并去重后进入同一抓取队列，共享百度自适应并发预算；
+        相同变体词只请求一次，结果写入每个所属会话。5118索引按全部种子词构建一次，
+        各种子词的商业分析共享该索引及逐词分析结果
+        
+        Args:
+            seed_sessions: 种子词 -> session_id（SearchHistory记录已创建）
+            progress_factory: session_id -> 单个种子词的进度回调(processed, total)
+            batch_progress_callback: 去重后变体词的整体抓取进度(processed, total)
+            status_hook: 种子词状态变化回调(session_id, status, error)
+        """
+        session_ids = list(seed_sessions.values())
+        
+        def notify(session_id: str, status: str, error: str = None):
+            if status_hook:
+                status_hook(session_id, status, error)
+        
+        seed_variants: Dict[str, Dict[str, List[str]]] = {}
+        seed_results: Dict[str, Dict] = {}
+        seed_processed: Dict[str, int] = {}
+        seed_progress: Dict[str, object] = {}
+        # 变体词 -> [(种子词, 变体类型)]
+        variant_owners: Dict[str, List[Tuple[str, str]]] = {}
+        
+        for seed, session_id in seed_sessions.items():
+            variants = KeywordService.generate_variants(seed, variant_types)
+            seed_variants[seed] = variants
+            seed_results[seed] = {
+                'session_id': session_id,
+                'base_keyword': seed,
+                'variant_types': variant_types,
+                'total_variants': sum(len(variant_list) for variant_list in variants.values()),
+                'results': {variant_type: {} for variant_type in variants},
+                'summary': {
+                    'total_suggestions': 0,
+                    'successful_variants': 0,
+                    'failed_variants': 0
+                }
+            }
+            seed_processed[seed] = 0
+            seed_progress[seed] = progress_factory(session_id) if progress_factory else None
+            for variant_type, variant_list in variants.items():
+                for variant_keyword in variant_list:
+                    variant_owners.setdefault(variant_keyword, []).append((seed, variant_type))
+        
+        requested_variants = sum(results['total_variants'] for results in seed_results.values())
+        unique_variants = len(variant_owners)
+        
+        await KeywordService._set_sessions_status(db, session_ids, "running")
+        for session_id in session_ids:
+            notify(session_id, "running")
+        
+        # 5118索引与百度抓取并行构建
+        index_task = asyncio.create_task(BusinessAnalyzer.build_enrichment_index(list(seed_sessions)))
+        
+        processed = 0
+        pending_rows: List[Dict] = []
+        try:
+            async with BaiduSuggestService() as baidu_service:
+                async for variant_keyword, suggestions in baidu_service.iter_suggestions(
+                    list(variant_owners.keys()),
+                    concurrency=int(settings.BAIDU_CONCURRENCY_MAX)  # 实际并发由自适应控制器调节
+                ):
+                    processed += 1
+                    if batch_progress_callback:
+                        await batch_progress_callback(processed, unique_variants)
+                    
+                    for seed, variant_type in variant_owners[variant_keyword]:
+                        results = seed_results[seed]
+                        seed_processed[seed] += 1
+                        if seed_progress[seed]:
+                            await seed_progress[seed](seed_processed[seed], results['total_variants'])
+                        
+                        if suggestions:
+                            results['results'][variant_type][variant_keyword] = suggestions
+                            results['summary']['successful_variants'] += 1
+                            results['summary']['total_suggestions'] += len(suggestions)
+                            pending_rows.extend(
+                                {
+                                    'session_id': results['session_id'],
+                                    'variant_type': variant_type,
+                                    'variant_keyword': variant_keyword,
+                                    'suggestion': suggestion,
+                                    'suggestion_rank': rank
+                                }
+                                for rank, suggestion in enumerate(suggestions, 1)
+                            )
+                        else:
+                            results['summary']['failed_variants'] += 1
+                    
+                    if len(pending_rows) >= settings.RESULT_INSERT_BATCH_SIZE:
+                        await KeywordService._flush_results(db, pending_rows)
+            
+            await KeywordService._flush_results(db, pending_rows)
+            enrichment_index = await index_task
+        except Exception as e:
+            await db.rollback()
+            await KeywordService._set_sessions_status(db, session_ids, "failed")
+            for session_id in session_ids:
+                notify(session_id, "failed", str(e))
+            raise
+        finally:
+            # 被取消时running会话由下次启动的任务恢复流程标记为失败
+            if not index_task.done():
+                index_task.cancel()
+        
+        # 逐个种子词完成去重与商业分析，5118结果跨种子词复用
+        metrics_memo: Dict[str, Dict] = {}
+        sessions: Dict[str, Dict] = {}
+        for seed in seed_sessions:
+            results = seed_results.pop(seed)
+            session_id = results['session_id']
+            try:
+                for variant_type, variant_list in seed_variants[seed].items():
+                    fetched = results['results'][variant_type]
+                    results['results'][variant_type] = {
+                        vk: fetched[vk] for vk in variant_list if vk in fetched
+                    }
+                results = KeywordService._deduplicate_suggestions(results)
+                results = await KeywordService._add_business_analysis(results, enrichment_index, metrics_memo)
+                await KeywordService.save_business_analysis(results)
+                
+                await db.execute(
+                    update(SearchHistory)
+                    .where(SearchHistory.session_id == session_id)
+                    .values(total_suggestions=results['summary']['total_suggestions'], status="completed")
+                )
+                await db.commit()
+                status, error = "completed", None
+            except Exception as e:
+                logger.error(f"种子词分析失败 {seed}: {e}")
+                await db.rollback()
+                await KeywordService._set_sessions_status(db, [session_id], "failed")
+                status, error = "failed", str(e)
+            notify(session_id, status, error)
+            
+            sessions[seed] = {
+                'session_id': session_id,
+                'status': status,
+                'error': error,
+                'total_suggestions': results['summary']['total_suggestions'],
+                'unique_suggestions': results['summary'].get('unique_suggestions', 0),
+                'average_commercial_score': results['summary'].get('average_commercial_score', 0)
+            }
+        
+        return {
+            'seeds': len(seed_sessions),
+            'requested_variants': requested_variants,
+            'unique_variants': unique_variants,
+            'deduplicated_variants': requested_variants - unique_variants,
+            'enrichment_index_size': len(enrichment_index),
+            'metrics_analyzed': len(metrics_memo),
+            'sessions': sessions
+        }
+    
     @staticmethod
     async def get_search_history(db: AsyncSession, limit: int = 10) -> List[Dict]:
         """获取搜索历史"""
@@ -320,6 +711,22 @@ class KeywordService:
             for h in histories
         ]
     
+    @staticmethod
+    async def get_session_status(session_id: str, db: AsyncSession) -> Optional[str]:
+        """获取会话任务状态，会话不存在时返回None"""
+        result = await db.execute(
+            select(SearchHistory.status).where(SearchHistory.session_id == session_id)
+        )
+        return result.scalars().first()
+    
+    @staticmethod
+    async def session_has_results(session_id: str, db: AsyncSession) -> bool:
+        """会话是否存在结果行"""
+        result = await db.execute(
+            select(KeywordResult.id).where(KeywordResult.session_id == session_id).limit(1)
+        )
+        return result.first() is not None
+    
     @staticmethod
     async def get_session_results(session_id: str, db: AsyncSession) -> Dict:
         """获取特定会话的结果"""
@@ -336,24 +743,31 @@ class KeywordService:
                 'results': {}
             }
         
-        # 查询关键词结果
-        query = select(KeywordResult).where(
-            KeywordResult.original_keyword == original_keyword
-        ).order_by(KeywordResult.variant_type, KeywordResult.variant_keyword, KeywordResult.suggestion_rank)
+        result = await db.execute(KeywordService.session_rows_query(session_id))
         
-        result = await db.execute(query)
-        keyword_results = result.scalars().all()
-        
-        # 按类型组织数据
+        # 单次遍历按类型组织数据
         organized_results = {}
-        for kr in keyword_results:
-            if kr.variant_type not in organized_results:
-                organized_results[kr.variant_type] = {}
-            if kr.variant_keyword not in organized_results[kr.variant_type]:
-                organized_results[kr.variant_type][kr.variant_keyword] = []
-            organized_results[kr.variant_type][kr.variant_keyword].append(kr.suggestion)
+        current_type = current_keyword = None
+        current_list = None
+        for type_code, variant_keyword, suggestion, _ in result:
+            variant_type = VARIANT_TYPE_NAMES.get(type_code, 'unknown')
+            if variant_type != current_type:
+                current_type = variant_type
+                current_keyword = None
+                organized_results.setdefault(variant_type, {})
+            if variant_keyword != current_keyword:
+                current_keyword = variant_keyword
+                current_list = organized_results[variant_type].setdefault(variant_keyword, [])
+            current_list.append(suggestion)
+        
+        # 变体关键词按文本排列（与生成顺序一致），只对变体关键词排序而不是对所有结果行排序
+        organized_results = {
+            variant_type: dict(sorted(variant_data.items()))
+            for variant_type, variant_data in organized_results.items()
+        }
         
         return {
             'session_id': session_id,
+            'base_keyword': original_keyword,
             'results': organized_results
         }
\ No newline at end of file
@@ -0,0 +1,70 @@
+"""
+计算任务卸载
+CPU密集的分析放入进程池，pandas等写文件操作放入线程池，避免阻塞事件循环
+"""
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Optional
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+class Offloader:
+    """进程池/线程池卸载器"""
+
+    def __init__(
+        self,
+        cpu_workers: int = settings.CPU_POOL_WORKERS,
+        io_workers: int = settings.IO_POOL_WORKERS,
+        min_items: int = settings.OFFLOAD_MIN_ITEMS
+    ):
+        self.cpu_workers = cpu_workers
+        self.io_workers = io_workers
+        self.min_items = min_items  # 数据量低于该阈值时直接在事件循环内执行
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        self._thread_pool: Optional[ThreadPoolExecutor] = None
+
+    def start(self):
+        """创建执行池（应用启动时调用）"""
+        if self.cpu_workers > 0 and self._process_pool is None:
+            # 启动时事件循环、连接池线程已存在，fork多线程进程可能导致子进程死锁，改用spawn
+            self._process_pool = ProcessPoolExecutor(
+                max_workers=self.cpu_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        if self.io_workers > 0 and self._thread_pool is None:
+            self._thread_pool = ThreadPoolExecutor(max_workers=self.io_workers, thread_name_prefix="offload-io")
+        logger.info(f"计算卸载池已创建: 进程 {self.cpu_workers}, 线程 {self.io_workers}")
+
+    def close(self):
+        """关闭执行池（应用关闭时调用）"""
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=False, cancel_futures=True)
+            self._process_pool = None
+        if self._thread_pool is not None:
+            self._thread_pool.shutdown(wait=False, cancel_futures=True)
+            self._thread_pool = None
+
+    async def run_cpu(self, func: Callable, *args, size: int = 0) -> Any:
+        """
+        在进程池中执行CPU密集函数
+
+        func及其参数、返回值需可pickle；size小于阈值或进程池未启用时直接执行
+        """
+        if self._process_pool is None or size < self.min_items:
+            return func(*args)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._process_pool, partial(func, *args))
+
+    async def run_io(self, func: Callable, *args, size: int = 0) -> Any:
+        """在线程池中执行阻塞的写文件/序列化操作"""
+        if self._thread_pool is None or size < self.min_items:
+            return func(*args)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._thread_pool, partial(func, *args))
+
+# 进程级共享卸载器
+offloader = Offloader()
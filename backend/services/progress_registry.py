@@ -0,0 +1,150 @@
+"""
+分析进度注册表
+有界存储各会话进度，结束的会话按TTL淘汰，并向订阅者推送进度事件
+"""
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import AsyncIterator, Dict, Optional, Set
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+FINISHED_STATUSES = {'completed', 'error'}
+
+class ProgressRegistry:
+    """有界进度注册表"""
+
+    def __init__(
+        self,
+        max_sessions: int = settings.PROGRESS_MAX_SESSIONS,
+        ttl: int = settings.PROGRESS_TTL
+    ):
+        self.max_sessions = max_sessions
+        self.ttl = ttl  # 已结束会话的保留秒数
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+
+    def start(self, session_id: str, status: str = 'running') -> Dict:
+        """初始化会话进度"""
+        self._evict()
+        self._entries[session_id] = {
+            'processed': 0,
+            'total': 0,
+            'percentage': 0.0,
+            'status': status,
+            'error': None,
+            'updated_at': time.time(),
+            'finished_at': None
+        }
+        self._publish(session_id)
+        return self._entries[session_id]
+
+    def update(self, session_id: str, **fields):
+        """更新会话进度并推送给订阅者"""
+        entry = self._entries.get(session_id)
+        if entry is None:
+            entry = self.start(session_id)
+        entry.update(fields)
+        entry['updated_at'] = time.time()
+        if entry['status'] in FINISHED_STATUSES and entry['finished_at'] is None:
+            entry['finished_at'] = entry['updated_at']
+        self._publish(session_id)
+
+    def get(self, session_id: str) -> Optional[Dict]:
+        entry = self._entries.get(session_id)
+        if entry is not None and self._expired(entry):
+            self._remove(session_id)
+            return None
+        return entry
+
+    def snapshot(self, session_id: str) -> Dict:
+        """对外输出的进度结构"""
+        entry = self.get(session_id)
+        if entry is None:
+            return {
+                'session_id': session_id,
+                'processed': 0,
+                'total': 0,
+                'percentage': 0.0,
+                'status': 'not_found',
+                'error': '会话不存在'
+            }
+        return {
+            'session_id': session_id,
+            'processed': entry.get('processed', 0),
+            'total': entry.get('total', 0),
+            'percentage': entry.get('percentage', 0.0),
+            'status': entry.get('status', 'unknown'),
+            'error': entry.get('error')
+        }
+
+    async def subscribe(self, session_id: str, heartbeat: float = 15.0) -> AsyncIterator[Optional[Dict]]:
+        """
+        订阅会话进度，每次变化产出最新快照，会话结束后停止
+
+        超过heartbeat秒无变化时产出None，供调用方发送心跳
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=1)
+        self._subscribers.setdefault(session_id, set()).add(queue)
+        try:
+            snapshot = self.snapshot(session_id)
+            yield snapshot
+            if snapshot['status'] in FINISHED_STATUSES or snapshot['status'] == 'not_found':
+                return
+            while True:
+                try:
+                    snapshot = await asyncio.wait_for(queue.get(), timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                yield snapshot
+                if snapshot['status'] in FINISHED_STATUSES:
+                    return
+        finally:
+            subscribers = self._subscribers.get(session_id)
+            if subscribers is not None:
+                subscribers.discard(queue)
+                if not subscribers:
+                    del self._subscribers[session_id]
+
+    def _publish(self, session_id: str):
+        subscribers = self._subscribers.get(session_id)
+        if not subscribers:
+            return
+        snapshot = self.snapshot(session_id)
+        for queue in subscribers:
+            # 只保留最新快照，慢订阅者不会积压
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(snapshot)
+
+    def _expired(self, entry: Dict) -> bool:
+        return entry['finished_at'] is not None and time.time() - entry['finished_at'] > self.ttl
+
+    def _remove(self, session_id: str):
+        self._entries.pop(session_id, None)
+
+    def _evict(self):
+        """淘汰过期会话；超过容量时优先淘汰最早结束的会话"""
+        for session_id in [sid for sid, entry in self._entries.items() if self._expired(entry)]:
+            self._remove(session_id)
+
+        overflow = len(self._entries) - self.max_sessions + 1
+        if overflow <= 0:
+            return
+        finished = [sid for sid, entry in self._entries.items() if entry['finished_at'] is not None]
+        for session_id in finished[:overflow]:
+            self._remove(session_id)
+            overflow -= 1
+        while overflow > 0 and self._entries:
+            session_id, _ = self._entries.popitem(last=False)
+            logger.warning(f"进度注册表已满，淘汰运行中会话: {session_id}")
+            overflow -= 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+# 进程级进度注册表
+progress_registry = ProgressRegistry()
@@ -0,0 +1,106 @@
+"""
+自适应速率控制
+基于AIMD（加性增、乘性减）动态调整对百度接口的并发上限
+"""
+import time
+import asyncio
+import logging
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Dict
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+class AdaptiveRateController:
+    """AIMD并发控制器"""
+
+    def __init__(
+        self,
+        floor: float = settings.BAIDU_CONCURRENCY_MIN,
+        ceiling: float = settings.BAIDU_CONCURRENCY_MAX,
+        initial: float = settings.BAIDU_CONCURRENCY_INITIAL,
+        increase_step: float = settings.BAIDU_AIMD_INCREASE,
+        decrease_factor: float = settings.BAIDU_AIMD_DECREASE,
+        cooldown: float = 1.0
+    ):
+        # 下限至少为1：上限取整为0时slot()的等待条件永远无法满足
+        self.floor = max(1.0, floor)
+        self.ceiling = max(ceiling, self.floor)
+        self.limit = min(max(initial, self.floor), self.ceiling)
+        self.increase_step = increase_step  # 每个窗口（limit次成功）增加的并发数
+        self.decrease_factor = decrease_factor
+        self.cooldown = cooldown  # 同一波失败只退避一次
+        self.in_flight = 0
+        self._condition = asyncio.Condition()
+        self._last_decrease = 0.0
+        self._completed = deque(maxlen=200)  # 最近完成请求的时间戳，用于计算实时速率
+        self.stats = {'successes': 0, 'failures': 0, 'increases': 0, 'decreases': 0}
+
+    @asynccontextmanager
+    async def slot(self):
+        """占用一个并发槽位，超过当前上限时等待"""
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+        try:
+            yield
+        finally:
+            async with self._condition:
+                self.in_flight -= 1
+                self._completed.append(time.monotonic())
+                self._condition.notify_all()
+
+    def record_success(self):
+        """200且JSONP有效：加性增"""
+        self.stats['successes'] += 1
+        if self.limit < self.ceiling:
+            old_limit = int(self.limit)
+            self.limit = min(self.ceiling, self.limit + self.increase_step / self.limit)
+            if int(self.limit) > old_limit:
+                self.stats['increases'] += 1
+                self._wake()
+
+    def record_failure(self, reason: str = ""):
+        """超时、连接异常、非200或响应格式异常：乘性减"""
+        self.stats['failures'] += 1
+        now = time.monotonic()
+        if now - self._last_decrease < self.cooldown:
+            return
+        self._last_decrease = now
+        old_limit = self.limit
+        self.limit = max(self.floor, self.limit * self.decrease_factor)
+        if self.limit < old_limit:
+            self.stats['decreases'] += 1
+            logger.info(f"百度请求并发下调: {old_limit:.2f} -> {self.limit:.2f} ({reason})")
+
+    def _wake(self):
+        """上限提高后唤醒等待中的请求"""
+        async def notify():
+            async with self._condition:
+                self._condition.notify_all()
+        try:
+            asyncio.get_running_loop().create_task(notify())
+        except RuntimeError:
+            pass
+
+    def current_rate(self) -> float:
+        """最近窗口内的实际请求速率(次/秒)"""
+        if len(self._completed) < 2:
+            return 0.0
+        span = time.monotonic() - self._completed[0]
+        return round(len(self._completed) / span, 2) if span > 0 else 0.0
+
+    def get_stats(self) -> Dict:
+        return {
+            **self.stats,
+            'concurrency_limit': round(self.limit, 2),
+            'effective_concurrency': int(self.limit),
+            'in_flight': self.in_flight,
+            'requests_per_second': self.current_rate(),
+            'floor': self.floor,
+            'ceiling': self.ceiling
+        }
+
+# 进程级共享控制器（所有会话共同受限于同一上游）
+baidu_rate_controller = AdaptiveRateController()
@@ -0,0 +1,52 @@
+"""
+上游请求合并（single-flight）
+同一键的并发请求共享同一次上游调用及其结果或异常
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+logger = logging.getLogger(__name__)
+
+class SingleFlight:
+    """进程内请求合并器"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+        self.stats = {'executed': 0, 'coalesced': 0}
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        执行func，同一key已有进行中的调用时直接等待其结果
+
+        上游调用在独立任务中执行：发起方被取消时，其他等待者仍能拿到结果
+        """
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._calls[key] = task
+            task.add_done_callback(lambda done, key=key: self._forget(key, done))
+            self.stats['executed'] += 1
+        else:
+            self.stats['coalesced'] += 1
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # 所有等待者都已取消时，避免出现未读取异常的警告
+        if not task.cancelled() and task.exception() is not None:
+            logger.debug(f"{self.name} 合并请求失败: {key}, 错误: {task.exception()}")
+
+    def get_stats(self) -> Dict:
+        requests = self.stats['executed'] + self.stats['coalesced']
+        return {
+            **self.stats,
+            'in_flight': len(self._calls),
+            'coalesce_rate': round(self.stats['coalesced'] / requests, 4) if requests else 0.0
+        }
+
+# 进程级合并器
+baidu_flight = SingleFlight('百度下拉词')
+five118_flight = SingleFlight('5118关键词')
@@ -0,0 +1,173 @@
+"""
+下拉词缓存服务
+内存LRU + SQLite持久化的两级缓存，按变体关键词缓存百度下拉建议
+"""
+import json
+import time
+import logging
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import select, delete, func
+from database import AsyncSessionLocal, AsyncReadSessionLocal, SuggestionCacheEntry
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+class SuggestionCache:
+    """两级下拉词缓存"""
+
+    def __init__(
+        self,
+        ttl: int = settings.SUGGESTION_CACHE_TTL,
+        memory_size: int = settings.SUGGESTION_CACHE_MEMORY_SIZE,
+        max_entries: int = settings.SUGGESTION_CACHE_MAX_ENTRIES,
+        enabled: bool = settings.SUGGESTION_CACHE_ENABLED
+    ):
+        self.ttl = ttl
+        self.memory_size = memory_size
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self._memory: "OrderedDict[str, Tuple[float, List[str]]]" = OrderedDict()
+        self._writes_since_evict = 0
+        self.stats = {
+            'memory_hits': 0,
+            'sqlite_hits': 0,
+            'misses': 0,
+            'writes': 0,
+            'evictions': 0
+        }
+
+    @staticmethod
+    def cache_key(keyword: str) -> str:
+        """规范化缓存键"""
+        return keyword.strip().lower()
+
+    def _is_fresh(self, fetched_at: float) -> bool:
+        return time.time() - fetched_at < self.ttl
+
+    def _remember(self, key: str, fetched_at: float, suggestions: List[str]):
+        """写入内存LRU并淘汰最久未使用的条目"""
+        self._memory[key] = (fetched_at, suggestions)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+            self.stats['evictions'] += 1
+
+    async def get(self, keyword: str) -> Optional[List[str]]:
+        """读取缓存，未命中或已过期返回None"""
+        if not self.enabled:
+            return None
+
+        key = self.cache_key(keyword)
+
+        # 1. 内存LRU
+        cached = self._memory.get(key)
+        if cached is not None:
+            fetched_at, suggestions = cached
+            if self._is_fresh(fetched_at):
+                self._memory.move_to_end(key)
+                self.stats['memory_hits'] += 1
+                return list(suggestions)
+            del self._memory[key]
+
+        # 2. SQLite持久层
+        try:
+            async with AsyncReadSessionLocal() as db:
+                result = await db.execute(
+                    select(SuggestionCacheEntry.suggestions, SuggestionCacheEntry.fetched_at).where(
+                        SuggestionCacheEntry.keyword == key
+                    )
+                )
+                row = result.first()
+        except Exception as e:
+            logger.warning(f"读取下拉词缓存失败: {keyword}, 错误: {e}")
+            row = None
+
+        if row is not None and self._is_fresh(row.fetched_at):
+            suggestions = json.loads(row.suggestions)
+            self._remember(key, row.fetched_at, suggestions)
+            self.stats['sqlite_hits'] += 1
+            return list(suggestions)
+
+        self.stats['misses'] += 1
+        return None
+
+    async def set(self, keyword: str, suggestions: List[str]):
+        """写入缓存（空结果不缓存，避免固化失败请求）"""
+        if not self.enabled or not suggestions:
+            return
+
+        key = self.cache_key(keyword)
+        fetched_at = time.time()
+        self._remember(key, fetched_at, list(suggestions))
+
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.merge(SuggestionCacheEntry(
+                    keyword=key,
+                    suggestions=json.dumps(suggestions, ensure_ascii=False),
+                    fetched_at=fetched_at
+                ))
+                await db.commit()
+            self.stats['writes'] += 1
+            self._writes_since_evict += 1
+        except Exception as e:
+            logger.warning(f"写入下拉词缓存失败: {keyword}, 错误: {e}")
+            return
+
+        # 每写入一批执行一次持久层淘汰
+        if self._writes_since_evict >= 500:
+            self._writes_since_evict = 0
+            await self.evict()
+
+    async def evict(self) -> int:
+        """清理过期条目，并将SQLite条目数控制在上限以内"""
+        removed = 0
+        try:
+            async with AsyncSessionLocal() as db:
+                expired = await db.execute(
+                    delete(SuggestionCacheEntry).where(
+                        SuggestionCacheEntry.fetched_at < time.time() - self.ttl
+                    )
+                )
+                removed += expired.rowcount or 0
+
+                count = (await db.execute(select(func.count()).select_from(SuggestionCacheEntry))).scalar_one()
+                overflow = count - self.max_entries
+                if overflow > 0:
+                    oldest = select(SuggestionCacheEntry.keyword).order_by(
+                        SuggestionCacheEntry.fetched_at
+                    ).limit(overflow)
+                    trimmed = await db.execute(
+                        delete(SuggestionCacheEntry).where(SuggestionCacheEntry.keyword.in_(oldest))
+                    )
+                    removed += trimmed.rowcount or 0
+                await db.commit()
+        except Exception as e:
+            logger.warning(f"清理下拉词缓存失败: {e}")
+
+        self.stats['evictions'] += removed
+        return removed
+
+    async def clear(self):
+        """清空两级缓存"""
+        self._memory.clear()
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(SuggestionCacheEntry))
+            await db.commit()
+
+    def get_stats(self) -> Dict:
+        """获取缓存命中统计"""
+        hits = self.stats['memory_hits'] + self.stats['sqlite_hits']
+        lookups = hits + self.stats['misses']
+        return {
+            **self.stats,
+            'hits': hits,
+            'hit_rate': round(hits / lookups, 4) if lookups else 0.0,
+            'memory_entries': len(self._memory),
+            'ttl': self.ttl,
+            'enabled': self.enabled
+        }
+
+# 进程级共享缓存实例
+suggestion_cache = SuggestionCache()
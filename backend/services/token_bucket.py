@@ -0,0 +1,93 @@
+"""
+令牌桶调度
+按套餐QPS/突发量为上游调用发放令牌，调用方等待令牌而不是固定休眠
+"""
+import time
+import asyncio
+import logging
+from typing import Dict
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+class TokenBucket:
+    """进程级令牌桶，等待者按到达顺序获取令牌"""
+
+    def __init__(
+        self,
+        name: str,
+        rate: float = settings.FIVE118_QPS,
+        burst: int = settings.FIVE118_BURST,
+        backoff_base: float = settings.FIVE118_RATE_LIMIT_BACKOFF,
+        backoff_max: float = settings.FIVE118_RATE_LIMIT_BACKOFF_MAX
+    ):
+        self.name = name
+        self.rate = rate  # 每秒补充的令牌数
+        self.burst = max(1, burst)  # 桶容量
+        self.backoff_base = backoff_base  # 被限流后暂停发放令牌的初始秒数
+        self.backoff_max = backoff_max
+        self._tokens = float(self.burst)
+        self._updated_at = time.monotonic()
+        self._paused_until = 0.0
+        self._consecutive_limits = 0
+        self._lock = asyncio.Lock()
+        self.waiting = 0
+        self.stats = {'granted': 0, 'rate_limited': 0, 'waited_seconds': 0.0}
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    async def acquire(self):
+        """等待并取得一个令牌"""
+        started = time.monotonic()
+        self.waiting += 1
+        try:
+            # 持锁等待保证先到先得，且不会同时放行超过桶内令牌数的请求
+            async with self._lock:
+                while True:
+                    now = time.monotonic()
+                    if now < self._paused_until:
+                        await asyncio.sleep(self._paused_until - now)
+                        continue
+                    self._refill(now)
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        break
+                    await asyncio.sleep((1 - self._tokens) / self.rate)
+        finally:
+            self.waiting -= 1
+        self.stats['granted'] += 1
+        self.stats['waited_seconds'] += time.monotonic() - started
+
+    def record_success(self):
+        """请求未被限流，重置退避"""
+        self._consecutive_limits = 0
+
+    def record_rate_limited(self):
+        """上游返回限流错误：清空令牌并按指数退避暂停发放"""
+        self.stats['rate_limited'] += 1
+        delay = min(self.backoff_max, self.backoff_base * (2 ** self._consecutive_limits))
+        self._consecutive_limits += 1
+        now = time.monotonic()
+        self._tokens = 0.0
+        self._updated_at = max(now, self._paused_until, now + delay)
+        self._paused_until = self._updated_at
+        logger.warning(f"{self.name}被限流，暂停发放令牌 {delay:.1f} 秒")
+
+    def get_stats(self) -> Dict:
+        now = time.monotonic()
+        return {
+            'name': self.name,
+            'rate': self.rate,
+            'burst': self.burst,
+            'tokens': round(min(self.burst, self._tokens + max(0.0, now - self._updated_at) * self.rate), 2),
+            'waiting': self.waiting,
+            'paused_for': round(max(0.0, self._paused_until - now), 1),
+            'granted': self.stats['granted'],
+            'rate_limited': self.stats['rate_limited'],
+            'waited_seconds': round(self.stats['waited_seconds'], 1)
+        }
+
+# 所有5118请求共享的令牌桶
+five118_scheduler = TokenBucket('5118')
@@ -0,0 +1,29 @@
+"""
+测试公共配置
+数据库URL为相对路径，导入业务模块前切换到临时目录，避免写入开发数据库
+"""
+import os
+import sys
+import asyncio
+import tempfile
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+os.chdir(tempfile.mkdtemp(prefix="keyword-analyzer-tests-"))
+
+from database import async_engine, read_engine, create_tables  # noqa: E402
+
+def run_async(coro):
+    """在新事件循环中执行协程，结束后释放数据库连接（连接不能跨事件循环复用）"""
+    async def runner():
+        try:
+            return await coro
+        finally:
+            await async_engine.dispose()
+            await read_engine.dispose()
+    return asyncio.run(runner())
+
+@pytest.fixture(scope="session", autouse=True)
+def tables():
+    run_async(create_tables())
@@ -0,0 +1,42 @@
+import asyncio
+from sqlalchemy import select
+from conftest import run_async
+from database import AsyncSessionLocal, SearchHistory
+from services.baidu_service import BaiduSuggestService
+from services.business_analyzer import BusinessAnalyzer
+from services.batch_service import BatchAnalysisManager
+
+def test_interrupted_batch_marks_sessions_failed(monkeypatch):
+    async def hanging_suggestions(self, keywords, concurrency=None):
+        await asyncio.sleep(3600)
+        yield keywords[0], []
+
+    async def empty_index(seeds):
+        return {}
+
+    monkeypatch.setattr(BaiduSuggestService, "iter_suggestions", hanging_suggestions)
+    monkeypatch.setattr(BusinessAnalyzer, "build_enrichment_index", staticmethod(empty_index))
+
+    async def scenario():
+        manager = BatchAnalysisManager(max_running=1)
+        batch = await manager.submit(["手机", "电脑"], ["alpha"])
+        session_ids = list(batch['sessions'].values())
+
+        for _ in range(200):
+            await asyncio.sleep(0.01)
+            async with AsyncSessionLocal() as db:
+                statuses = (await db.execute(
+                    select(SearchHistory.status).where(SearchHistory.session_id.in_(session_ids))
+                )).scalars().all()
+            if set(statuses) == {"running"}:
+                break
+        assert set(statuses) == {"running"}
+
+        await manager.stop()
+        async with AsyncSessionLocal() as db:
+            statuses = (await db.execute(
+                select(SearchHistory.status).where(SearchHistory.session_id.in_(session_ids))
+            )).scalars().all()
+        return batch['status'], set(statuses)
+
+    assert run_async(scenario()) == ('failed', {"failed"})
@@ -0,0 +1,208 @@
+import asyncio
+from dataclasses import asdict
+import pytest
+from services.business_analyzer import BusinessAnalyzer, MAX_ANALYZE_COUNT
+from services.five118_service import KeywordData5118, normalize_keyword
+from services.keyword_service import KeywordService
+from services import keyword_service as keyword_module
+from services.offload import Offloader
+from services.analysis_store import analysis_store
+
+SEED = "手机"
+REAL_DATA = {"手机价格", "手机推荐", "手机回收"}  # 5118索引命中
+FAILING = {"手机维修", "手机壳"}  # 逐词查询抛出异常
+
+def _kw_data(keyword):
+    return KeywordData5118(
+        keyword=keyword, index=1200, mobile_index=900, haosou_index=100, douyin_index=50,
+        long_keyword_count=300, bidword_company_count=40, bidword_kwc=2, bidword_pcpv=500,
+        bidword_wisepv=800, sem_reason="", sem_price="1.5", page_url=""
+    )
+
+def _fixed_results():
+    """三个变体类型共享部分建议词，且部分共享词只落在某个类型的前N个之内"""
+    shared = ["手机价格", "手机推荐", "手机维修", "手机回收", "手机壳"]
+    filler = [f"手机配件{i}" for i in range(MAX_ANALYZE_COUNT)]
+    return {
+        'session_id': 'equivalence',
+        'base_keyword': SEED,
+        'summary': {},
+        'results': {
+            'alpha': {
+                '手机a': shared[:3] + filler[:4],
+                '手机b': filler[4:16] + ["手机贴膜"],
+                '手机c': shared[3:] + ["手机怎么截图"],  # 超出本类型前N个，即使其他类型分析过也按估算处理
+            },
+            'alpha_space': {
+                '手机 a': ["手机壳", "手机回收", "手机价格"],
+                '手机 b': ["手机贴膜", "手机配件3"],
+            },
+            'question_how': {
+                '手机怎么a': ["手机怎么截图", "手机维修", "手机配件0"],
+                '手机怎么b': [],
+            }
+        }
+    }
+
+@pytest.fixture
+def fake_upstream(monkeypatch):
+    calls = {'index': 0, 'per_word': []}
+
+    async def build_index(seeds):
+        calls['index'] += 1
+        return {normalize_keyword(keyword): _kw_data(keyword) for keyword in REAL_DATA}
+
+    async def per_word(keyword, enable_5118=True):
+        calls['per_word'].append(keyword)
+        if keyword in FAILING:
+            raise RuntimeError("5118 unavailable")
+        return BusinessAnalyzer.analyze_keyword(keyword)
+
+    monkeypatch.setattr(BusinessAnalyzer, "build_enrichment_index", staticmethod(build_index))
+    monkeypatch.setattr(BusinessAnalyzer, "analyze_with_real_data", staticmethod(per_word))
+    monkeypatch.setattr(analysis_store, "enabled", False)
+    return calls
+
+def _estimated_entry(suggestion, suggestions_count):
+    metrics = BusinessAnalyzer.analyze_keyword(suggestion, suggestions_count)
+    return {
+        'keyword': suggestion,
+        'commercial_score': metrics.commercial_score,
+        'intent_type': metrics.intent_type,
+        'competition_level': metrics.competition_level,
+        'search_volume_estimate': metrics.search_volume_estimate,
+        'difficulty_score': metrics.difficulty_score,
+        'opportunity_score': metrics.opportunity_score,
+        'is_blue_ocean': metrics.is_blue_ocean,
+        'real_data_available': False
+    }
+
+async def _legacy_list_analysis(suggestions):
+    """引入富化计划之前：每个变体类型独立构建索引并逐词分析"""
+    original_count = len(suggestions)
+    unique_suggestions = list(dict.fromkeys(suggestions))[:MAX_ANALYZE_COUNT]
+    index = await BusinessAnalyzer.build_enrichment_index([SEED])
+
+    analyzed = []
+    for suggestion in unique_suggestions:
+        kw_data = index.get(normalize_keyword(suggestion))
+        try:
+            metrics = (
+                BusinessAnalyzer._analyze_with_5118_data(kw_data) if kw_data is not None
+                else await BusinessAnalyzer.analyze_with_real_data(suggestion, True)
+            )
+        except Exception:
+            continue  # 失败的词不计入汇总
+        analyzed.append({'keyword': suggestion, 'metrics': metrics, 'success': True})
+
+    intent_counts = {}
+    for item in analyzed:
+        intent_counts[item['metrics'].intent_type] = intent_counts.get(item['metrics'].intent_type, 0) + 1
+    return {
+        'total_count': original_count,
+        'average_commercial_score': round(sum(i['metrics'].commercial_score for i in analyzed) / len(analyzed), 1),
+        'intent_distribution': intent_counts,
+        'top_opportunities': [
+            {
+                'keyword': item['keyword'],
+                'commercial_score': item['metrics'].commercial_score,
+                'opportunity_score': item['metrics'].opportunity_score,
+                'intent_type': item['metrics'].intent_type,
+                'search_volume_estimate': item['metrics'].search_volume_estimate,
+                'is_blue_ocean': item['metrics'].is_blue_ocean,
+                'business_tier': BusinessAnalyzer.get_business_tier(item['metrics']),
+                'real_data_available': item['metrics'].real_data_available
+            }
+            for item in BusinessAnalyzer.smart_sort_opportunities(analyzed)
+        ]
+    }
+
+async def _legacy_add_business_analysis(results):
+    business_analysis = {}
+    total_score = 0
+    total_analyzed = 0
+    intent_distribution = {}
+    for variant_type, variant_data in results['results'].items():
+        variant_analysis = {
+            'average_commercial_score': 0,
+            'top_opportunities': [],
+            'intent_distribution': {},
+            'suggestions_analysis': {}
+        }
+        all_suggestions = [s for suggestions in variant_data.values() for s in suggestions]
+        if all_suggestions:
+            limited = all_suggestions[:MAX_ANALYZE_COUNT]
+            list_analysis = await _legacy_list_analysis(limited)
+            variant_analysis['average_commercial_score'] = list_analysis['average_commercial_score']
+            variant_analysis['top_opportunities'] = list_analysis['top_opportunities']
+            variant_analysis['intent_distribution'] = list_analysis['intent_distribution']
+            for variant_keyword, suggestions in variant_data.items():
+                entries = []
+                for suggestion in suggestions[:5]:
+                    found = None
+                    if suggestion in limited:
+                        found = next(
+                            (opp for opp in list_analysis['top_opportunities'] if opp['keyword'] == suggestion),
+                            None
+                        )
+                    entries.append(found or _estimated_entry(suggestion, len(suggestions)))
+                variant_analysis['suggestions_analysis'][variant_keyword] = entries
+            total_score += list_analysis['average_commercial_score'] * list_analysis['total_count']
+            total_analyzed += list_analysis['total_count']
+            for intent, count in list_analysis['intent_distribution'].items():
+                intent_distribution[intent] = intent_distribution.get(intent, 0) + count
+        business_analysis[variant_type] = variant_analysis
+
+    all_opportunities = [opp for analysis in business_analysis.values() for opp in analysis['top_opportunities']]
+    return {
+        'business_analysis': business_analysis,
+        'average_commercial_score': round(total_score / total_analyzed, 1) if total_analyzed else 0,
+        'intent_distribution': intent_distribution,
+        'top_opportunities': sorted(all_opportunities, key=lambda x: x['opportunity_score'], reverse=True)[:10]
+    }
+
+def test_enrichment_plan_matches_per_variant_analysis(fake_upstream):
+    expected = asyncio.run(_legacy_add_business_analysis(_fixed_results()))
+    legacy_calls = len(fake_upstream['per_word'])
+    fake_upstream['per_word'].clear()
+    fake_upstream['index'] = 0
+
+    results = asyncio.run(KeywordService._add_business_analysis(_fixed_results()))
+
+    assert results['business_analysis'] == expected['business_analysis']
+    assert results['summary']['average_commercial_score'] == expected['average_commercial_score']
+    assert results['summary']['intent_distribution'] == expected['intent_distribution']
+    assert results['summary']['top_opportunities'] == expected['top_opportunities']
+
+    # 每个词最多富化一次，索引只构建一次
+    assert fake_upstream['index'] == 1
+    assert len(fake_upstream['per_word']) == len(set(fake_upstream['per_word']))
+    assert len(fake_upstream['per_word']) < legacy_calls
+
+def test_failed_enrichment_estimates_with_variant_list_size(fake_upstream):
+    results = _fixed_results()
+    metrics_memo = {}
+    asyncio.run(KeywordService._add_business_analysis(results, metrics_memo=metrics_memo))
+
+    # 手机维修首次出现在alpha的前N个建议词中，按该列表的去重词数估算
+    alpha_slice = [s for suggestions in results['results']['alpha'].values() for s in suggestions][:MAX_ANALYZE_COUNT]
+    assert "手机维修" in alpha_slice
+    failed = metrics_memo["手机维修"]
+    assert not failed['success']
+    expected = BusinessAnalyzer.analyze_keyword("手机维修", len(set(alpha_slice)))
+    expected.real_data_available = False
+    assert asdict(failed['metrics']) == asdict(expected)
+
+def test_offloaded_summary_matches_inline(fake_upstream, monkeypatch):
+    inline = asyncio.run(KeywordService._add_business_analysis(_fixed_results()))
+
+    pooled = Offloader(cpu_workers=1, io_workers=0, min_items=1)
+    pooled.start()
+    monkeypatch.setattr(keyword_module, "offloader", pooled)
+    try:
+        offloaded = asyncio.run(KeywordService._add_business_analysis(_fixed_results()))
+    finally:
+        pooled.close()
+
+    assert offloaded['business_analysis'] == inline['business_analysis']
+    assert offloaded['summary'] == inline['summary']
@@ -0,0 +1,34 @@
+from services.business_analyzer import BusinessAnalyzer
+
+KEYWORDS = [
+    "手机", "手机价格", "手机多少钱", "苹果手机官网购买", "手机哪个牌子好", "手机维修加盟费用",
+    "怎么截图", "如何学习编程", "北京装修公司哪家好", "婚纱摄影价格表", "英语培训机构排名",
+    "减肥", "2024年最新款笔记本电脑推荐性价比高的型号", "a", "",
+    "汽车保险", "律师咨询免费", "医院挂号", "手机壳批发厂家", "旅游攻略",
+]
+
+_COLUMNS = (
+    'commercial_score', 'intent_type', 'competition_level',
+    'search_volume_estimate', 'difficulty_score', 'opportunity_score'
+)
+
+def _assert_rows_match(batch, counts):
+    for index, (keyword, count) in enumerate(zip(KEYWORDS, counts)):
+        metrics = BusinessAnalyzer.analyze_keyword(keyword, count)
+        assert batch['keyword'][index] == keyword
+        for column in _COLUMNS:
+            assert batch[column][index] == getattr(metrics, column), (keyword, count, column)
+
+def test_batch_scores_match_per_keyword_analysis():
+    for count in (0, 2, 3, 5, 8, 15, 40):
+        _assert_rows_match(BusinessAnalyzer.score_keywords_batch(KEYWORDS, count), [count] * len(KEYWORDS))
+
+def test_batch_scores_accept_per_keyword_counts():
+    counts = [(index * 3) % 17 for index in range(len(KEYWORDS))]
+    batch = BusinessAnalyzer.score_keywords_batch(KEYWORDS, counts)
+    _assert_rows_match(batch, counts)
+    # 输入覆盖了多个竞争等级分支
+    assert len(set(batch['competition_level'])) >= 3
+
+def test_batch_scores_empty_input():
+    assert BusinessAnalyzer.score_keywords_batch([], 5) == {column: [] for column in ('keyword', *_COLUMNS)}
@@ -0,0 +1,141 @@
+import asyncio
+import pytest
+import services.five118_service as five118_module
+from services.circuit_breaker import CircuitBreaker, CircuitOpenError, CLOSED, OPEN, HALF_OPEN
+from services.five118_service import FiveOneOneEightService
+from services.token_bucket import TokenBucket
+
+def _breaker(**overrides):
+    options = dict(
+        window_size=10, min_calls=4, failure_rate_threshold=0.5, slow_call_seconds=5,
+        slow_rate_threshold=0.8, open_seconds=30, half_open_calls=1
+    )
+    options.update(overrides)
+    return CircuitBreaker('test', **options)
+
+def _call(breaker, fail=False):
+    with breaker.track() as call:
+        if fail:
+            call.fail()
+
+def _expire_open_period(breaker):
+    breaker._opened_at -= breaker.open_seconds
+
+def test_opens_when_failure_rate_reaches_threshold():
+    breaker = _breaker()
+    for fail in (False, True, False):
+        _call(breaker, fail)
+    assert breaker.state == CLOSED  # 未达到最少调用数
+    _call(breaker, fail=True)
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        _call(breaker)
+    assert breaker.stats['rejected'] == 1
+
+def test_exceptions_inside_track_count_as_failures():
+    breaker = _breaker(min_calls=2)
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            with breaker.track():
+                raise RuntimeError("boom")
+    assert breaker.state == OPEN
+
+def test_opens_on_slow_calls():
+    breaker = _breaker(min_calls=2, slow_call_seconds=0)
+    _call(breaker)
+    _call(breaker)
+    assert breaker.state == OPEN
+
+def test_half_open_probe_success_closes():
+    breaker = _breaker(min_calls=1)
+    _call(breaker, fail=True)
+    _expire_open_period(breaker)
+    assert not breaker.is_open
+
+    with breaker.track():
+        assert breaker.state == HALF_OPEN
+        with pytest.raises(CircuitOpenError):  # 探测名额已被占用
+            _call(breaker)
+    assert breaker.state == CLOSED
+
+def test_half_open_probe_failure_reopens():
+    breaker = _breaker(min_calls=1)
+    _call(breaker, fail=True)
+    _expire_open_period(breaker)
+    _call(breaker, fail=True)
+    assert breaker.state == OPEN
+    assert breaker.stats['opened'] == 2
+
+def test_cancelled_probe_releases_slot():
+    breaker = _breaker(min_calls=1)
+    _call(breaker, fail=True)
+    _expire_open_period(breaker)
+    with pytest.raises(asyncio.CancelledError):
+        with breaker.track():
+            raise asyncio.CancelledError()
+    assert breaker.state == HALF_OPEN
+    _call(breaker)
+    assert breaker.state == CLOSED
+
+class _FakeResponse:
+    status = 200
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def json(self):
+        return {"errcode": "0", "data": {"word": [{"keyword": "手机"}]}}
+
+class _FakeSession:
+    def __init__(self):
+        self.posts = 0
+
+    def post(self, url, **kwargs):
+        self.posts += 1
+        return _FakeResponse()
+
+@pytest.fixture
+def five118(monkeypatch):
+    breaker = _breaker(min_calls=1)
+    bucket = TokenBucket('test', rate=1, burst=1)
+    monkeypatch.setattr(five118_module, "five118_breaker", breaker)
+    monkeypatch.setattr(five118_module, "five118_scheduler", bucket)
+    service = FiveOneOneEightService()
+    service.session = _FakeSession()
+    return service, breaker, bucket
+
+def test_open_breaker_does_not_consume_tokens(five118):
+    service, breaker, bucket = five118
+    _call(breaker, fail=True)
+    assert breaker.state == OPEN
+
+    result = asyncio.run(service._fetch_keyword_data("手机", 1, True, 2))
+    assert result == []
+    assert bucket.stats['granted'] == 0
+    assert bucket._tokens == 1
+    assert service.session.posts == 0
+
+def test_rejected_half_open_call_does_not_wait_for_token(five118):
+    service, breaker, bucket = five118
+    _call(breaker, fail=True)
+    _expire_open_period(breaker)
+    bucket._tokens = 0.0  # 探测请求需等待约1秒的令牌
+
+    async def scenario():
+        probe = asyncio.create_task(service._fetch_keyword_data("手机", 1, True, 2))
+        await asyncio.sleep(0.05)
+        assert bucket.waiting == 1
+        rejected = await asyncio.wait_for(service._fetch_keyword_data("电脑", 1, True, 2), timeout=0.5)
+        assert bucket.waiting == 1
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+        return rejected
+
+    assert asyncio.run(scenario()) == []
+    assert breaker.stats['rejected'] == 1
+    assert breaker._probes_in_flight == 0  # 等待令牌时取消，探测名额已归还
+    assert service.session.posts == 0
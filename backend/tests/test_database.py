@@ -0,0 +1,36 @@
+from sqlalchemy import create_engine, text
+from database import Base, _migrate_legacy_results
+
+def test_legacy_rows_without_session_are_quarantined(tmp_path, caplog):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE keyword_results (id INTEGER PRIMARY KEY, original_keyword VARCHAR(255), "
+            "variant_keyword VARCHAR(255), suggestion VARCHAR(500), suggestion_rank INTEGER, "
+            "variant_type VARCHAR(50), created_at DATETIME, search_volume FLOAT)"
+        ))
+        Base.metadata.create_all(conn)
+        conn.execute(text(
+            "INSERT INTO search_history (session_id, original_keyword, created_at, status) "
+            "VALUES ('s1', '手机', '2024-01-01 00:00:00', 'completed')"
+        ))
+        conn.execute(text(
+            "INSERT INTO keyword_results (original_keyword, variant_keyword, suggestion, suggestion_rank, variant_type, created_at) VALUES "
+            "('手机', '手机a', '手机app', 1, 'alpha', '2024-01-01 00:00:01'),"
+            "('手机', '手机b', '手机报价', 1, 'alpha', '2024-01-01 00:00:02'),"
+            "('手机', '手机c', '手机壳', 1, 'alpha', '2023-12-31 00:00:00'),"  # 早于任何会话
+            "('电脑', '电脑a', '电脑app', 1, 'alpha', '2024-01-01 00:00:03')"   # 没有对应会话
+        ))
+
+        with caplog.at_level("WARNING", logger="database"):
+            assert _migrate_legacy_results(conn)
+
+        assert conn.execute(text("SELECT COUNT(*) FROM suggestion_results WHERE session_id = 's1'")).scalar() == 2
+        quarantined = conn.execute(text(
+            "SELECT variant_keyword FROM keyword_results_unmigrated ORDER BY variant_keyword"
+        )).scalars().all()
+        assert quarantined == ['手机c', '电脑a']
+        assert "keyword_results" not in {
+            row[0] for row in conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'table'"))
+        }
+    assert "2 行旧版结果无法归属到会话" in caplog.text
@@ -0,0 +1,174 @@
+import asyncio
+from sqlalchemy import select, func
+from conftest import run_async
+from config import settings
+from database import AsyncSessionLocal, KeywordResult, SearchHistory
+from services import expansion_service as expansion_module
+from services.business_analyzer import BusinessAnalyzer
+from services.expansion_service import SuggestionExpander
+from services.keyword_service import KeywordService
+
+class _FakeBaidu:
+    """按查询词返回固定建议词的下拉服务，记录查询顺序"""
+
+    def __init__(self, suggest, hang_after=None):
+        self.suggest = suggest
+        self.hang_after = hang_after
+        self.queries = []
+
+    def __call__(self):
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def get_suggestions(self, query):
+        self.queries.append(query)
+        if self.hang_after is not None and len(self.queries) > self.hang_after:
+            await asyncio.sleep(3600)
+        await asyncio.sleep(0)
+        return self.suggest(query)
+
+def _install(monkeypatch, suggest, hang_after=None):
+    fake = _FakeBaidu(suggest, hang_after)
+    monkeypatch.setattr(expansion_module, "BaiduSuggestService", fake)
+    # 单个抓取协程，请求顺序与待扩展队列的出队顺序一致
+    monkeypatch.setattr(settings, "BAIDU_CONCURRENCY_MAX", 1)
+    return fake
+
+async def _session_state(session_id):
+    async with AsyncSessionLocal() as db:
+        status = (await db.execute(
+            select(SearchHistory.status).where(SearchHistory.session_id == session_id)
+        )).scalar_one()
+        rows = (await db.execute(
+            select(func.count()).select_from(KeywordResult).where(KeywordResult.session_id == session_id)
+        )).scalar()
+    return status, rows
+
+def _two_children(query):
+    return [f"{query}价格", f"{query}图片"]
+
+def test_depth_limit_exhausts_frontier(monkeypatch):
+    fake = _install(monkeypatch, _two_children)
+    expander = SuggestionExpander(max_depth=1, max_nodes=1000, min_yield=0, yield_window=5)
+
+    async def scenario():
+        result = await expander.run("手机", ["alpha"], "expand-depth")
+        return result, await _session_state("expand-depth")
+
+    result, (status, rows) = run_async(scenario())
+    # 第0层26个变体，每个产生2个第1层查询；第2层的新词不再扩展
+    assert result['stop_reason'] == 'exhausted'
+    assert result['nodes_fetched'] == 26 + 52 == len(fake.queries)
+    assert result['max_depth_reached'] == 1
+    assert result['depth_distribution'] == {1: 52, 2: 104}
+    assert result['frontier_remaining'] == 0
+    assert status == "completed"
+    assert rows == result['total_suggestions'] == 156
+
+def test_frontier_is_layered_and_prioritised_by_opportunity(monkeypatch):
+    fake = _install(monkeypatch, _two_children)
+    expander = SuggestionExpander(max_depth=1, max_nodes=1000, min_yield=0, yield_window=5)
+    run_async(expander.run("手机", ["alpha"], "expand-priority"))
+
+    depth0 = set(KeywordService.generate_variants("手机", ["alpha"])['alpha'])
+    depths = [0 if query in depth0 else 1 for query in fake.queries]
+    assert depths == sorted(depths)
+
+    # 同一父节点的子查询中，机会评分高的先扩展
+    position = {query: index for index, query in enumerate(fake.queries)}
+    for parent in depth0:
+        children = _two_children(parent)
+        scores = BusinessAnalyzer.score_keywords_batch(children, len(children))['opportunity_score']
+        if scores[0] != scores[1]:
+            high, low = children if scores[0] > scores[1] else children[::-1]
+            assert position[high] < position[low]
+
+def test_visited_set_never_repeats_a_query(monkeypatch):
+    variants = KeywordService.generate_variants("手机", ["alpha"])['alpha']
+
+    def overlapping(query):
+        # 返回其他种子变体、大小写/空白不同的重复词以及各查询共享的建议词
+        return [variants[0], f" {variants[1].upper()} ", "手机壳", "手机膜", f"{query}价格"]
+
+    fake = _install(monkeypatch, overlapping)
+    expander = SuggestionExpander(max_depth=2, max_nodes=1000, min_yield=0, yield_window=5)
+    result = run_async(expander.run("手机", ["alpha"], "expand-dedup"))
+
+    normalized = [query.strip().lower() for query in fake.queries]
+    assert len(normalized) == len(set(normalized))
+    assert normalized.count("手机壳") == 1
+    assert result['nodes_fetched'] == len(fake.queries)
+
+def test_node_budget_caps_requests(monkeypatch):
+    fake = _install(monkeypatch, _two_children)
+    expander = SuggestionExpander(max_depth=3, max_nodes=10, min_yield=0, yield_window=5)
+    result = run_async(expander.run("手机", ["alpha"], "expand-budget"))
+
+    assert result['stop_reason'] == 'node_budget'
+    assert result['nodes_fetched'] == len(fake.queries) == 10
+    assert result['frontier_remaining'] > 0
+
+def test_low_yield_stops_expansion(monkeypatch):
+    fake = _install(monkeypatch, lambda query: ["手机壳", "手机膜"])  # 第一次之后不再产生新词
+    expander = SuggestionExpander(max_depth=2, max_nodes=1000, min_yield=1, yield_window=5)
+    result = run_async(expander.run("手机", ["alpha"], "expand-low-yield"))
+
+    assert result['stop_reason'] == 'low_yield'
+    assert result['nodes_fetched'] == len(fake.queries)
+    assert 5 <= result['nodes_fetched'] < 26
+    assert result['total_discovered'] == 2
+
+def test_results_are_flushed_in_batches(monkeypatch):
+    _install(monkeypatch, _two_children)
+    monkeypatch.setattr(settings, "RESULT_INSERT_BATCH_SIZE", 10)
+    batch_sizes = []
+    flush = KeywordService._flush_results
+
+    async def counting_flush(db, rows):
+        batch_sizes.append(len(rows))
+        await flush(db, rows)
+
+    monkeypatch.setattr(KeywordService, "_flush_results", staticmethod(counting_flush))
+    expander = SuggestionExpander(max_depth=0, max_nodes=1000, min_yield=0, yield_window=5)
+
+    async def scenario():
+        result = await expander.run("手机", ["alpha"], "expand-batches")
+        return result, await _session_state("expand-batches")
+
+    result, (status, rows) = run_async(scenario())
+    assert rows == result['total_suggestions'] == 52
+    # 每达到批量大小写入一次，最后写入剩余行
+    assert all(size >= 10 for size in batch_sizes[:-1])
+    assert len(batch_sizes) == 6
+    assert sum(batch_sizes) == 52
+
+def test_cancelled_expansion_marks_session_failed_and_keeps_fetched_rows(monkeypatch):
+    _install(monkeypatch, _two_children, hang_after=3)
+    expander = SuggestionExpander(max_depth=2, max_nodes=1000, min_yield=0, yield_window=5)
+    processed = []
+
+    async def node_callback(query, depth, suggestions, new_count):
+        processed.append(query)
+
+    async def scenario():
+        task = asyncio.create_task(expander.run(
+            "手机", ["alpha"], "expand-cancelled", node_callback=node_callback
+        ))
+        while len(processed) < 3:
+            await asyncio.sleep(0.01)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        return await _session_state("expand-cancelled")
+
+    status, rows = run_async(scenario())
+    assert status == "failed"
+    # 缓冲中尚未写入的结果在取消时保存
+    assert rows == 3 * 2
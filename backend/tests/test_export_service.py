@@ -0,0 +1,77 @@
+import pyarrow as pa
+from conftest import run_async
+from database import AsyncSessionLocal, AsyncReadSessionLocal, SearchHistory, read_engine
+from services import export_service as export_module
+from services.business_analyzer import BusinessAnalyzer
+from services.export_service import ExportService
+from services.keyword_service import KeywordService
+from services.offload import Offloader
+
+def _session_rows(session_id, variant_count, per_variant):
+    return [
+        {
+            'session_id': session_id,
+            'variant_type': 'alpha',
+            'variant_keyword': f"手机{index:03d}",
+            'suggestion': f"手机{index:03d}价格{rank}",
+            'suggestion_rank': rank
+        }
+        for index in range(variant_count)
+        for rank in range(1, per_variant + 1)
+    ]
+
+async def _create_session(session_id, variant_count, per_variant):
+    rows = _session_rows(session_id, variant_count, per_variant)
+    async with AsyncSessionLocal() as db:
+        db.add(SearchHistory(
+            session_id=session_id, original_keyword="手机", variant_types='["alpha"]',
+            total_suggestions=len(rows), status="completed"
+        ))
+        await db.commit()
+        await KeywordService._flush_results(db, rows)
+
+async def _collect_batches(session_id):
+    return [batch async for batch in ExportService._iter_record_batches(session_id, include_metrics=True)]
+
+def test_offloaded_export_scores_match_inline(monkeypatch):
+    monkeypatch.setattr(export_module.settings, "EXPORT_CHUNK_ROWS", 40)
+    pooled = Offloader(cpu_workers=1, io_workers=0, min_items=50)
+    pooled.start()
+    monkeypatch.setattr(export_module, "offloader", pooled)
+
+    async def scenario():
+        await _create_session("export-offload", variant_count=12, per_variant=6)
+        return await _collect_batches("export-offload")
+
+    try:
+        batches = run_async(scenario())
+    finally:
+        pooled.close()
+
+    table = pa.Table.from_batches(batches).to_pydict()
+    assert len(table['suggestion']) == 72
+    expected = BusinessAnalyzer.score_keywords_batch(table['suggestion'], 6)
+    for column in ('commercial_score', 'competition_level', 'search_volume_estimate', 'opportunity_score'):
+        assert table[column] == expected[column]
+
+def test_export_pages_release_the_read_connection(monkeypatch):
+    # 每页7行，分页边界落在变体关键词中间
+    monkeypatch.setattr(export_module.settings, "EXPORT_CHUNK_ROWS", 7)
+
+    async def scenario():
+        await _create_session("export-pages", variant_count=5, per_variant=4)
+        async with AsyncReadSessionLocal() as db:
+            expected = [
+                list(row) for row in await db.execute(KeywordService.session_rows_query("export-pages"))
+            ]
+        exported, checked_out = [], []
+        async for row in ExportService._iter_rows("export-pages"):
+            exported.append(row)
+            checked_out.append(read_engine.pool.checkedout())
+        return expected, exported, checked_out
+
+    expected, exported, checked_out = run_async(scenario())
+    assert len(exported) == 20
+    assert [[row[1], row[2], row[3]] for row in exported] == [[row[1], row[2], row[3]] for row in expected]
+    # 导出在产出行时不持有只读连接
+    assert set(checked_out) == {0}
@@ -0,0 +1,104 @@
+import time
+import asyncio
+import uuid
+from sqlalchemy import select, func
+from conftest import run_async
+from database import AsyncSessionLocal, SearchHistory
+from services.job_service import AnalysisJobManager, JobQueueFullError
+
+async def _add_session(status, job_owner=None, lease_until=None):
+    session_id = str(uuid.uuid4())
+    async with AsyncSessionLocal() as db:
+        db.add(SearchHistory(
+            session_id=session_id,
+            original_keyword="手机",
+            variant_types='["alpha"]',
+            total_suggestions=0,
+            status=status,
+            job_owner=job_owner,
+            lease_until=lease_until
+        ))
+        await db.commit()
+    return session_id
+
+async def _status(session_id):
+    async with AsyncSessionLocal() as db:
+        return (await db.execute(
+            select(SearchHistory.status).where(SearchHistory.session_id == session_id)
+        )).scalar_one()
+
+def _manager():
+    manager = AnalysisJobManager(workers=1, queue_size=100, lease_seconds=60)
+    manager._queue = asyncio.Queue(maxsize=manager.queue_size)
+    return manager
+
+def test_recovery_only_touches_job_queue_sessions():
+    async def scenario():
+        batch_pending = await _add_session("pending")
+        batch_running = await _add_session("running")
+        job_pending = await _add_session("pending", job_owner="dead-process")
+        job_expired = await _add_session("running", job_owner="dead-process", lease_until=time.time() - 1)
+        job_live = await _add_session("running", job_owner="other-worker", lease_until=time.time() + 60)
+
+        manager = _manager()
+        await manager._recover_jobs()
+        queued = set()
+        while not manager._queue.empty():
+            queued.add(manager._queue.get_nowait().session_id)
+
+        assert job_pending in queued
+        assert not {batch_pending, batch_running, job_expired, job_live} & queued
+        assert await _status(batch_pending) == "pending"
+        assert await _status(batch_running) == "running"
+        assert await _status(job_expired) == "failed"
+        assert await _status(job_live) == "running"
+
+    run_async(scenario())
+
+def test_pending_job_is_claimed_once_across_managers():
+    async def scenario():
+        session_id = await _add_session("pending", job_owner="dead-process")
+        first, second = _manager(), _manager()
+        claims = await asyncio.gather(first._claim(session_id), second._claim(session_id))
+        assert sorted(claims) == [False, True]
+
+        winner = first if claims[0] else second
+        async with AsyncSessionLocal() as db:
+            row = (await db.execute(
+                select(SearchHistory).where(SearchHistory.session_id == session_id)
+            )).scalar_one()
+        assert row.status == "running"
+        assert row.job_owner == winner.instance_id
+        assert row.lease_until > time.time()
+
+    run_async(scenario())
+
+def test_non_job_session_cannot_be_claimed():
+    async def scenario():
+        session_id = await _add_session("pending")
+        assert not await _manager()._claim(session_id)
+        assert await _status(session_id) == "pending"
+
+    run_async(scenario())
+
+def test_concurrent_submits_never_overfill_the_queue():
+    async def scenario():
+        manager = AnalysisJobManager(workers=1, queue_size=1, lease_seconds=60)
+        manager._queue = asyncio.Queue(maxsize=manager.queue_size)
+        outcomes = await asyncio.gather(
+            *(manager.submit("手机", ["alpha"]) for _ in range(5)), return_exceptions=True
+        )
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(
+                select(func.count()).select_from(SearchHistory).where(SearchHistory.job_owner == manager.instance_id)
+            )).scalar()
+        return manager, outcomes, rows
+
+    manager, outcomes, rows = run_async(scenario())
+    accepted = [outcome for outcome in outcomes if isinstance(outcome, str)]
+    assert len(accepted) == 1
+    assert all(isinstance(outcome, JobQueueFullError) for outcome in outcomes if outcome not in accepted)
+    # 被拒绝的提交不留下pending记录
+    assert rows == 1
+    assert manager._queue.qsize() == 1
+    assert manager._reserved == 0
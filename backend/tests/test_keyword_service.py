@@ -0,0 +1,71 @@
+import asyncio
+from sqlalchemy import select, text
+from conftest import run_async
+from database import AsyncSessionLocal, SearchHistory
+from services.baidu_service import BaiduSuggestService
+from services.keyword_service import KeywordService
+
+async def _session_status(session_id):
+    async with AsyncSessionLocal() as db:
+        return (await db.execute(
+            select(SearchHistory.status).where(SearchHistory.session_id == session_id)
+        )).scalar_one()
+
+def test_cancelled_analysis_marks_session_failed(monkeypatch):
+
+    async def hanging_suggestions(self, keywords, concurrency=None):
+        await asyncio.sleep(3600)
+        yield keywords[0], []
+
+    monkeypatch.setattr(BaiduSuggestService, "iter_suggestions", hanging_suggestions)
+
+    async def scenario():
+        async with AsyncSessionLocal() as db:
+            task = asyncio.create_task(KeywordService.analyze_keywords(
+                "手机", ["alpha"], db, session_id="cancelled-session"
+            ))
+            while True:
+                await asyncio.sleep(0.01)
+                async with AsyncSessionLocal() as check:
+                    history = (await check.execute(
+                        select(SearchHistory).where(SearchHistory.session_id == "cancelled-session")
+                    )).scalars().first()
+                if history is not None:
+                    break
+            assert history.status == "running"
+
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        return await _session_status("cancelled-session")
+
+    assert run_async(scenario()) == "failed"
+
+def test_session_rows_are_read_in_index_order_without_sorting():
+    async def scenario():
+        session_id = "index-order"
+        rows = [
+            {'session_id': session_id, 'variant_type': variant_type, 'variant_keyword': keyword,
+             'suggestion': f"{keyword}{rank}", 'suggestion_rank': rank}
+            for variant_type, keyword in [("alpha", "手机c"), ("alpha", "手机a"), ("question_how", "手机怎么a"), ("alpha", "手机b")]
+            for rank in (2, 1)
+        ]
+        async with AsyncSessionLocal() as db:
+            db.add(SearchHistory(session_id=session_id, original_keyword="手机", status="completed"))
+            await db.commit()
+            await KeywordService._flush_results(db, rows)
+
+            query = KeywordService.session_rows_query(session_id)
+            compiled = query.compile(dialect=db.bind.dialect, compile_kwargs={"literal_binds": True})
+            plan = [row[-1] for row in await db.execute(text(f"EXPLAIN QUERY PLAN {compiled}"))]
+            results = await KeywordService.get_session_results(session_id, db)
+        return plan, results
+
+    plan, results = run_async(scenario())
+    assert any("ix_suggestion_results_session_lookup" in step for step in plan)
+    assert not any("TEMP B-TREE" in step for step in plan)
+    assert list(results['results']) == ["alpha", "question_how"]
+    assert list(results['results']['alpha']) == ["手机a", "手机b", "手机c"]
+    assert results['results']['alpha']['手机c'] == ["手机c1", "手机c2"]
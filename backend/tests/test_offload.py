@@ -0,0 +1,16 @@
+import asyncio
+from services.business_analyzer import BusinessAnalyzer
+from services.offload import Offloader
+
+def test_process_pool_uses_spawn_and_matches_inline_result():
+    offloader = Offloader(cpu_workers=1, io_workers=0, min_items=1)
+    offloader.start()
+    try:
+        assert offloader._process_pool._mp_context.get_start_method() == "spawn"
+        keywords = ["手机价格", "怎么学习python", "北京租房"]
+        offloaded = asyncio.run(offloader.run_cpu(
+            BusinessAnalyzer.score_keywords_batch, keywords, 10, size=len(keywords)
+        ))
+    finally:
+        offloader.close()
+    assert offloaded == BusinessAnalyzer.score_keywords_batch(keywords, 10)
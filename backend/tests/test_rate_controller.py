@@ -0,0 +1,72 @@
+import asyncio
+import httpx
+import services.baidu_service as baidu_module
+from services.baidu_service import BaiduSuggestService
+from services.rate_controller import AdaptiveRateController
+
+def test_additive_increase_per_window():
+    controller = AdaptiveRateController(floor=1, ceiling=8, initial=2, increase_step=1, decrease_factor=0.5)
+    # 一个窗口（limit次成功）约增加increase_step
+    for _ in range(2):
+        controller.record_success()
+    assert round(controller.limit, 6) == 2.9  # 2 -> 2.5 -> 2.9
+    for _ in range(200):
+        controller.record_success()
+    assert controller.limit == 8
+
+def test_multiplicative_decrease_once_per_cooldown():
+    controller = AdaptiveRateController(floor=1, ceiling=8, initial=8, decrease_factor=0.5, cooldown=60)
+    controller.record_failure("超时")
+    controller.record_failure("超时")  # 同一波失败只退避一次
+    assert controller.limit == 4
+    assert controller.stats == {'successes': 0, 'failures': 2, 'increases': 0, 'decreases': 1}
+
+    controller._last_decrease -= 60
+    controller.record_failure("HTTP 503")
+    assert controller.limit == 2
+
+def test_limit_never_drops_below_one_slot():
+    controller = AdaptiveRateController(floor=0, ceiling=4, initial=0.5, decrease_factor=0.1, cooldown=0)
+    assert controller.limit == 1
+    for _ in range(5):
+        controller.record_failure("HTTP 429")
+    assert controller.limit == 1
+
+    async def acquire():
+        async with controller.slot():
+            return True
+
+    assert asyncio.run(asyncio.wait_for(acquire(), timeout=1))
+
+def test_slot_caps_concurrency_at_limit():
+    controller = AdaptiveRateController(floor=1, ceiling=2, initial=2)
+    peak = 0
+
+    async def request():
+        nonlocal peak
+        async with controller.slot():
+            peak = max(peak, controller.in_flight)
+            await asyncio.sleep(0.01)
+
+    async def scenario():
+        await asyncio.gather(*(request() for _ in range(10)))
+
+    asyncio.run(scenario())
+    assert peak == 2
+    assert controller.in_flight == 0
+
+def test_connection_errors_count_as_failures(monkeypatch):
+    controller = AdaptiveRateController(floor=1, ceiling=8, initial=4, decrease_factor=0.5)
+    monkeypatch.setattr(baidu_module, "baidu_rate_controller", controller)
+
+    def reset(request):
+        raise httpx.ConnectError("connection reset", request=request)
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(reset)) as client:
+            async with BaiduSuggestService(client) as service:
+                return await service._fetch_suggestions("手机a", max_retries=1)
+
+    assert asyncio.run(scenario()) == []
+    assert controller.stats['failures'] == 1
+    assert controller.limit == 2
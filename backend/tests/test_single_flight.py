@@ -0,0 +1,118 @@
+import asyncio
+import pytest
+import services.baidu_service as baidu_module
+from services.baidu_service import BaiduSuggestService
+from services.http_pool import http_pool
+from services.single_flight import SingleFlight
+
+def test_concurrent_calls_share_one_upstream_call():
+    flight = SingleFlight('test')
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return ["手机价格", "手机推荐"]
+
+    async def main():
+        results = await asyncio.gather(*(flight.do("手机", fetch) for _ in range(5)))
+        other = await flight.do("电脑", fetch)
+        return results, other
+
+    results, other = asyncio.run(main())
+    assert len(calls) == 2
+    assert all(result == ["手机价格", "手机推荐"] for result in results)
+    assert other == ["手机价格", "手机推荐"]
+    assert flight.get_stats() == {'executed': 2, 'coalesced': 4, 'in_flight': 0, 'coalesce_rate': round(4 / 6, 4)}
+
+def test_error_propagates_to_every_waiter():
+    flight = SingleFlight('test')
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise RuntimeError("上游超时")
+
+    async def main():
+        return await asyncio.gather(*(flight.do("手机", fetch) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert len(calls) == 1
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+def test_cancelled_leader_does_not_cancel_shared_call():
+    flight = SingleFlight('test')
+    finished = []
+
+    async def fetch():
+        await asyncio.sleep(0.02)
+        finished.append(1)
+        return "ok"
+
+    async def main():
+        leader = asyncio.ensure_future(flight.do("手机", fetch))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.do("手机", fetch))
+        await asyncio.sleep(0)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(main()) == "ok"
+    assert finished == [1]
+    assert flight.stats == {'executed': 1, 'coalesced': 1}
+
+def test_key_is_forgotten_after_completion():
+    flight = SingleFlight('test')
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        return len(calls)
+
+    async def main():
+        first = await flight.do("手机", fetch)
+        assert flight.get_stats()['in_flight'] == 0
+        second = await flight.do("手机", fetch)
+        return first, second
+
+    # 已完成的调用不缓存结果，同一键再次请求会重新执行
+    assert asyncio.run(main()) == (1, 2)
+
+def test_shared_fetch_outlives_the_leaders_client_context(monkeypatch):
+    monkeypatch.setattr(baidu_module, "baidu_flight", SingleFlight('test'))
+
+    async def no_cache(keyword):
+        return None
+
+    monkeypatch.setattr(baidu_module.suggestion_cache, "get", no_cache)
+    gate = asyncio.Event()
+    clients = []
+
+    async def fetch(self, keyword, max_retries, client=None):
+        clients.append(client)
+        await gate.wait()
+        assert not client.is_closed
+        return ["手机价格"]
+
+    monkeypatch.setattr(BaiduSuggestService, "_fetch_suggestions", fetch)
+
+    async def main():
+        assert not http_pool.started
+        async with BaiduSuggestService() as leader_service:
+            leader = asyncio.ensure_future(leader_service.get_suggestions("手机"))
+            await asyncio.sleep(0)
+        # 发起方已退出上下文，共享请求仍持有客户端
+        async with BaiduSuggestService() as follower_service:
+            follower = asyncio.ensure_future(follower_service.get_suggestions("手机"))
+            await asyncio.sleep(0)
+            leader.cancel()
+            gate.set()
+            result = await follower
+        return result
+
+    assert asyncio.run(main()) == ["手机价格"]
+    assert len(clients) == 1 and clients[0].is_closed
+    assert http_pool._fallback_clients == {}
@@ -0,0 +1,65 @@
+import time
+import asyncio
+from services.token_bucket import TokenBucket
+
+def test_burst_is_granted_then_refill_follows_rate():
+    bucket = TokenBucket('test', rate=20, burst=3, backoff_base=0.1, backoff_max=1)
+
+    async def main():
+        start = time.monotonic()
+        for _ in range(3):
+            await bucket.acquire()
+        burst_elapsed = time.monotonic() - start
+        for _ in range(2):
+            await bucket.acquire()
+        return burst_elapsed, time.monotonic() - start
+
+    burst_elapsed, total_elapsed = asyncio.run(main())
+    assert burst_elapsed < 0.02
+    # 桶空后每个令牌需等待 1/rate = 0.05 秒
+    assert 0.09 <= total_elapsed < 0.3
+    assert bucket.stats['granted'] == 5
+
+def test_rate_limited_pauses_with_capped_exponential_backoff():
+    bucket = TokenBucket('test', rate=1000, burst=5, backoff_base=0.05, backoff_max=0.15)
+
+    delays = []
+    for _ in range(4):
+        before = time.monotonic()
+        bucket.record_rate_limited()
+        delays.append(round(bucket._paused_until - before, 2))
+        bucket._paused_until = 0.0  # 只观察每次计算出的暂停时长
+    assert delays == [0.05, 0.1, 0.15, 0.15]
+    assert bucket.stats['rate_limited'] == 4
+
+    bucket.record_success()
+    bucket.record_rate_limited()
+
+    async def main():
+        start = time.monotonic()
+        await bucket.acquire()
+        return time.monotonic() - start
+
+    # 成功后退避重置为初始值，且暂停期间不发放令牌
+    elapsed = asyncio.run(main())
+    assert 0.04 <= elapsed < 0.1
+
+def test_waiters_are_served_in_arrival_order():
+    bucket = TokenBucket('test', rate=100, burst=1, backoff_base=0.1, backoff_max=1)
+    order = []
+
+    async def worker(index):
+        await bucket.acquire()
+        order.append(index)
+
+    async def main():
+        tasks = []
+        for index in range(5):
+            tasks.append(asyncio.ensure_future(worker(index)))
+            await asyncio.sleep(0)  # 保证到达顺序
+        assert bucket.waiting > 0
+        await asyncio.gather(*tasks)
+
+    asyncio.run(main())
+    assert order == [0, 1, 2, 3, 4]
+    assert bucket.waiting == 0